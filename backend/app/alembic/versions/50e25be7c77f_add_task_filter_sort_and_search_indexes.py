@@ -0,0 +1,44 @@
+"""add task filter, sort and search indexes
+
+Revision ID: 50e25be7c77f
+Revises: dace79eb857c
+Create Date: 2026-10-18 11:27:45.902316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '50e25be7c77f'
+down_revision: Union[str, None] = 'dace79eb857c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must stay identical to app.models.task_search_vector() for the planner to use it.
+SEARCH_VECTOR = "to_tsvector('simple'::regconfig, (title || ' ') || coalesce(description, ''))"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_task_owner_id_status_id', 'task', ['owner_id', 'status', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_task_owner_id_title_id', 'task', ['owner_id', 'title', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_task_status_id', 'task', ['status', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_task_title_id', 'task', ['title', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_task_search', 'task', [sa.text(SEARCH_VECTOR)], unique=False, postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True)
+        # Superseded by ix_task_owner_id_status_id.
+        op.drop_index('ix_task_owner_id_status', table_name='task', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_task_owner_id_status', 'task', ['owner_id', 'status'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_task_search', table_name='task', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_task_title_id', table_name='task', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_task_status_id', table_name='task', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_task_owner_id_title_id', table_name='task', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_task_owner_id_status_id', table_name='task', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,29 @@
+"""add refresh token expires_at index
+
+Revision ID: 5b1e8d3f7a92
+Revises: d2b8f0c4e6a1
+Create Date: 2026-10-18 21:12:37.540918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1e8d3f7a92'
+down_revision: Union[str, None] = 'd2b8f0c4e6a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Logins prune expired tokens of all users in batches.
+    op.create_index(op.f('ix_refresh_token_expires_at'), 'refresh_token', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_refresh_token_expires_at'), table_name='refresh_token')
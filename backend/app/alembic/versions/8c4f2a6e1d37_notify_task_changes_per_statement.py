@@ -0,0 +1,130 @@
+"""notify task changes per statement
+
+Revision ID: 8c4f2a6e1d37
+Revises: 5b1e8d3f7a92
+Create Date: 2026-10-18 21:48:05.117264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4f2a6e1d37'
+down_revision: Union[str, None] = '5b1e8d3f7a92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# f4a9c2d81b36's per-row function, restored by the downgrade.
+ROW_FUNCTION = """
+    CREATE OR REPLACE FUNCTION task_notify_change() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            PERFORM pg_notify('task_events', concat_ws(' ',
+                'deleted', OLD.owner_id,
+                json_build_object('id', OLD.id, 'owner_id', OLD.owner_id)));
+            RETURN OLD;
+        END IF;
+        PERFORM pg_notify('task_events', concat_ws(' ',
+            CASE TG_OP WHEN 'INSERT' THEN 'created' ELSE 'updated' END,
+            NEW.owner_id,
+            json_build_object(
+                'title', NEW.title,
+                'description', NEW.description,
+                'status', NEW.status,
+                'id', NEW.id,
+                'owner_id', NEW.owner_id,
+                'version', NEW.version)));
+        RETURN NEW;
+    END
+    $$
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # One trigger call per statement, reading the changed rows from its
+    # transition tables. Statements of up to 20 rows notify each row as
+    # before; larger ones (bulk requests, imports) notify "resync" once per
+    # owner, or once for everyone ("resync * {}") when they touched more than
+    # 20 owners, and streams catch up through /tasks/changes instead.
+    op.execute('DROP TRIGGER task_notify ON task')
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION task_notify_change() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            changed_rows bigint;
+            changed_owners bigint;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                SELECT count(*), count(DISTINCT owner_id)
+                INTO changed_rows, changed_owners FROM old_rows;
+            ELSE
+                SELECT count(*), count(DISTINCT owner_id)
+                INTO changed_rows, changed_owners FROM new_rows;
+            END IF;
+
+            IF changed_owners > 20 THEN
+                PERFORM pg_notify('task_events', 'resync * {}');
+            ELSIF changed_rows > 20 AND TG_OP = 'DELETE' THEN
+                PERFORM pg_notify('task_events', concat_ws(' ',
+                    'resync', owner_id, '{}'))
+                FROM (SELECT DISTINCT owner_id FROM old_rows) AS owners;
+            ELSIF changed_rows > 20 THEN
+                PERFORM pg_notify('task_events', concat_ws(' ',
+                    'resync', owner_id, '{}'))
+                FROM (SELECT DISTINCT owner_id FROM new_rows) AS owners;
+            ELSIF TG_OP = 'DELETE' THEN
+                PERFORM pg_notify('task_events', concat_ws(' ',
+                    'deleted', owner_id,
+                    json_build_object('id', id, 'owner_id', owner_id)))
+                FROM old_rows;
+            ELSE
+                PERFORM pg_notify('task_events', concat_ws(' ',
+                    CASE TG_OP WHEN 'INSERT' THEN 'created' ELSE 'updated' END,
+                    owner_id,
+                    json_build_object(
+                        'title', title,
+                        'description', description,
+                        'status', status,
+                        'id', id,
+                        'owner_id', owner_id,
+                        'version', version)))
+                FROM new_rows;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    # A trigger with transition tables can only handle one event.
+    op.execute(
+        'CREATE TRIGGER task_notify_insert AFTER INSERT ON task '
+        'REFERENCING NEW TABLE AS new_rows '
+        'FOR EACH STATEMENT EXECUTE FUNCTION task_notify_change()'
+    )
+    op.execute(
+        'CREATE TRIGGER task_notify_update AFTER UPDATE ON task '
+        'REFERENCING NEW TABLE AS new_rows '
+        'FOR EACH STATEMENT EXECUTE FUNCTION task_notify_change()'
+    )
+    op.execute(
+        'CREATE TRIGGER task_notify_delete AFTER DELETE ON task '
+        'REFERENCING OLD TABLE AS old_rows '
+        'FOR EACH STATEMENT EXECUTE FUNCTION task_notify_change()'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER task_notify_delete ON task')
+    op.execute('DROP TRIGGER task_notify_update ON task')
+    op.execute('DROP TRIGGER task_notify_insert ON task')
+    op.execute(ROW_FUNCTION)
+    op.execute(
+        'CREATE TRIGGER task_notify AFTER INSERT OR UPDATE OR DELETE ON task '
+        'FOR EACH ROW EXECUTE FUNCTION task_notify_change()'
+    )
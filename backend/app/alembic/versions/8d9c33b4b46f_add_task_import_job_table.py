@@ -0,0 +1,45 @@
+"""add task_import_job table
+
+Revision ID: 8d9c33b4b46f
+Revises: 50e25be7c77f
+Create Date: 2026-10-18 13:05:37.214960
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d9c33b4b46f'
+down_revision: Union[str, None] = '50e25be7c77f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('task_import_job',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('owner_id', sa.Uuid(), nullable=False),
+    sa.Column('format', sa.Enum('ndjson', 'csv', name='taskfileformat'), nullable=False),
+    sa.Column('status', sa.Enum('pending', 'running', 'interrupted', 'failed', 'completed', name='importjobstatus'), nullable=False),
+    sa.Column('records_processed', sa.Integer(), nullable=False),
+    sa.Column('imported', sa.Integer(), nullable=False),
+    sa.Column('rejected', sa.Integer(), nullable=False),
+    sa.Column('errors', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('detail', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_task_import_job_owner_id'), 'task_import_job', ['owner_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_task_import_job_owner_id'), table_name='task_import_job')
+    op.drop_table('task_import_job')
+    sa.Enum(name='importjobstatus').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='taskfileformat').drop(op.get_bind(), checkfirst=True)
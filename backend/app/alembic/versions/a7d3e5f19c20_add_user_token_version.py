@@ -0,0 +1,33 @@
+"""add user token version
+
+Revision ID: a7d3e5f19c20
+Revises: f4a9c2d81b36
+Create Date: 2026-10-18 19:04:51.208473
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e5f19c20'
+down_revision: Union[str, None] = 'f4a9c2d81b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Only users whose tokens were revoked get a row, so the table stays small.
+    op.create_table('user_token_version',
+    sa.Column('user_id', sa.Uuid(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_token_version')
@@ -0,0 +1,33 @@
+"""add user task_count
+
+Revision ID: b4cdd2c65df7
+Revises: 49484b168ec6
+Create Date: 2026-10-18 09:12:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4cdd2c65df7'
+down_revision: Union[str, None] = '49484b168ec6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user', sa.Column('task_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        'UPDATE "user" SET task_count = counts.total '
+        'FROM (SELECT owner_id, count(*) AS total FROM task GROUP BY owner_id) AS counts '
+        'WHERE counts.owner_id = "user".id'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user', 'task_count')
@@ -0,0 +1,31 @@
+"""add task and user version
+
+Revision ID: c3f1a2e7d9b4
+Revises: 8d9c33b4b46f
+Create Date: 2026-10-18 14:21:08.630512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f1a2e7d9b4'
+down_revision: Union[str, None] = '8d9c33b4b46f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A constant default makes these metadata-only changes; no table rewrite.
+    op.add_column('task', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('user', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user', 'version')
+    op.drop_column('task', 'version')
@@ -0,0 +1,47 @@
+"""add refresh token table
+
+Revision ID: d2b8f0c4e6a1
+Revises: a7d3e5f19c20
+Create Date: 2026-10-18 20:12:37.590214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2b8f0c4e6a1'
+down_revision: Union[str, None] = 'a7d3e5f19c20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('refresh_token',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('token_hash', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+    sa.Column('user_id', sa.Uuid(), nullable=False),
+    sa.Column('family_id', sa.Uuid(), nullable=False),
+    sa.Column('token_version', sa.Integer(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('used_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Exchanges look tokens up by digest; reuse revokes by family; logins
+    # prune by user, as do cascades from user deletion.
+    op.create_index(op.f('ix_refresh_token_token_hash'), 'refresh_token', ['token_hash'], unique=True)
+    op.create_index(op.f('ix_refresh_token_family_id'), 'refresh_token', ['family_id'], unique=False)
+    op.create_index(op.f('ix_refresh_token_user_id'), 'refresh_token', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_refresh_token_user_id'), table_name='refresh_token')
+    op.drop_index(op.f('ix_refresh_token_family_id'), table_name='refresh_token')
+    op.drop_index(op.f('ix_refresh_token_token_hash'), table_name='refresh_token')
+    op.drop_table('refresh_token')
@@ -0,0 +1,33 @@
+"""add task owner indexes
+
+Revision ID: dace79eb857c
+Revises: b4cdd2c65df7
+Create Date: 2026-10-18 10:03:12.554810
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'dace79eb857c'
+down_revision: Union[str, None] = 'b4cdd2c65df7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built concurrently so existing task tables stay writable during the upgrade.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_task_owner_id_id', 'task', ['owner_id', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_task_owner_id_status', 'task', ['owner_id', 'status'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_task_owner_id_status', table_name='task', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_task_owner_id_id', table_name='task', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,81 @@
+"""add task change tracking
+
+Revision ID: e61b0d4f27a8
+Revises: c3f1a2e7d9b4
+Create Date: 2026-10-18 15:02:44.187236
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e61b0d4f27a8'
+down_revision: Union[str, None] = 'c3f1a2e7d9b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows keep 0: older than any sync token, so only a full sync
+    # returns them and the table is not rewritten.
+    op.add_column('task', sa.Column('change_xid', sa.BigInteger(), server_default='0', nullable=False))
+    op.create_table('task_tombstone',
+    sa.Column('task_id', sa.Uuid(), nullable=False),
+    sa.Column('owner_id', sa.Uuid(), nullable=False),
+    sa.Column('change_xid', sa.BigInteger(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('task_id')
+    )
+    op.create_index('ix_task_tombstone_change_xid_task_id', 'task_tombstone', ['change_xid', 'task_id'], unique=False)
+    op.create_index('ix_task_tombstone_owner_id_change_xid_task_id', 'task_tombstone', ['owner_id', 'change_xid', 'task_id'], unique=False)
+    op.create_index(op.f('ix_task_tombstone_deleted_at'), 'task_tombstone', ['deleted_at'], unique=False)
+
+    # Every write path (ORM, bulk statements, COPY imports, cascades from
+    # user deletion) goes through these triggers, so no change is missed.
+    op.execute(
+        """
+        CREATE FUNCTION task_track_change() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                INSERT INTO task_tombstone (task_id, owner_id, change_xid)
+                VALUES (OLD.id, OLD.owner_id, pg_current_xact_id()::text::bigint);
+                RETURN OLD;
+            END IF;
+            NEW.change_xid := pg_current_xact_id()::text::bigint;
+            RETURN NEW;
+        END
+        $$
+        """
+    )
+    op.execute(
+        'CREATE TRIGGER task_track_write BEFORE INSERT OR UPDATE ON task '
+        'FOR EACH ROW EXECUTE FUNCTION task_track_change()'
+    )
+    op.execute(
+        'CREATE TRIGGER task_track_delete AFTER DELETE ON task '
+        'FOR EACH ROW EXECUTE FUNCTION task_track_change()'
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_task_owner_id_change_xid_id', 'task', ['owner_id', 'change_xid', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_task_change_xid_id', 'task', ['change_xid', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_task_change_xid_id', table_name='task', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_task_owner_id_change_xid_id', table_name='task', postgresql_concurrently=True, if_exists=True)
+    op.execute('DROP TRIGGER task_track_delete ON task')
+    op.execute('DROP TRIGGER task_track_write ON task')
+    op.execute('DROP FUNCTION task_track_change()')
+    op.drop_index(op.f('ix_task_tombstone_deleted_at'), table_name='task_tombstone')
+    op.drop_index('ix_task_tombstone_owner_id_change_xid_task_id', table_name='task_tombstone')
+    op.drop_index('ix_task_tombstone_change_xid_task_id', table_name='task_tombstone')
+    op.drop_table('task_tombstone')
+    op.drop_column('task', 'change_xid')
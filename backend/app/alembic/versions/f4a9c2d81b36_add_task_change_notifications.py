@@ -0,0 +1,62 @@
+"""add task change notifications
+
+Revision ID: f4a9c2d81b36
+Revises: e61b0d4f27a8
+Create Date: 2026-10-18 16:21:09.532817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4a9c2d81b36'
+down_revision: Union[str, None] = 'e61b0d4f27a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Notifications are delivered on commit, to the one LISTEN connection of
+    # each API worker (app.core.events). The payload is
+    # "<event> <owner_id> <json>" so workers can route an event without
+    # parsing it; title and description are bounded, so it stays well under
+    # NOTIFY's 8000-byte limit.
+    op.execute(
+        """
+        CREATE FUNCTION task_notify_change() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                PERFORM pg_notify('task_events', concat_ws(' ',
+                    'deleted', OLD.owner_id,
+                    json_build_object('id', OLD.id, 'owner_id', OLD.owner_id)));
+                RETURN OLD;
+            END IF;
+            PERFORM pg_notify('task_events', concat_ws(' ',
+                CASE TG_OP WHEN 'INSERT' THEN 'created' ELSE 'updated' END,
+                NEW.owner_id,
+                json_build_object(
+                    'title', NEW.title,
+                    'description', NEW.description,
+                    'status', NEW.status,
+                    'id', NEW.id,
+                    'owner_id', NEW.owner_id,
+                    'version', NEW.version)));
+            RETURN NEW;
+        END
+        $$
+        """
+    )
+    op.execute(
+        'CREATE TRIGGER task_notify AFTER INSERT OR UPDATE OR DELETE ON task '
+        'FOR EACH ROW EXECUTE FUNCTION task_notify_change()'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER task_notify ON task')
+    op.execute('DROP FUNCTION task_notify_change()')
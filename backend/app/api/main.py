@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.routes import login, users, tasks
+from app.api.routes import internal, login, users, tasks
 
 
 api_router = APIRouter()
@@ -8,3 +8,4 @@ api_router = APIRouter()
 api_router.include_router(login.router)
 api_router.include_router(users.router)
 api_router.include_router(tasks.router)
+api_router.include_router(internal.router)
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, status
+
+from app.auth.dependencies import get_current_active_superuser
+from app.core.db import engine_pools
+from app.core.metrics import pool_stats
+from app.core.query_budget import query_budget
+from app.models import PoolStats
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["internal"],
+    dependencies=[Depends(get_current_active_superuser)],
+)
+
+
+@router.get(
+    "/pool-stats",
+    summary="Database connection pool statistics",
+    response_model=list[PoolStats],
+    status_code=status.HTTP_200_OK,
+)
+@query_budget(1)
+async def read_pool_stats() -> list[PoolStats]:
+    """
+    Live pool occupancy plus checkout wait-time histograms and timeout counts.
+    """
+    return [
+        PoolStats.model_validate(pool_stats(name, pool))
+        for name, pool in engine_pools().items()
+    ]
@@ -1,25 +1,30 @@
-from typing import Annotated
+from typing import Annotated, Any
 from datetime import timedelta
 from fastapi import HTTPException, status
 
 from fastapi import APIRouter, Depends
 from fastapi.security import OAuth2PasswordRequestForm
 
-from app.core.db import SessionDep
+from app.core.db import AsyncSessionDep
 from app.core.config import settings
-from app.models import Token
-from app.services.user_services import UserService
-from app.auth.security import create_access_token
+from app.core.query_budget import query_budget
+from app.models import Principal, RefreshTokenRequest, Token
+from app.services.token_services import AsyncRefreshTokenService
+from app.services.user_services import AsyncUserService
+from app.auth.dependencies import read_token_version
+from app.auth.security import access_token_claims, create_access_token
 
 router = APIRouter(tags=["login"])
 
 
 @router.post("/login/access-token")
-def login_acess_token(
-    session: SessionDep, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
+@query_budget(2)
+async def login_acess_token(
+    session: AsyncSessionDep,
+    form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
 ) -> Token:
-    user_service = UserService(session)
-    user = user_service.authenticate_user_service(
+    user_service = AsyncUserService(session)
+    user = await user_service.authenticate_user_service(
         email=form_data.username,
         password=form_data.password,
     )
@@ -31,10 +36,50 @@ def login_acess_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    refresh_token, token_version = None, 0
+    if settings.REFRESH_TOKEN_EXPIRE_DAYS:
+        refresh_token, token_version = await AsyncRefreshTokenService(session).issue(
+            user.id
+        )
+    elif settings.ACCESS_TOKEN_CLAIMS:
+        token_version = await read_token_version(session, str(user.id))
 
-    access_token = create_access_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
+    return Token(
+        access_token=_access_token(user, token_version), refresh_token=refresh_token
     )
 
-    return Token(access_token=access_token)
+
+@router.post("/login/refresh-token")
+@query_budget(3)
+async def refresh_access_token(
+    session: AsyncSessionDep, body: RefreshTokenRequest
+) -> Token:
+    """
+    Exchange a refresh token for a new access token and a new refresh token,
+    without a password check. Each refresh token works once: replaying one
+    revokes every token issued since its login.
+    """
+    if not settings.REFRESH_TOKEN_EXPIRE_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Refresh tokens are disabled",
+        )
+
+    principal, token_version, refresh_token = await AsyncRefreshTokenService(
+        session
+    ).rotate(body.refresh_token)
+
+    return Token(
+        access_token=_access_token(principal, token_version),
+        refresh_token=refresh_token,
+    )
+
+
+def _access_token(user: Principal, token_version: int) -> str:
+    data: dict[str, Any] = {"sub": str(user.id)}
+    if settings.ACCESS_TOKEN_CLAIMS:
+        data = access_token_claims(user, token_version)
+    return create_access_token(
+        data=data,
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
@@ -0,0 +1,44 @@
+import secrets
+
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import settings
+from app.core.db import engine_pools
+from app.core.events import task_events
+from app.core.metrics import render_prometheus
+from app.core.query_budget import query_budget
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get(
+    "/metrics",
+    summary="Prometheus metrics",
+    response_class=PlainTextResponse,
+    include_in_schema=False,
+)
+@query_budget(0)
+async def read_metrics(authorization: str | None = Header(default=None)) -> str:
+    """
+    Request latencies and database work per route, statement and pool wait
+    times and password hashing times of this worker, in the Prometheus text
+    exposition format.
+    """
+    if settings.METRICS_BEARER_TOKEN and not secrets.compare_digest(
+        authorization or "", f"Bearer {settings.METRICS_BEARER_TOKEN}"
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return render_prometheus(
+        pools=engine_pools(),
+        gauges={
+            "task_event_streams": (
+                "Open /tasks/events streams.",
+                task_events.subscription_count,
+            )
+        },
+    )
@@ -1,10 +1,45 @@
 import uuid
-from fastapi import APIRouter, Depends, status
+from collections.abc import AsyncIterator
 
-from app.core.db import SessionDep
-from app.models import TaskCreate, TaskUpdate, TaskPublic, TasksPublic, Message
-from app.services.task_services import User, TaskService
-from app.auth.dependencies import get_current_user
+from fastapi import APIRouter, Depends, Header, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.db import AsyncReadSessionDep, AsyncSessionDep, async_engine
+from app.core.etag import (
+    etag_matches,
+    not_modified,
+    resource_etag,
+    set_etag,
+    version_from_if_match,
+)
+from app.core.events import READY, task_events
+from app.core.query_budget import query_budget
+from app.models import (
+    CountMode,
+    Principal,
+    Task,
+    TaskChanges,
+    TaskFileFormat,
+    TaskImportJob,
+    TaskImportJobCreate,
+    TaskImportJobPublic,
+    TaskCreate,
+    TaskUpdate,
+    TaskPublic,
+    TaskSort,
+    TaskStatus,
+    TasksPublic,
+    TasksBulkCreate,
+    TasksBulkDelete,
+    TasksBulkResult,
+    TasksBulkUpdate,
+    Message,
+)
+from app.services.task_services import AsyncTaskService
+from app.services.task_import_services import AsyncTaskImportService
+from app.auth.dependencies import get_current_principal
 
 router = APIRouter(
     prefix="/tasks",
@@ -21,59 +56,378 @@ router = APIRouter(
         200: {"description": "A list of tasks"},
     },
 )
-def read_tasks(
-    session: SessionDep,
-    current_user: User = Depends(get_current_user),
+@query_budget(3)
+async def read_tasks(
+    session: AsyncReadSessionDep,
+    current_user: Principal = Depends(get_current_principal),
     skip: int = 0,
     limit: int = 100,
-) -> TasksPublic:
-    service = TaskService(session)
-    return service.get_tasks(current_user=current_user, skip=skip, limit=limit)
+    cursor: str | None = None,
+    count: CountMode = CountMode.exact,
+    task_status: list[TaskStatus] | None = Query(default=None, alias="status"),
+    q: str | None = None,
+    sort: TaskSort = TaskSort.id,
+    if_none_match: str | None = Header(default=None),
+) -> Response:
+    """
+    List tasks, optionally filtered and sorted.
+
+    - `status` may be repeated to match any of several statuses.
+    - `q` is a full-text search over title and description; it accepts web
+      search syntax (`"exact phrase"`, `-excluded`, `or`).
+    - `sort` orders by `id`, `title` or `status`; prefix with `-` for
+      descending. Ties are broken by ID.
+
+    Pass the `next_cursor` of a page as `cursor` to fetch the following page
+    without the cost of skipping rows; `skip` is ignored when a cursor is given.
+    A cursor is only valid with the `sort` it was issued for.
+
+    `count` selects how the total is computed: `exact`, `estimated` from the
+    planner statistics, or `none` to skip it entirely. Filtered listings are
+    always counted exactly unless `none` is given.
+
+    The response carries an `ETag`; send it back in `If-None-Match` to get
+    `304 Not Modified` while the page is unchanged.
+    """
+    service = AsyncTaskService(session)
+    # Encoded by the service straight from the selected rows; `response_model`
+    # only documents the shape. The page is read once either way: a separate
+    # ETag query would double the work whenever the page has changed.
+    body, etag = await service.get_tasks_json(
+        current_user=current_user,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        count=count,
+        statuses=task_status,
+        search=q,
+        sort=sort,
+    )
+    if if_none_match and etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response = Response(body, media_type="application/json")
+    set_etag(response, etag)
+    return response
+
+
+@router.get("/changes", summary="List task changes", response_model=TaskChanges)
+@query_budget(4)
+async def read_task_changes(
+    session: AsyncSessionDep,
+    current_user: Principal = Depends(get_current_principal),
+    since: str | None = None,
+    limit: int = 500,
+) -> TaskChanges:
+    """
+    Tasks created, updated or deleted since `since`, a `next_token` from an
+    earlier call. Without it every task is returned, to seed a local copy.
+
+    Keep calling with the returned `next_token` while `has_more` is set; the
+    last token of a run is the `since` of the next poll. A token older than
+    `TASK_SYNC_TOKEN_TTL_DAYS` is answered with `410 Gone`: start over
+    without one.
+    """
+    service = AsyncTaskService(session)
+    return await service.get_changes(
+        current_user=current_user, since=since, limit=limit
+    )
+
+
+@router.get(
+    "/events",
+    summary="Stream task changes",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "Server-sent events, until the client disconnects",
+            "content": {"text/event-stream": {}},
+        },
+    },
+)
+@query_budget(1)
+async def stream_task_events(
+    current_user: Principal = Depends(get_current_principal),
+) -> StreamingResponse:
+    """
+    Push the caller's task changes (every task's for a superuser) as
+    server-sent events, instead of polling the listing.
+
+    `created` and `updated` carry the task as `TaskPublic`, `deleted` its `id`
+    and `owner_id`. The stream opens with `ready`; on `ready` and on `resync`,
+    sent when events had to be dropped for a client that reads too slowly and
+    in place of the events of bulk writes and imports, catch up with
+    `/tasks/changes`. Comment lines keep idle streams alive.
+    """
+    await task_events.wait_listening()
+    owner_id = None if current_user.is_superuser else current_user.id
+
+    async def body() -> AsyncIterator[bytes]:
+        # No database session is held: the listener connection is shared.
+        async with task_events.subscribe(owner_id) as subscription:
+            yield READY
+            while True:
+                yield await subscription.next_frame(
+                    settings.TASK_EVENTS_HEARTBEAT_SECONDS
+                )
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+_FILE_MEDIA_TYPES = {
+    TaskFileFormat.ndjson: "application/x-ndjson",
+    TaskFileFormat.csv: "text/csv; charset=utf-8",
+}
+
+
+@router.get(
+    "/export",
+    summary="Export tasks",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "Every visible task, streamed",
+            "content": {media_type: {} for media_type in _FILE_MEDIA_TYPES.values()},
+        },
+    },
+)
+@query_budget(2)
+async def export_tasks(
+    current_user: Principal = Depends(get_current_principal),
+    format: TaskFileFormat = TaskFileFormat.ndjson,
+    task_status: list[TaskStatus] | None = Query(default=None, alias="status"),
+    q: str | None = None,
+    compress: bool = False,
+) -> StreamingResponse:
+    """
+    Stream all of the caller's tasks (every task for a superuser) ordered by
+    ID, as NDJSON (one `TaskPublic` object per line) or CSV with a header row.
+
+    `status` and `q` filter as on the listing endpoint. With `compress` the
+    body is gzip-encoded on the fly (`Content-Encoding: gzip`).
+    """
+
+    async def body() -> AsyncIterator[bytes]:
+        # The request-scoped session is closed before the body is sent, so the
+        # stream holds its own for as long as the client keeps reading.
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            service = AsyncTaskService(session)
+            async for chunk in service.export_tasks(
+                current_user=current_user,
+                format=format,
+                statuses=task_status,
+                search=q,
+                compress=compress,
+            ):
+                yield chunk
+
+    headers = {"Content-Disposition": f'attachment; filename="tasks.{format.value}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        body(), media_type=_FILE_MEDIA_TYPES[format], headers=headers
+    )
+
+
+@router.post(
+    "/imports",
+    summary="Start a task import",
+    response_model=TaskImportJobPublic,
+    status_code=status.HTTP_201_CREATED,
+)
+@query_budget(3)
+async def create_import_job(
+    body: TaskImportJobCreate,
+    session: AsyncSessionDep,
+    current_user: Principal = Depends(get_current_principal),
+) -> TaskImportJob:
+    """
+    Create an import job; upload its file with `PUT /tasks/imports/{job_id}`.
+    """
+    service = AsyncTaskImportService(session)
+    return await service.create_job(format=body.format, current_user=current_user)
+
+
+@router.put(
+    "/imports/{job_id}",
+    summary="Upload a task import file",
+    response_model=TaskImportJobPublic,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                media_type: {"schema": {"type": "string", "format": "binary"}}
+                for media_type in _FILE_MEDIA_TYPES.values()
+            },
+        }
+    },
+)
+@query_budget(None)
+async def upload_import_file(
+    job_id: uuid.UUID,
+    request: Request,
+    session: AsyncSessionDep,
+    current_user: Principal = Depends(get_current_principal),
+) -> TaskImportJob:
+    """
+    Stream the raw file (NDJSON, or CSV with a header row naming at least
+    `title`) as the request body; tasks are created for the job's owner.
+
+    The response is the final report, including the first rejected records.
+    Progress is committed every `TASK_IMPORT_BATCH_SIZE` records and can be
+    followed with `GET /tasks/imports/{job_id}`. If the upload is cut short,
+    send the same file again to resume after the last committed record.
+    """
+    service = AsyncTaskImportService(session)
+    return await service.run_job(
+        job_id=job_id, chunks=request.stream(), current_user=current_user
+    )
+
+
+@router.get(
+    "/imports/{job_id}",
+    summary="Get a task import job",
+    response_model=TaskImportJobPublic,
+)
+@query_budget(2)
+async def read_import_job(
+    job_id: uuid.UUID,
+    session: AsyncSessionDep,
+    current_user: Principal = Depends(get_current_principal),
+) -> TaskImportJob:
+    """
+    Report an import job's status and progress.
+    """
+    service = AsyncTaskImportService(session)
+    return await service.get_job(job_id=job_id, current_user=current_user)
+
+
+@router.post(
+    "/bulk",
+    summary="Create many tasks",
+    response_model=TasksBulkResult,
+    status_code=status.HTTP_201_CREATED,
+)
+@query_budget(3)
+async def create_tasks_bulk(
+    body: TasksBulkCreate,
+    session: AsyncSessionDep,
+    current_user: Principal = Depends(get_current_principal),
+) -> TasksBulkResult:
+    """
+    Create up to `TASK_BULK_MAX_ITEMS` tasks in a single transaction.
+    """
+    service = AsyncTaskService(session)
+    return await service.create_tasks(items=body.items, current_user=current_user)
+
+
+@router.put("/bulk", summary="Update many tasks", response_model=TasksBulkResult)
+@query_budget(5)
+async def update_tasks_bulk(
+    body: TasksBulkUpdate,
+    session: AsyncSessionDep,
+    current_user: Principal = Depends(get_current_principal),
+) -> TasksBulkResult:
+    """
+    Apply several task updates in a single transaction.
+
+    Each result reports `updated`, `not_found` or `forbidden` for the item at
+    the same index; items the user may not change are skipped.
+    """
+    service = AsyncTaskService(session)
+    return await service.update_tasks(items=body.items, current_user=current_user)
+
+
+@router.delete("/bulk", summary="Delete many tasks", response_model=TasksBulkResult)
+@query_budget(5)
+async def delete_tasks_bulk(
+    body: TasksBulkDelete,
+    session: AsyncSessionDep,
+    current_user: Principal = Depends(get_current_principal),
+) -> TasksBulkResult:
+    """
+    Delete several tasks in a single transaction, reporting per-item status.
+    """
+    service = AsyncTaskService(session)
+    return await service.delete_tasks(ids=body.ids, current_user=current_user)
 
 
 @router.get("/{task_id}", response_model=TaskPublic)
-def read_task(
+@query_budget(3)
+async def read_task(
     task_id: uuid.UUID,
-    session: SessionDep,
-    current_user: User = Depends(get_current_user),
-) -> TaskPublic:
+    session: AsyncReadSessionDep,
+    response: Response,
+    current_user: Principal = Depends(get_current_principal),
+    if_none_match: str | None = Header(default=None),
+) -> Task | Response:
     """
     Get task by ID.
+
+    Answers `304 Not Modified` when `If-None-Match` holds the task's current
+    `ETag`.
     """
-    service = TaskService(session)
-    return service.get_task_by_id(task_id=task_id, current_user=current_user)
+    service = AsyncTaskService(session)
+    if if_none_match:
+        etag = await service.get_task_etag(task_id=task_id, current_user=current_user)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+    task = await service.get_task_by_id(task_id=task_id, current_user=current_user)
+    set_etag(response, resource_etag(task.id, task.version))
+    return task
 
 
 @router.post("/", response_model=TaskPublic, status_code=201)
-def create_task(
+@query_budget(2)
+async def create_task(
     task_data: TaskCreate,
-    session: SessionDep,
-    current_user: User = Depends(get_current_user),
+    session: AsyncSessionDep,
+    current_user: Principal = Depends(get_current_principal),
 ) -> TaskPublic:
-    service = TaskService(session)
-    return service.create_task(task_data=task_data, current_user=current_user)
+    service = AsyncTaskService(session)
+    return await service.create_task(task_data=task_data, current_user=current_user)
 
 
 @router.put("/{task_id}", response_model=TaskPublic)
-def update_task(
+@query_budget(3)
+async def update_task(
     *,
-    session: SessionDep,
-    current_user: User = Depends(get_current_user),
+    session: AsyncSessionDep,
+    response: Response,
+    current_user: Principal = Depends(get_current_principal),
     task_id: uuid.UUID,
     task_data: TaskUpdate,
-) -> TaskPublic:
-    service = TaskService(session)
-    return service.update_task(
-        task_id=task_id, task_data=task_data, current_user=current_user
+    if_match: str | None = Header(default=None),
+) -> Task:
+    """
+    Update a task.
+
+    With `If-Match` set to the `ETag` last read, the update only applies if
+    the task is unchanged since; otherwise it fails with `412 Precondition
+    Failed`.
+    """
+    service = AsyncTaskService(session)
+    task = await service.update_task(
+        task_id=task_id,
+        task_data=task_data,
+        current_user=current_user,
+        expected_version=version_from_if_match(if_match, task_id) if if_match else None,
     )
+    set_etag(response, resource_etag(task.id, task.version))
+    return task
 
 
 @router.delete("/{task_id}", response_model=Message)
-def delete_task(
+@query_budget(3)
+async def delete_task(
     task_id: uuid.UUID,
-    session: SessionDep,
-    current_user: User = Depends(get_current_user),
+    session: AsyncSessionDep,
+    current_user: Principal = Depends(get_current_principal),
 ) -> Message:
-    service = TaskService(session)
-    service.delete_task(task_id=task_id, current_user=current_user)
+    service = AsyncTaskService(session)
+    await service.delete_task(task_id=task_id, current_user=current_user)
     return Message(message="Task deleted successfully")
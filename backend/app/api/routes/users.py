@@ -1,9 +1,11 @@
 from typing import Any
 import uuid
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Header, Response, status
 
 from app.auth.dependencies import get_current_active_superuser, get_current_user
-from app.core.db import SessionDep
+from app.core.db import AsyncReadSessionDep, AsyncSessionDep
+from app.core.etag import etag_matches, not_modified, resource_etag, set_etag
+from app.core.query_budget import query_budget
 from app.models import (
     UpdatePassword,
     User,
@@ -15,7 +17,7 @@ from app.models import (
     UsersPublic,
     Message,
 )
-from app.services.user_services import UserService
+from app.services.user_services import AsyncUserService
 
 router = APIRouter(
     prefix="/users",
@@ -33,9 +35,15 @@ router = APIRouter(
         200: {"description": "A list of users"},
     },
 )
-def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> UsersPublic:
-    service = UserService(session)
-    return service.get_users(skip=skip, limit=limit)
+@query_budget(3)
+async def read_users(
+    session: AsyncReadSessionDep,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+) -> UsersPublic:
+    service = AsyncUserService(session)
+    return await service.get_users(skip=skip, limit=limit, cursor=cursor)
 
 
 @router.get(
@@ -44,50 +52,69 @@ def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> UsersPub
     summary="Get current user info",
     status_code=status.HTTP_200_OK,
 )
-def get_my_info(current_user: User = Depends(get_current_user)) -> UserPublic:
+@query_budget(1)
+async def get_my_info(
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    if_none_match: str | None = Header(default=None),
+) -> User | Response:
+    """
+    Get the current user; `304 Not Modified` when `If-None-Match` holds the
+    current `ETag`.
+    """
+    # The principal is already loaded (usually from the cache), so the
+    # version check costs no query at all.
+    etag = resource_etag(current_user.id, current_user.version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     return current_user
 
 
 @router.patch("/me", response_model=UserPublic)
-def update_user_me(
+@query_budget(2)
+async def update_user_me(
     *,
-    session: SessionDep,
+    session: AsyncSessionDep,
     user_data: UserUpdateMe,
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """
     Update own user.
     """
-    service = UserService(session)
-    return service.update_current_user(current_user, user_data)
+    service = AsyncUserService(session)
+    return await service.update_current_user(current_user, user_data)
 
 
 @router.patch("/me/password", response_model=Message)
-def update_password_me(
+@query_budget(4)
+async def update_password_me(
     *,
-    session: SessionDep,
+    session: AsyncSessionDep,
     body: UpdatePassword,
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """
     Update own password.
     """
-    service = UserService(session)
-    return service.update_current_user_password(current_user, body)
+    service = AsyncUserService(session)
+    return await service.update_current_user_password(current_user, body)
 
 
 @router.delete("/me", response_model=Message)
-def delete_user_me(
-    session: SessionDep, current_user: User = Depends(get_current_user)
+@query_budget(2)
+async def delete_user_me(
+    session: AsyncSessionDep, current_user: User = Depends(get_current_user)
 ) -> Any:
-    service = UserService(session)
-    return service.delete_current_user(current_user)
+    service = AsyncUserService(session)
+    return await service.delete_current_user(current_user)
 
 
 @router.post("/signup", response_model=UserPublic)
-def register_user(session: SessionDep, user_data: UserRegister) -> Any:
-    service = UserService(session)
-    return service.register_user(user_data=user_data)
+@query_budget(1)
+async def register_user(session: AsyncSessionDep, user_data: UserRegister) -> Any:
+    service = AsyncUserService(session)
+    return await service.register_user(user_data=user_data)
 
 
 @router.get(
@@ -100,9 +127,10 @@ def register_user(session: SessionDep, user_data: UserRegister) -> Any:
         404: {"description": "User not found"},
     },
 )
-def get_user(session: SessionDep, user_id: uuid.UUID) -> UserPublic:
-    service = UserService(session)
-    return service.get_user_by_id(user_id=user_id)
+@query_budget(1)
+async def get_user(session: AsyncReadSessionDep, user_id: uuid.UUID) -> UserPublic:
+    service = AsyncUserService(session)
+    return await service.get_user_by_id(user_id=user_id)
 
 
 @router.patch(
@@ -110,14 +138,15 @@ def get_user(session: SessionDep, user_id: uuid.UUID) -> UserPublic:
     response_model=UserPublic,
     dependencies=[Depends(get_current_active_superuser)],
 )
-def update_user(
+@query_budget(2)
+async def update_user(
     *,
-    session: SessionDep,
+    session: AsyncSessionDep,
     user_id: uuid.UUID,
     user_data: UserUpdate,
 ) -> Any:
-    service = UserService(session)
-    return service.update_user_by_id(user_id, user_data)
+    service = AsyncUserService(session)
+    return await service.update_user_by_id(user_id, user_data)
 
 
 @router.post(
@@ -132,9 +161,10 @@ def update_user(
         409: {"description": "Email already registered"},
     },
 )
-def create_user(session: SessionDep, user_data: UserCreate) -> UserPublic:
-    service = UserService(session)
-    return service.create_user(user_data=user_data)
+@query_budget(2)
+async def create_user(session: AsyncSessionDep, user_data: UserCreate) -> UserPublic:
+    service = AsyncUserService(session)
+    return await service.create_user(user_data=user_data)
 
 
 @router.delete(
@@ -147,6 +177,7 @@ def create_user(session: SessionDep, user_data: UserCreate) -> UserPublic:
         404: {"description": "User not found"},
     },
 )
-def delete_user(session: SessionDep, user_id: int) -> dict:
-    service = UserService(session)
-    return service.delete_user(user_id=user_id)
+@query_budget(2)
+async def delete_user(session: AsyncSessionDep, user_id: uuid.UUID) -> dict:
+    service = AsyncUserService(session)
+    return await service.delete_user(user_id=user_id)
@@ -0,0 +1,110 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Protocol
+
+from app.core.config import settings
+
+
+class PrincipalCache(Protocol):
+    """Cache of per-user state keyed by the token subject (the user id).
+
+    `principal_cache` entries hold the public columns of `User` as
+    JSON-compatible dicts (`hashed_password` is never cached);
+    `token_version_cache` entries hold {"token_version": n}. The replica
+    router's marks of recent writers (keyed by client, see
+    `app.core.replicas`) are empty dicts.
+    """
+
+    async def get(self, user_id: str) -> dict[str, Any] | None: ...
+
+    async def set(self, user_id: str, data: dict[str, Any]) -> None: ...
+
+    async def invalidate(self, user_id: str) -> None: ...
+
+
+class NullPrincipalCache:
+    async def get(self, user_id: str) -> dict[str, Any] | None:
+        return None
+
+    async def set(self, user_id: str, data: dict[str, Any]) -> None:
+        pass
+
+    async def invalidate(self, user_id: str) -> None:
+        pass
+
+
+class InMemoryPrincipalCache:
+    """Per-process LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+
+    async def get(self, user_id: str) -> dict[str, Any] | None:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return data
+
+    async def set(self, user_id: str, data: dict[str, Any]) -> None:
+        self._entries[user_id] = (time.monotonic() + self.ttl, data)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def invalidate(self, user_id: str) -> None:
+        self._entries.pop(user_id, None)
+
+
+class RedisPrincipalCache:
+    """Cache shared by all workers through any Redis-protocol server."""
+
+    def __init__(self, url: str, ttl: float, key_prefix: str = "principal:"):
+        try:
+            from redis.asyncio import Redis
+        except ImportError:
+            raise RuntimeError(
+                "PRINCIPAL_CACHE_REDIS_URL is set but the 'redis' package is not installed."
+            )
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+        self._client = Redis.from_url(url)
+
+    async def get(self, user_id: str) -> dict[str, Any] | None:
+        raw = await self._client.get(self.key_prefix + user_id)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, user_id: str, data: dict[str, Any]) -> None:
+        await self._client.set(
+            self.key_prefix + user_id, json.dumps(data), px=int(self.ttl * 1000)
+        )
+
+    async def invalidate(self, user_id: str) -> None:
+        await self._client.delete(self.key_prefix + user_id)
+
+
+def build_principal_cache(key_prefix: str = "principal:") -> PrincipalCache:
+    if settings.PRINCIPAL_CACHE_TTL_SECONDS <= 0:
+        return NullPrincipalCache()
+    if settings.PRINCIPAL_CACHE_REDIS_URL:
+        return RedisPrincipalCache(
+            settings.PRINCIPAL_CACHE_REDIS_URL,
+            settings.PRINCIPAL_CACHE_TTL_SECONDS,
+            key_prefix,
+        )
+    return InMemoryPrincipalCache(
+        settings.PRINCIPAL_CACHE_TTL_SECONDS, settings.PRINCIPAL_CACHE_MAX_SIZE
+    )
+
+
+principal_cache = build_principal_cache()
+# Token versions are cached like principals; a revocation takes effect at once
+# in the revoking worker and, without Redis, within the TTL in the others.
+token_version_cache = build_principal_cache("token-version:")
@@ -1,47 +1,137 @@
-from typing import Annotated
+from typing import Annotated, Any
 
 import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from pydantic import ValidationError
+from sqlalchemy.orm import make_transient_to_detached
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.core.db import SessionDep
+from app.auth.cache import principal_cache, token_version_cache
+from app.auth.security import access_tokens
+from app.core.db import AsyncSessionDep
 from app.core.config import settings
-from app.models import User
+from app.models import Principal, TokenPrincipal, User, UserTokenVersion
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/login/access-token")
 
 
 async def get_current_user(
-    token: Annotated[str, Depends(oauth2_scheme)], session: SessionDep
+    token: Annotated[str, Depends(oauth2_scheme)], session: AsyncSessionDep
 ) -> User:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+    return await _user_from_payload(session, _decode_token(token))
+
+
+async def get_current_principal(
+    token: Annotated[str, Depends(oauth2_scheme)], session: AsyncSessionDep
+) -> Principal:
+    """The requesting principal, for routes that only need to authorize it.
+
+    With ACCESS_TOKEN_CLAIMS, a token carrying claims is trusted for the role
+    and status as long as its token version is current, which costs a cached
+    lookup instead of loading the user. Other tokens load the user.
+    """
+    payload = _decode_token(token)
+    if not settings.ACCESS_TOKEN_CLAIMS or "token_version" not in payload:
+        return await _user_from_payload(session, payload)
 
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+        principal = TokenPrincipal.model_validate(
+            {
+                "id": payload["sub"],
+                "is_active": payload["is_active"],
+                "is_superuser": payload["is_superuser"],
+            }
         )
-        if not (user_id := payload.get("sub")):
-            raise credentials_exception
+    except (KeyError, ValidationError):
+        raise _credentials_exception()
+    if not principal.is_active or payload["token_version"] != (
+        await load_token_version(session, str(principal.id))
+    ):
+        raise _credentials_exception()
+    return principal
 
-        if (user := session.get(User, user_id)) is None:
-            raise credentials_exception
 
+async def load_user(session: AsyncSession, user_id: str) -> User | None:
+    """Load the token's user, from `principal_cache` when possible.
+
+    A cached user is attached to the session without a query, so routes can
+    update or delete it like a freshly loaded one. `hashed_password` is not
+    cached and has to be refreshed explicitly before use.
+    """
+    if (cached := await principal_cache.get(user_id)) is not None:
+        user = User.model_validate(cached, update={"hashed_password": ""})
+        make_transient_to_detached(user)
+        user = await session.merge(user, load=False)
+        session.expire(user, ["hashed_password"])
         return user
 
-    except (jwt.InvalidTokenError, ValueError, KeyError):
-        raise credentials_exception
+    user = await session.get(User, user_id)
+    if user is not None:
+        await principal_cache.set(
+            user_id, user.model_dump(mode="json", exclude={"hashed_password"})
+        )
+    return user
+
+
+async def load_token_version(session: AsyncSession, user_id: str) -> int:
+    """The user's current token version, from `token_version_cache` when
+    possible."""
+    if (cached := await token_version_cache.get(user_id)) is not None:
+        return int(cached["token_version"])
+
+    version = await read_token_version(session, user_id)
+    await token_version_cache.set(user_id, {"token_version": version})
+    return version
+
+
+async def read_token_version(session: AsyncSession, user_id: str) -> int:
+    """The user's current token version, read from the database; tokens are
+    issued with this one so that none is minted already revoked."""
+    version = (
+        await session.exec(
+            select(UserTokenVersion.version).where(UserTokenVersion.user_id == user_id)
+        )
+    ).first()
+    return version or 0
 
 
 def get_current_active_superuser(
-    current_user: Annotated[User, Depends(get_current_user)],
-) -> User:
+    current_user: Annotated[Principal, Depends(get_current_principal)],
+) -> Principal:
     if not current_user.is_superuser:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Operation not permitted for this user role.",
         )
     return current_user
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _decode_token(token: str) -> dict[str, Any]:
+    try:
+        payload = access_tokens.decode(token)
+    except jwt.InvalidTokenError:
+        raise _credentials_exception()
+    if not payload.get("sub"):
+        raise _credentials_exception()
+    return payload
+
+
+async def _user_from_payload(session: AsyncSession, payload: dict[str, Any]) -> User:
+    try:
+        user = await load_user(session, str(payload["sub"]))
+    except ValueError:
+        # A subject that is not a UUID.
+        raise _credentials_exception()
+    if user is None:
+        raise _credentials_exception()
+    return user
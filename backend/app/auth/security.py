@@ -1,23 +1,208 @@
+import asyncio
+import contextvars
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from typing import Any, TypeVar
 
-import jwt
 import bcrypt
+import jwt
+from fastapi import HTTPException, status
 
 from app.core.config import settings
+from app.core.metrics import password_hash_timer
+from app.models import Principal
+
+T = TypeVar("T")
+
+
+class AccessTokenCodec:
+    """Sign and verify access tokens with keys parsed once, up front.
+
+    Verified tokens are remembered by their SHA-256 digest, up to
+    `cache_size` of them (0 disables), until they expire: a client sends the
+    same token with every request, and a hit skips the signature check and
+    the claim parsing. Only tokens that passed verification are cached, so a
+    forged or altered one always gets the full check.
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        signing_key: Any,
+        verification_key: Any,
+        cache_size: int = 0,
+    ):
+        self.algorithm = algorithm
+        self.cache_size = cache_size
+        self._signing_key = signing_key
+        self._verification_key = verification_key
+        self._verified: OrderedDict[bytes, tuple[float, dict[str, Any]]] = OrderedDict()
+
+    def encode(self, payload: dict[str, Any]) -> str:
+        if self._signing_key is None:
+            raise RuntimeError(
+                f"Cannot sign {self.algorithm} tokens: JWT_PRIVATE_KEY is not set."
+            )
+        return jwt.encode(payload, self._signing_key, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> dict[str, Any]:
+        """The verified payload, shared between calls: do not modify it.
+
+        Raises `jwt.InvalidTokenError` like `jwt.decode`.
+        """
+        if not self.cache_size:
+            return self._decode(token)
+
+        digest = hashlib.sha256(token.encode()).digest()
+        if (entry := self._verified.get(digest)) is not None:
+            expires_at, payload = entry
+            if time.time() < expires_at:
+                self._verified.move_to_end(digest)
+                return payload
+            # Expired: decode again so that the usual error is raised.
+            del self._verified[digest]
+
+        payload = self._decode(token)
+        self._verified[digest] = (payload.get("exp", math.inf), payload)
+        while len(self._verified) > self.cache_size:
+            self._verified.popitem(last=False)
+        return payload
+
+    def _decode(self, token: str) -> dict[str, Any]:
+        payload: dict[str, Any] = jwt.decode(
+            token, self._verification_key, algorithms=[self.algorithm]
+        )
+        return payload
+
+
+def build_access_token_codec() -> AccessTokenCodec:
+    """The codec for `settings.ALGORITHM`.
+
+    HMAC algorithms (HS256, ...) use SECRET_KEY. Asymmetric ones (EdDSA,
+    ES256, RS256, ...) need the 'crypto' extra and sign with JWT_PRIVATE_KEY;
+    they verify with JWT_PUBLIC_KEY, or the private key's public half.
+    """
+    try:
+        algorithm = jwt.get_algorithm_by_name(settings.ALGORITHM)
+    except NotImplementedError:
+        raise RuntimeError(
+            f"ALGORITHM {settings.ALGORITHM!r} is unknown, or needs the "
+            "'cryptography' package (the 'crypto' extra)."
+        )
+    if isinstance(algorithm, jwt.algorithms.HMACAlgorithm):
+        key = algorithm.prepare_key(settings.SECRET_KEY)
+        signing_key, verification_key = key, key
+    else:
+        signing_key = (
+            algorithm.prepare_key(settings.JWT_PRIVATE_KEY)
+            if settings.JWT_PRIVATE_KEY
+            else None
+        )
+        if settings.JWT_PUBLIC_KEY:
+            verification_key = algorithm.prepare_key(settings.JWT_PUBLIC_KEY)
+        elif signing_key is not None:
+            verification_key = signing_key.public_key()
+        else:
+            raise RuntimeError(
+                f"ALGORITHM {settings.ALGORITHM} needs JWT_PRIVATE_KEY or "
+                "JWT_PUBLIC_KEY."
+            )
+    return AccessTokenCodec(
+        settings.ALGORITHM,
+        signing_key,
+        verification_key,
+        settings.ACCESS_TOKEN_CACHE_SIZE,
+    )
+
+
+access_tokens = build_access_token_codec()
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=15))
     to_encode["exp"] = expire
-    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    return access_tokens.encode(to_encode)
+
+
+def access_token_claims(user: Principal, token_version: int) -> dict[str, Any]:
+    """Claims that let `get_current_principal` authorize without a query."""
+    return {
+        "sub": str(user.id),
+        "is_active": user.is_active,
+        "is_superuser": user.is_superuser,
+        "token_version": token_version,
+    }
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(
-        plain_password.encode("utf-8"), hashed_password.encode("utf-8")
-    )
+    with password_hash_timer("verify"):
+        return bcrypt.checkpw(
+            plain_password.encode("utf-8"), hashed_password.encode("utf-8")
+        )
 
 
 def get_password_hash(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    with password_hash_timer("hash"):
+        salt = bcrypt.gensalt(rounds=settings.PASSWORD_HASH_ROUNDS)
+        return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    # bcrypt hashes look like "$2b$<cost>$<salt+digest>".
+    try:
+        cost = int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    return cost != settings.PASSWORD_HASH_ROUNDS
+
+
+class PasswordHasher:
+    """Run bcrypt on a dedicated, bounded thread pool.
+
+    bcrypt releases the GIL, so a few threads keep hashing off the event loop
+    without competing with the request threadpool. Work beyond
+    `max_pending` is rejected with 503 instead of queueing unboundedly.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="password-hash"
+        )
+
+    async def _run(self, fn: Callable[..., T], *args: str) -> T:
+        # Only touched from the event loop thread, so no lock is needed.
+        if self.pending >= self.max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent password operations, retry shortly.",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            # Executor threads do not inherit the caller's context; copy it so
+            # the time is counted into the request's metrics.
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(self._executor, context.run, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
@@ -0,0 +1,205 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Protocol
+
+from fastapi.responses import JSONResponse
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.clients import client_address, client_key
+from app.core.config import settings
+
+
+class RateLimiter(Protocol):
+    """Token buckets keyed by client.
+
+    A bucket holds up to `burst` tokens and refills at `rate` per second;
+    each request takes one. The state is kept as the time at which the
+    bucket would next be full (GCRA), a single number per key.
+    """
+
+    async def acquire(self, key: str, rate: float, burst: int) -> float:
+        """Take a token: 0 if granted, else the seconds until one is available."""
+        ...
+
+
+def _take_token(
+    full_at: float | None, now: float, rate: float, burst: int
+) -> tuple[float | None, float]:
+    """The bucket's next full-at time and the wait; None leaves it unchanged."""
+    interval = 1 / rate
+    full_at = max(full_at or now, now)
+    if (wait := full_at + interval - burst * interval - now) > 0:
+        return None, wait
+    return full_at + interval, 0.0
+
+
+class InMemoryRateLimiter:
+    """Buckets of this process, the least recently used beyond `max_keys`
+    forgotten (a forgotten bucket is a full one)."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, float] = OrderedDict()
+
+    async def acquire(self, key: str, rate: float, burst: int) -> float:
+        full_at, wait = _take_token(self._buckets.get(key), time.time(), rate, burst)
+        if full_at is not None:
+            self._buckets[key] = full_at
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class RedisRateLimiter:
+    """Buckets shared by all workers through any Redis-protocol server.
+
+    Updates use WATCH/MULTI rather than a script so that servers without
+    Lua, and in-process stand-ins, work too. Workers' clocks must agree.
+    """
+
+    key_prefix = "ratelimit:"
+
+    def __init__(self, url: str):
+        try:
+            from redis.asyncio import Redis
+        except ImportError:
+            raise RuntimeError(
+                "RATE_LIMIT_REDIS_URL is set but the 'redis' package is not installed."
+            )
+        self._client = Redis.from_url(url)
+
+    async def acquire(self, key: str, rate: float, burst: int) -> float:
+        from redis.exceptions import WatchError
+
+        key = self.key_prefix + key
+        async with self._client.pipeline() as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    raw = await pipe.get(key)
+                    now = time.time()
+                    full_at, wait = _take_token(
+                        float(raw) if raw is not None else None, now, rate, burst
+                    )
+                    if full_at is None:
+                        return wait
+                    pipe.multi()
+                    # Expires once full: a missing bucket is a full one.
+                    pipe.set(key, repr(full_at), px=math.ceil((full_at - now) * 1000))
+                    await pipe.execute()
+                    return 0.0
+                except WatchError:
+                    continue
+
+
+def build_rate_limiter() -> RateLimiter:
+    if settings.RATE_LIMIT_REDIS_URL:
+        return RedisRateLimiter(settings.RATE_LIMIT_REDIS_URL)
+    return InMemoryRateLimiter(settings.RATE_LIMIT_MAX_KEYS)
+
+
+class AdmissionMiddleware:
+    """Turn requests away before they reach the database.
+
+    Each client (the user of a valid bearer token, else the IP address)
+    gets a token bucket of `burst` requests refilled at `rate` per second;
+    logins, which cost a bcrypt verification each, are counted in a separate
+    per-IP bucket. Clients out of tokens get 429 with Retry-After.
+
+    Independently, each route runs at most `concurrency` requests at once in
+    this worker (`route_concurrency` overrides it per "METHOD /path", 0
+    exempting a route); requests beyond it get 503 straight away instead of
+    queueing for a pooled connection.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiter: RateLimiter | None = None,
+        rate: float = 0,
+        burst: int = 1,
+        login_path: str | None = None,
+        login_rate: float = 0,
+        login_burst: int = 1,
+        concurrency: int = 0,
+        route_concurrency: dict[str, int] | None = None,
+        retry_after: int = 1,
+    ):
+        self.app = app
+        self.limiter = limiter
+        self.rate = rate
+        self.burst = burst
+        self.login_path = login_path
+        self.login_rate = login_rate
+        self.login_burst = login_burst
+        self.concurrency = concurrency
+        self.route_concurrency = route_concurrency or {}
+        self.retry_after = retry_after
+        self._in_flight: dict[str, int] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self.limiter is not None and (wait := await self._rate_limit(scope)):
+            response = JSONResponse(
+                {"detail": "Too many requests, retry later."},
+                status_code=429,
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+            await response(scope, receive, send)
+            return
+
+        route, limit = None, 0
+        if self.concurrency or self.route_concurrency:
+            if (route := self._route(scope)) is not None:
+                limit = self.route_concurrency.get(route, self.concurrency)
+        if route is None or not limit:
+            await self.app(scope, receive, send)
+            return
+        in_flight = self._in_flight.get(route, 0)
+        if in_flight >= limit:
+            response = JSONResponse(
+                {"detail": "The server is busy, retry shortly."},
+                status_code=503,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        # Only touched from the event loop thread, so no lock is needed.
+        self._in_flight[route] = in_flight + 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._in_flight[route] -= 1
+
+    async def _rate_limit(self, scope: Scope) -> float:
+        assert self.limiter is not None
+        if scope["path"] == self.login_path:
+            if not self.login_rate:
+                return 0.0
+            return await self.limiter.acquire(
+                f"login:{client_address(scope)}", self.login_rate, self.login_burst
+            )
+        if not self.rate:
+            return 0.0
+        return await self.limiter.acquire(client_key(scope), self.rate, self.burst)
+
+    def _route(self, scope: Scope) -> str | None:
+        """The serving route as "METHOD /path", the way limits are keyed.
+
+        Set as the request's route, too, so shed requests are attributed to
+        it in the metrics.
+        """
+        routes: list[BaseRoute] = scope["app"].router.routes
+        for route in routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                scope["route"] = route
+                return f"{scope['method']} {getattr(route, 'path', '')}"
+        return None
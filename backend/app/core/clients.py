@@ -0,0 +1,65 @@
+import ipaddress
+
+import jwt
+from starlette.datastructures import Headers
+from starlette.types import Scope
+
+from app.auth.security import access_tokens
+from app.core.config import settings
+
+_trust_all = "*" in settings.TRUSTED_PROXIES
+_trusted_networks = [
+    ipaddress.ip_network(proxy, strict=False)
+    for proxy in settings.TRUSTED_PROXIES
+    if proxy != "*"
+]
+
+
+def client_address(scope: Scope) -> str:
+    """The client's IP address.
+
+    When the peer is one of TRUSTED_PROXIES, the address comes from
+    X-Forwarded-For instead: its rightmost entry that is not a trusted proxy
+    itself, since entries further left were sent by the client and can be
+    forged.
+    """
+    client = scope.get("client")
+    address = client[0] if client else "unknown"
+    if not _is_trusted(address):
+        return address
+    hops = [
+        hop.strip()
+        for header in Headers(scope=scope).getlist("x-forwarded-for")
+        for hop in header.split(",")
+        if hop.strip()
+    ]
+    for hop in reversed(hops):
+        if not _is_trusted(hop):
+            return hop
+    return hops[0] if hops else address
+
+
+def client_key(scope: Scope) -> str:
+    """The user of a valid bearer token as "user:<id>", else "ip:<address>"."""
+    authorization = Headers(scope=scope).get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            payload = access_tokens.decode(token)
+        except jwt.InvalidTokenError:
+            # Forged tokens must not buy fresh buckets.
+            pass
+        else:
+            if subject := payload.get("sub"):
+                return f"user:{subject}"
+    return f"ip:{client_address(scope)}"
+
+
+def _is_trusted(address: str) -> bool:
+    if _trust_all:
+        return True
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in _trusted_networks)
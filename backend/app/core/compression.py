@@ -0,0 +1,169 @@
+import zlib
+from typing import Any, Protocol
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class _Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+    def finish(self) -> bytes: ...
+
+
+class GzipCompressor:
+    def __init__(self, level: int):
+        # wbits=31 selects the gzip container rather than a raw zlib stream.
+        self._compressor = zlib.compressobj(level, wbits=31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, quality: int):
+        import brotli
+
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """Compress responses with brotli or gzip, whichever the client accepts.
+
+    Like Starlette's GZipMiddleware, bodies shorter than `minimum_size` and
+    responses that already carry a Content-Encoding (exports with `compress`)
+    are sent as is. Unlike it, streamed bodies are flushed chunk by chunk, so
+    clients keep receiving data as it is produced, and event streams are never
+    compressed: the compressor would hold events back.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int,
+        gzip_level: int | None = None,
+        brotli_quality: int | None = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        if brotli_quality is not None:
+            try:
+                import brotli  # noqa: F401
+            except ImportError:
+                raise RuntimeError(
+                    "COMPRESSION_BROTLI is set but the 'brotli' package is not installed."
+                )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accepted = _accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        compressor: _Compressor
+        if self.brotli_quality is not None and ("br" in accepted or "*" in accepted):
+            encoding, compressor = "br", BrotliCompressor(self.brotli_quality)
+        elif self.gzip_level is not None and ("gzip" in accepted or "*" in accepted):
+            encoding, compressor = "gzip", GzipCompressor(self.gzip_level)
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressingSend(send, encoding, compressor, self.minimum_size)
+        await self.app(scope, receive, responder)
+
+
+class _CompressingSend:
+    def __init__(
+        self, send: Send, encoding: str, compressor: _Compressor, minimum_size: int
+    ):
+        self.send = send
+        self.encoding = encoding
+        self.compressor = compressor
+        self.minimum_size = minimum_size
+        self.start: Message | None = None
+        self.compressing = False
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            if "content-encoding" in headers or headers.get(
+                "content-type", ""
+            ).startswith("text/event-stream"):
+                await self.send(message)
+            else:
+                # Held back until the first body chunk decides the headers.
+                self.start = message
+            return
+
+        if message["type"] != "http.response.body" or (
+            self.start is None and not self.compressing
+        ):
+            await self.send(message)
+            return
+
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+        if self.start is not None:
+            start, self.start = self.start, None
+            if not more_body and len(body) < self.minimum_size:
+                await self.send(start)
+                await self.send(message)
+                return
+
+            self.compressing = True
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                body = self.compressor.compress(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(body))
+                await self.send(start)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            await self.send(start)
+
+        compressed = self.compressor.compress(body)
+        compressed += self.compressor.flush() if more_body else self.compressor.finish()
+        reply: dict[str, Any] = {"type": "http.response.body", "body": compressed}
+        if more_body:
+            reply["more_body"] = True
+        await self.send(reply)
+
+
+def _accepted_encodings(header: str) -> set[str]:
+    """Codings of an Accept-Encoding header, without the ones refused with q=0."""
+    accepted = set()
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        name, _, value = params.strip().partition("=")
+        if name.strip().lower() == "q":
+            try:
+                if float(value) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding := coding.strip().lower():
+            accepted.add(coding)
+    return accepted
@@ -1,14 +1,73 @@
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 from typing import Annotated
 
-from fastapi import Depends
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import Pool
 from sqlmodel import Session, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.models import User, UserCreate
 from app.services.user_services import UserService
+from app.core.clients import client_key
 from app.core.config import settings
+from app.core.metrics import (
+    TimedAsyncAdaptedQueuePool,
+    TimedQueuePool,
+    instrument_engine,
+)
+from app.core.replicas import ReplicaRouter, build_recent_writes
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+engine = create_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    poolclass=TimedQueuePool,
+    pool_logging_name="sync",
+    **settings.db_engine_options,
+)
+# psycopg 3 drives both engines; the async one serves the API request path.
+async_engine = create_async_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    poolclass=TimedAsyncAdaptedQueuePool,
+    pool_logging_name="async",
+    **settings.db_engine_options,
+)
+replica_engines = [
+    create_async_engine(
+        str(uri),
+        poolclass=TimedAsyncAdaptedQueuePool,
+        pool_logging_name=f"replica-{index}",
+        **{
+            **settings.db_engine_options,
+            # A connection pooled before the replica went away must fail at
+            # checkout, where the router can still fall back to the primary.
+            "pool_pre_ping": True,
+            "connect_args": {
+                **settings.db_engine_options["connect_args"],
+                "connect_timeout": settings.DB_REPLICA_CONNECT_TIMEOUT_SECONDS,
+            },
+        },
+    )
+    for index, uri in enumerate(settings.DB_REPLICA_URIS)
+]
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+for replica_engine in replica_engines:
+    instrument_engine(replica_engine.sync_engine)
+
+replicas = ReplicaRouter(
+    async_engine,
+    replica_engines,
+    build_recent_writes(),
+    settings.DB_REPLICA_RETRY_SECONDS,
+)
+
+
+def engine_pools() -> dict[str, Pool]:
+    """Every engine's pool by logging name, the key of its metrics."""
+    pools: dict[str, Pool] = {"async": async_engine.pool, "sync": engine.pool}
+    for index, replica_engine in enumerate(replica_engines):
+        pools[f"replica-{index}"] = replica_engine.pool
+    return pools
 
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
@@ -44,3 +103,34 @@ def get_db() -> Generator[Session, None, None]:
 
 
 SessionDep = Annotated[Session, Depends(get_db)]
+
+
+async def get_async_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    if replica_engines and request.method not in ("GET", "HEAD", "OPTIONS"):
+        # Marked before the write so that no read can slip in between.
+        await replicas.note_write(client_key(request.scope))
+    # Attributes must stay loaded after commit: an expired attribute would
+    # trigger an implicit (and forbidden) lazy load outside the greenlet.
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
+
+
+async def get_async_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """A session for read-only routes, on a replica unless the client wrote
+    recently or none is reachable. Its data may lag the primary's."""
+    if not replica_engines:
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+        return
+    connection = await replicas.connect(client_key(request.scope))
+    try:
+        async with AsyncSession(bind=connection, expire_on_commit=False) as session:
+            yield session
+    finally:
+        await connection.close()
+
+
+AsyncReadSessionDep = Annotated[AsyncSession, Depends(get_async_read_db)]
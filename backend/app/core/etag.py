@@ -0,0 +1,69 @@
+import hashlib
+import uuid
+from collections.abc import Iterable
+
+from fastapi import Response, status
+
+# Responses are per user, and clients must revalidate before every reuse.
+CACHE_CONTROL = "private, no-cache"
+
+
+def resource_etag(resource_id: uuid.UUID, version: int) -> str:
+    """Strong ETag of a single versioned row."""
+    return f'"{resource_id}-{version}"'
+
+
+def collection_etag(
+    count: int | None, has_more: bool, rows: Iterable[tuple[uuid.UUID, int]]
+) -> str:
+    """
+    Strong ETag of a page, from everything its representation depends on:
+    the total, whether a next page exists, and the (id, version) of each row.
+    """
+    digest = hashlib.blake2b(f"{count}|{has_more}".encode(), digest_size=16)
+    for resource_id, version in rows:
+        digest.update(f"|{resource_id}-{version}".encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    """Weak comparison against an If-None-Match header (RFC 9110 13.1.2)."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag for candidate in header.split(",")
+    )
+
+
+def version_from_if_match(header: str, resource_id: uuid.UUID) -> int | None:
+    """
+    Version named by an If-Match header for a resource, or None for `*`.
+
+    Returns -1, which never matches a stored version, when no tag names a
+    current version of this resource; If-Match uses strong comparison, so weak
+    tags never match.
+    """
+    if header.strip() == "*":
+        return None
+    prefix = f'"{resource_id}-'
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith(prefix) and candidate.endswith('"'):
+            version = candidate[len(prefix) : -1]
+            if version.isdigit():
+                return int(version)
+    return -1
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": CACHE_CONTROL},
+    )
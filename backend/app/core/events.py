@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import uuid
+from collections.abc import AsyncIterator, Iterable, Iterator
+from contextlib import asynccontextmanager
+
+import psycopg
+from fastapi import HTTPException, status
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Must match the channel of the task_notify_change trigger, whose payloads
+# read "<event> <owner_id> <json>". Writes of many tasks in one statement
+# notify "resync <owner_id> {}" instead, "*" standing for every owner.
+TASK_EVENTS_CHANNEL = "task_events"
+
+# Server-sent events frames. A client catches up through /tasks/changes when
+# the stream opens (ready) and whenever events had to be dropped or were
+# never sent (resync).
+READY = b"event: ready\ndata: {}\n\n"
+RESYNC = b"event: resync\ndata: {}\n\n"
+HEARTBEAT = b": keep-alive\n\n"
+
+
+class Subscription:
+    """Events for one open stream, buffered up to `max_size` frames.
+
+    A client that reads slower than its tasks change would otherwise buffer
+    without bound; once the queue is full its backlog is dropped for a single
+    resync frame, and delivery resumes after the client has read it.
+    """
+
+    def __init__(self, owner_id: uuid.UUID | None, max_size: int):
+        self.owner_id = owner_id
+        self._queue: asyncio.Queue[bytes] = asyncio.Queue(max_size)
+        self._resyncing = False
+
+    def push(self, frame: bytes) -> None:
+        if self._resyncing:
+            return
+        try:
+            self._queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.resync()
+
+    def resync(self) -> None:
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(RESYNC)
+        self._resyncing = True
+
+    async def next_frame(self, timeout: float) -> bytes:
+        """The next frame, or a heartbeat after `timeout` seconds of silence."""
+        try:
+            frame = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return HEARTBEAT
+        if frame is RESYNC:
+            self._resyncing = False
+        return frame
+
+
+class TaskEventBroker:
+    """Fan task events out to every open stream of this worker.
+
+    One LISTEN connection per process, opened on the first subscription and
+    kept outside the engine's pool, receives the notifications of all task
+    writes; each is encoded once and queued on the subscriptions of its owner
+    and of superusers (subscribed with `owner_id=None`).
+    """
+
+    def __init__(self, conninfo: str, queue_size: int):
+        self.conninfo = conninfo
+        self.queue_size = queue_size
+        self._subscriptions: dict[uuid.UUID | None, set[Subscription]] = {}
+        self._listener: asyncio.Task[None] | None = None
+        self._listening = asyncio.Event()
+
+    @property
+    def subscription_count(self) -> int:
+        return sum(len(group) for group in self._subscriptions.values())
+
+    async def wait_listening(self, timeout: float = 5.0) -> None:
+        """Start the listener if needed; 503 if it cannot LISTEN in time."""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        try:
+            await asyncio.wait_for(self._listening.wait(), timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Task events are temporarily unavailable, retry shortly.",
+                headers={"Retry-After": "5"},
+            )
+
+    @asynccontextmanager
+    async def subscribe(
+        self, owner_id: uuid.UUID | None
+    ) -> AsyncIterator[Subscription]:
+        subscription = Subscription(owner_id, self.queue_size)
+        group = self._subscriptions.setdefault(owner_id, set())
+        group.add(subscription)
+        try:
+            yield subscription
+        finally:
+            group.discard(subscription)
+            if not group and self._subscriptions.get(owner_id) is group:
+                del self._subscriptions[owner_id]
+
+    # ---------- Private Methods ----------
+
+    async def _listen(self) -> None:
+        delay = 0.5
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    self.conninfo, autocommit=True, keepalives_idle=30
+                ) as connection:
+                    await connection.execute(f"LISTEN {TASK_EVENTS_CHANNEL}")
+                    # Whatever was notified while no connection was listening
+                    # is lost, so streams that stayed open have to catch up.
+                    for group in self._subscriptions.values():
+                        for subscription in group:
+                            subscription.resync()
+                    self._listening.set()
+                    delay = 0.5
+                    async for notify in connection.notifies():
+                        self._dispatch(notify.payload)
+            except Exception:
+                logger.exception("Task events listener lost its connection")
+            self._listening.clear()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    def _dispatch(self, payload: str) -> None:
+        event, owner_id, data = payload.split(" ", 2)
+        if event == "resync":
+            # A bulk write: whatever is still queued is stale too.
+            for subscription in self._subscribers(owner_id):
+                subscription.resync()
+            return
+        frame = f"event: {event}\ndata: {data}\n\n".encode()
+        for subscription in self._subscribers(owner_id):
+            subscription.push(frame)
+
+    def _subscribers(self, owner_id: str) -> Iterator[Subscription]:
+        """The streams of the owner and of superusers; all streams for "*"."""
+        if owner_id == "*":
+            keys: Iterable[uuid.UUID | None] = list(self._subscriptions)
+        else:
+            keys = (uuid.UUID(owner_id), None)
+        for key in keys:
+            yield from self._subscriptions.get(key, ())
+
+
+task_events = TaskEventBroker(
+    make_url(str(settings.SQLALCHEMY_DATABASE_URI))
+    .set(drivername="postgresql")
+    .render_as_string(hide_password=False),
+    settings.TASK_EVENTS_QUEUE_SIZE,
+)
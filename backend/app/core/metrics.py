@@ -0,0 +1,379 @@
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from sqlalchemy import Engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import (
+    AsyncAdaptedQueuePool,
+    Pool,
+    PoolProxiedConnection,
+    QueuePool,
+)
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Seconds; tuned for connection checkout, where anything above a few hundred
+# milliseconds already means the pool is saturated, and used for request and
+# query latencies alike.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Statements per request. Past a handful on a single-resource route, this is
+# usually an N+1 pattern.
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds, safe to share across threads."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, counts, strict=False):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = cumulative + counts[-1]
+        return {"buckets": buckets, "count": buckets["+Inf"], "sum": total}
+
+
+class RequestMetrics:
+    """Work done on behalf of a request (or any block, see `measure`).
+
+    Work is also added to the enclosing measurement, so nested ones see
+    their own share while the request keeps its totals.
+    """
+
+    def __init__(self, parent: "RequestMetrics | None" = None) -> None:
+        self.parent = parent
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        self.password_hash_seconds = 0.0
+
+    def add_query(self, seconds: float) -> None:
+        metrics: RequestMetrics | None = self
+        while metrics is not None:
+            metrics.db_queries += 1
+            metrics.db_seconds += seconds
+            metrics = metrics.parent
+
+    def add_pool_wait(self, seconds: float) -> None:
+        metrics: RequestMetrics | None = self
+        while metrics is not None:
+            metrics.pool_wait_seconds += seconds
+            metrics = metrics.parent
+
+    def add_password_hash(self, seconds: float) -> None:
+        metrics: RequestMetrics | None = self
+        while metrics is not None:
+            metrics.password_hash_seconds += seconds
+            metrics = metrics.parent
+
+
+# Set by `measure` (MetricsMiddleware measures every request); copied into
+# the greenlets of the async engine and the threads that run sync work.
+_request_metrics: ContextVar[RequestMetrics | None] = ContextVar(
+    "request_metrics", default=None
+)
+
+
+@contextmanager
+def measure() -> Iterator[RequestMetrics]:
+    """Collect the statements, pool waits and hashing done inside the block."""
+    metrics = RequestMetrics(parent=_request_metrics.get())
+    token = _request_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _request_metrics.reset(token)
+
+
+class RouteMetrics:
+    def __init__(self) -> None:
+        self.duration_seconds = Histogram()
+        self.db_queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_seconds = Histogram()
+
+
+# Keyed by (method, route template, status code); raw paths would give every
+# task id its own series.
+_route_metrics: dict[tuple[str, str, str], RouteMetrics] = {}
+_query_seconds = Histogram()
+_password_hash_seconds: dict[str, Histogram] = {}
+
+
+class MetricsMiddleware:
+    """Record each request's latency and database work under its route.
+
+    With `server_timing`, the request's totals so far are also sent back in a
+    Server-Timing header, for debugging from the browser's network panel.
+    """
+
+    def __init__(self, app: ASGIApp, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_metrics(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing",
+                        server_timing(metrics, time.perf_counter() - start),
+                    )
+            await send(message)
+
+        with measure() as metrics:
+            try:
+                await self.app(scope, receive, send_with_metrics)
+            finally:
+                # Set by the router on match; unmatched paths share one series.
+                route = getattr(scope.get("route"), "path", "unmatched")
+                route_metrics = _route_metrics.setdefault(
+                    (scope["method"], route, str(status_code)), RouteMetrics()
+                )
+                route_metrics.duration_seconds.observe(time.perf_counter() - start)
+                route_metrics.db_queries.observe(metrics.db_queries)
+                route_metrics.db_seconds.observe(metrics.db_seconds)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement, and count it into the current request's metrics."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_query(conn: Any, *_args: Any) -> None:
+        conn.info["query_started_at"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finish_query(conn: Any, *_args: Any) -> None:
+        _record_query(conn.info.pop("query_started_at"))
+
+    # Failed statements, such as INSERTs that unique indexes reject, were
+    # still round trips.
+    @event.listens_for(engine, "handle_error")
+    def _fail_query(context: Any) -> None:
+        conn = context.connection
+        if conn is not None and "query_started_at" in conn.info:
+            _record_query(conn.info.pop("query_started_at"))
+
+
+def _record_query(started_at: float) -> None:
+    elapsed = time.perf_counter() - started_at
+    _query_seconds.observe(elapsed)
+    if (metrics := _request_metrics.get()) is not None:
+        metrics.add_query(elapsed)
+
+
+@contextmanager
+def password_hash_timer(operation: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _password_hash_seconds.setdefault(operation, Histogram()).observe(elapsed)
+        if (metrics := _request_metrics.get()) is not None:
+            metrics.add_password_hash(elapsed)
+
+
+class PoolMetrics:
+    def __init__(self) -> None:
+        self.wait_seconds = Histogram()
+        self.timeouts = 0
+
+
+_pool_metrics: dict[str, PoolMetrics] = {}
+
+
+def get_pool_metrics(name: str) -> PoolMetrics:
+    return _pool_metrics.setdefault(name, PoolMetrics())
+
+
+class _TimedCheckoutMixin:
+    """Record how long callers wait to check a connection out of the pool.
+
+    Metrics are keyed by the pool's logging name (the engine's
+    `pool_logging_name`) so they survive `Pool.recreate()` on dispose.
+    """
+
+    _orig_logging_name: str | None
+
+    def connect(self) -> PoolProxiedConnection:
+        metrics = get_pool_metrics(self._orig_logging_name or "default")
+        start = time.perf_counter()
+        try:
+            return super().connect()  # type: ignore[misc]
+        except PoolTimeoutError:
+            metrics.timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.wait_seconds.observe(elapsed)
+            if (request := _request_metrics.get()) is not None:
+                request.add_pool_wait(elapsed)
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_stats(name: str, pool: Pool) -> dict[str, Any]:
+    metrics = get_pool_metrics(name)
+    stats: dict[str, Any] = {"name": name}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    stats.update(
+        timeouts=metrics.timeouts, wait_seconds=metrics.wait_seconds.snapshot()
+    )
+    return stats
+
+
+def server_timing(metrics: RequestMetrics, elapsed: float) -> str:
+    """Server-Timing header value; durations are in milliseconds."""
+    entries = [
+        f'db;dur={metrics.db_seconds * 1000:.1f};desc="{metrics.db_queries} queries"',
+        f"db-pool;dur={metrics.pool_wait_seconds * 1000:.1f}",
+    ]
+    if metrics.password_hash_seconds:
+        entries.append(f"password-hash;dur={metrics.password_hash_seconds * 1000:.1f}")
+    entries.append(f"total;dur={elapsed * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def render_prometheus(
+    pools: dict[str, Pool], gauges: dict[str, tuple[str, float]]
+) -> str:
+    """
+    Every metric of this process in the Prometheus text format.
+
+    Metrics are kept per worker process; with several workers each scrape
+    sees one of them, told apart by the scraper's instance labels only if
+    workers are scraped individually.
+    """
+    lines: list[str] = []
+
+    def histogram(
+        name: str, help: str, series: list[tuple[dict[str, str], Histogram]]
+    ) -> None:
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, hist in series:
+            snapshot = hist.snapshot()
+            for bound, count in snapshot["buckets"].items():
+                lines.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {snapshot['sum']}")
+            lines.append(f"{name}_count{_labels(labels)} {snapshot['count']}")
+
+    def gauge(name: str, help: str, series: list[tuple[dict[str, str], float]]) -> None:
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in series:
+            lines.append(f"{name}{_labels(labels)} {value}")
+
+    routes = sorted(_route_metrics.items())
+    route_labels = [
+        ({"method": method, "route": route, "status": status}, metrics)
+        for (method, route, status), metrics in routes
+    ]
+    histogram(
+        "http_request_duration_seconds",
+        "Time to serve a request, until its last body chunk.",
+        [(labels, metrics.duration_seconds) for labels, metrics in route_labels],
+    )
+    histogram(
+        "http_request_db_queries",
+        "SQL statements executed per request.",
+        [(labels, metrics.db_queries) for labels, metrics in route_labels],
+    )
+    histogram(
+        "http_request_db_duration_seconds",
+        "Time spent executing SQL statements per request.",
+        [(labels, metrics.db_seconds) for labels, metrics in route_labels],
+    )
+    histogram(
+        "db_query_duration_seconds",
+        "Time to execute one SQL statement.",
+        [({}, _query_seconds)],
+    )
+    histogram(
+        "db_pool_wait_seconds",
+        "Time waited to check a connection out of the pool.",
+        [({"pool": name}, get_pool_metrics(name).wait_seconds) for name in pools],
+    )
+    lines.append("# HELP db_pool_timeouts_total Pool checkouts that timed out.")
+    lines.append("# TYPE db_pool_timeouts_total counter")
+    for name in pools:
+        lines.append(
+            f"db_pool_timeouts_total{_labels({'pool': name})} "
+            f"{get_pool_metrics(name).timeouts}"
+        )
+    gauge(
+        "db_pool_connections",
+        "Open connections of the pool, idle (checked_in) or in use.",
+        [
+            ({"pool": name, "state": state}, stats[state])
+            for name, pool in pools.items()
+            for stats in [pool_stats(name, pool)]
+            for state in ("checked_in", "checked_out")
+            if state in stats
+        ],
+    )
+    histogram(
+        "password_hash_duration_seconds",
+        "Time spent in bcrypt, by operation.",
+        [
+            ({"operation": operation}, hist)
+            for operation, hist in sorted(_password_hash_seconds.items())
+        ],
+    )
+    for name, (help, value) in gauges.items():
+        gauge(name, help, [({}, value)])
+    return "\n".join(lines) + "\n"
+
+
+def _labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,129 @@
+import logging
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any, Literal, TypeVar
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import RequestMetrics, measure
+
+logger = logging.getLogger(__name__)
+
+_EndpointT = TypeVar("_EndpointT", bound=Callable[..., Any])
+
+_BUDGET_ATTRIBUTE = "__query_budget__"
+
+
+class QueryBudgetExceeded(AssertionError):
+    """More SQL statements ran than budgeted; an AssertionError so test
+    runners report it as a failure rather than an error."""
+
+
+def query_budget(limit: int | None) -> Callable[[_EndpointT], _EndpointT]:
+    """
+    Declare the most SQL statements a route may execute per request.
+
+    Budgets count the principal lookup that `get_current_user` runs when its
+    cache misses. `None` declares a route whose statements grow with its
+    input by design (one transaction per import batch), exempting it.
+    Apply below the router decorator.
+    """
+
+    def declare(endpoint: _EndpointT) -> _EndpointT:
+        setattr(endpoint, _BUDGET_ATTRIBUTE, limit)
+        return endpoint
+
+    return declare
+
+
+@contextmanager
+def assert_max_queries(
+    limit: int, description: str = "block"
+) -> Iterator[RequestMetrics]:
+    """
+    Raise `QueryBudgetExceeded` if the block runs more than `limit`
+    statements, e.g. `with assert_max_queries(2): client.get("/tasks/")`.
+    """
+    with measure() as metrics:
+        yield metrics
+    if metrics.db_queries > limit:
+        raise QueryBudgetExceeded(
+            f"{description} executed {metrics.db_queries} SQL statements, "
+            f"over its budget of {limit}"
+        )
+
+
+class QueryBudgetMiddleware:
+    """Development guard checking each request against its route's budget.
+
+    Overruns are logged with "warn". With "raise", a response whose handler
+    overran its budget is replaced by a 500 that names the route, so an N+1
+    regression fails the first request that exercises it. Statements run
+    while a body is streamed are only counted once it has been sent, and
+    logged. Routes without a declared budget are only logged, in either mode.
+    """
+
+    def __init__(self, app: ASGIApp, mode: Literal["warn", "raise"]):
+        self.app = app
+        self.mode = mode
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        replaced = False
+
+        async def send_checked(message: Message) -> None:
+            nonlocal replaced
+            if replaced:
+                return
+            if message["type"] == "http.response.start" and self.mode == "raise":
+                if overrun := _check(scope, metrics):
+                    replaced = True
+                    response = JSONResponse(
+                        {"detail": overrun},
+                        status_code=500,
+                    )
+                    await response(scope, receive, send)
+                    return
+            await send(message)
+
+        with measure() as metrics:
+            await self.app(scope, receive, send_checked)
+
+        if problem := _check(scope, metrics) or _undeclared(scope, metrics):
+            logger.warning(problem)
+
+
+def _check(scope: Scope, metrics: RequestMetrics) -> str | None:
+    """Why the request overran its route's budget; None if it did not."""
+    if (route := _api_route(scope)) is None:
+        return None
+    limit = getattr(route.endpoint, _BUDGET_ATTRIBUTE, None)
+    if limit is not None and metrics.db_queries > limit:
+        return (
+            f"{scope['method']} {route.path} executed {metrics.db_queries} SQL "
+            f"statements, over its budget of {limit}"
+        )
+    return None
+
+
+def _undeclared(scope: Scope, metrics: RequestMetrics) -> str | None:
+    """A note that the route declared no budget, which is logged only."""
+    if (route := _api_route(scope)) is None:
+        return None
+    if hasattr(route.endpoint, _BUDGET_ATTRIBUTE):
+        return None
+    return (
+        f"{scope['method']} {route.path} has no declared query budget "
+        f"({metrics.db_queries} SQL statements)"
+    )
+
+
+def _api_route(scope: Scope) -> APIRoute | None:
+    route = scope.get("route")
+    # Unmatched paths and the docs, which run no statements, have none.
+    return route if isinstance(route, APIRoute) else None
@@ -0,0 +1,77 @@
+import logging
+import time
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.auth.cache import (
+    InMemoryPrincipalCache,
+    PrincipalCache,
+    RedisPrincipalCache,
+)
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaRouter:
+    """Pick the database of read-only sessions.
+
+    Reads go to the replicas in turn, except for clients marked by
+    `note_write`, who read from the primary while the mark lasts (the
+    `recent_writes` TTL) so that replication lag cannot hide their own
+    writes. A replica that fails to connect is skipped for `retry_after`
+    seconds, its reads falling back to the primary; the first read after
+    that tries it again.
+    """
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: list[AsyncEngine],
+        recent_writes: PrincipalCache,
+        retry_after: float,
+    ):
+        self.primary = primary
+        self.replicas = replicas
+        self.recent_writes = recent_writes
+        self.retry_after = retry_after
+        self._turn = 0
+        self._down_until = [0.0] * len(replicas)
+
+    async def note_write(self, client: str) -> None:
+        if self.replicas:
+            await self.recent_writes.set(client, {})
+
+    async def connect(self, client: str) -> AsyncConnection:
+        """A connection for `client`'s reads: a healthy replica's if the
+        client has not written recently, else the primary's."""
+        if self.replicas and await self.recent_writes.get(client) is None:
+            for _ in self.replicas:
+                index = self._turn % len(self.replicas)
+                self._turn += 1
+                if self._down_until[index] > time.monotonic():
+                    continue
+                try:
+                    return await self.replicas[index].connect()
+                except OperationalError:
+                    logger.warning(
+                        "Replica %d is unreachable, reading from the primary for %ss",
+                        index,
+                        self.retry_after,
+                        exc_info=True,
+                    )
+                    self._down_until[index] = time.monotonic() + self.retry_after
+        return await self.primary.connect()
+
+
+def build_recent_writes() -> PrincipalCache:
+    if settings.PRINCIPAL_CACHE_REDIS_URL:
+        return RedisPrincipalCache(
+            settings.PRINCIPAL_CACHE_REDIS_URL,
+            settings.DB_REPLICA_STICKY_SECONDS,
+            "recent-write:",
+        )
+    return InMemoryPrincipalCache(
+        settings.DB_REPLICA_STICKY_SECONDS, settings.PRINCIPAL_CACHE_MAX_SIZE
+    )
@@ -0,0 +1,86 @@
+import argparse
+import asyncio
+import logging
+import uuid
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.db import async_engine
+from app.models import TaskFileFormat, User
+from app.services.task_import_services import AsyncTaskImportService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+async def read_chunks(path: Path) -> AsyncIterator[bytes]:
+    with path.open("rb") as file:
+        while chunk := await asyncio.to_thread(file.read, CHUNK_SIZE):
+            yield chunk
+
+
+async def run(
+    path: Path, owner_email: str, format: TaskFileFormat, job_id: uuid.UUID | None
+) -> None:
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        owner = (
+            await session.exec(select(User).where(User.email == owner_email))
+        ).first()
+        if not owner:
+            raise SystemExit(f"No user with email {owner_email}")
+
+        service = AsyncTaskImportService(session)
+        if job_id is None:
+            job = await service.create_job(format=format, current_user=owner)
+            logger.info("Created import job %s", job.id)
+        else:
+            job = await service.get_job(job_id=job_id, current_user=owner)
+            logger.info(
+                "Resuming import job %s after record %s", job.id, job.records_processed
+            )
+
+        try:
+            job = await service.run_job(
+                job_id=job.id, chunks=read_chunks(path), current_user=owner
+            )
+        except BaseException:
+            logger.error("Import stopped; resume with --job %s", job.id)
+            raise
+
+    logger.info(
+        "Processed %s records: %s imported, %s rejected",
+        job.records_processed,
+        job.imported,
+        job.rejected,
+    )
+    for error in job.errors:
+        logger.warning("Record %s rejected: %s", error["record"], error["error"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Import tasks from an NDJSON or CSV file."
+    )
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--owner", required=True, help="email of the tasks' owner")
+    parser.add_argument(
+        "--format",
+        type=TaskFileFormat,
+        help="defaults to the file extension (.csv, otherwise ndjson)",
+    )
+    parser.add_argument("--job", type=uuid.UUID, help="resume this import job")
+    args = parser.parse_args()
+
+    format = args.format or (
+        TaskFileFormat.csv if args.path.suffix == ".csv" else TaskFileFormat.ndjson
+    )
+    asyncio.run(run(args.path, args.owner, format, args.job))
+
+
+if __name__ == "__main__":
+    main()
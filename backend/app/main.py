@@ -2,11 +2,17 @@ import sentry_sdk
 
 
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.routing import APIRoute
 
 
 from app.api.main import api_router
+from app.api.routes import metrics
+from app.core.admission import AdmissionMiddleware, build_rate_limiter
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.metrics import MetricsMiddleware
+from app.core.query_budget import QueryBudgetMiddleware
 from starlette.middleware.cors import CORSMiddleware
 
 
@@ -22,8 +28,47 @@ app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    default_response_class=(
+        ORJSONResponse if settings.JSON_RESPONSE_CLASS == "orjson" else JSONResponse
+    ),
 )
 
+if settings.COMPRESSION_GZIP or settings.COMPRESSION_BROTLI:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=(
+            settings.COMPRESSION_GZIP_LEVEL if settings.COMPRESSION_GZIP else None
+        ),
+        brotli_quality=(
+            settings.COMPRESSION_BROTLI_QUALITY if settings.COMPRESSION_BROTLI else None
+        ),
+    )
+
+if settings.QUERY_BUDGET_MODE != "off":
+    app.add_middleware(QueryBudgetMiddleware, mode=settings.QUERY_BUDGET_MODE)
+
+rate_limited = settings.RATE_LIMIT_PER_SECOND or settings.RATE_LIMIT_LOGIN_PER_MINUTE
+if (
+    rate_limited
+    or settings.ROUTE_CONCURRENCY_LIMIT
+    or settings.ROUTE_CONCURRENCY_LIMITS
+):
+    app.add_middleware(
+        AdmissionMiddleware,
+        limiter=build_rate_limiter() if rate_limited else None,
+        rate=settings.RATE_LIMIT_PER_SECOND,
+        burst=settings.RATE_LIMIT_BURST,
+        login_path=f"{settings.API_V1_STR}/login/access-token",
+        login_rate=settings.RATE_LIMIT_LOGIN_PER_MINUTE / 60,
+        login_burst=settings.RATE_LIMIT_LOGIN_BURST,
+        concurrency=settings.ROUTE_CONCURRENCY_LIMIT,
+        route_concurrency=settings.ROUTE_CONCURRENCY_LIMITS,
+        retry_after=settings.ROUTE_CONCURRENCY_RETRY_AFTER_SECONDS,
+    )
+
+# Outside admission control, so that browsers can read its 429 and 503
+# responses (and their Retry-After) instead of seeing a CORS failure.
 if settings.all_cors_origins:
     app.add_middleware(
         CORSMiddleware,
@@ -31,7 +76,15 @@ if settings.all_cors_origins:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["Retry-After"],
     )
 
+# Added last so it wraps the others (shed requests included) and times the
+# whole response.
+app.add_middleware(MetricsMiddleware, server_timing=settings.SERVER_TIMING_ENABLED)
+
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
+if settings.METRICS_ENABLED:
+    # Outside the API prefix, where scrapers look by default.
+    app.include_router(metrics.router)
@@ -1,7 +1,11 @@
 import uuid
+from datetime import datetime
 from enum import Enum
+from typing import Any, Protocol
 from pydantic import EmailStr
-from sqlmodel import Relationship, SQLModel, Field
+from sqlalchemy import BigInteger, ColumnElement, DateTime, Index, func, literal_column
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import Relationship, SQLModel, Field, col
 
 
 class TaskStatus(str, Enum):
@@ -11,6 +15,26 @@ class TaskStatus(str, Enum):
     suspended = "suspended"
 
 
+class TaskSort(str, Enum):
+    id = "id"
+    id_desc = "-id"
+    title = "title"
+    title_desc = "-title"
+    status = "status"
+    status_desc = "-status"
+
+
+class CountMode(str, Enum):
+    exact = "exact"
+    estimated = "estimated"
+    none = "none"
+
+
+class TaskFileFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
 class UserBase(SQLModel):
     email: EmailStr = Field(index=True, unique=True, max_length=255)
     is_active: bool = Field(default=True)
@@ -46,16 +70,84 @@ class UpdatePassword(SQLModel):
 class User(UserBase, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     hashed_password: str = Field(nullable=False)
+    # Maintained by AsyncTaskService on create/delete so per-owner listings can
+    # report an exact total without counting rows.
+    task_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    # Bumped whenever a UserPublic field changes; backs the ETag of /users/me.
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
     tasks: list["Task"] = Relationship(back_populates="owner", cascade_delete=True)
 
 
+class UserTokenVersion(SQLModel, table=True):
+    """A user's token version, embedded in access tokens that carry claims.
+
+    Bumped to revoke the user's outstanding tokens (password change, role or
+    status change, deletion); users never revoked have no row and version 0.
+    """
+
+    __tablename__ = "user_token_version"
+
+    # Not a foreign key: the row outlives a deleted user to reject their tokens.
+    user_id: uuid.UUID = Field(primary_key=True)
+    version: int
+
+
+class RefreshToken(SQLModel, table=True):
+    """A refresh token, single-use: exchanging it issues its successor.
+
+    Only the SHA-256 digest is stored; tokens are random, so neither a salt
+    nor a slow hash is needed. Used tokens are kept until they expire, so
+    that replaying any of them revokes the whole family.
+    """
+
+    __tablename__ = "refresh_token"
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    token_hash: str = Field(max_length=64, unique=True, index=True)
+    user_id: uuid.UUID = Field(
+        foreign_key="user.id", nullable=False, ondelete="CASCADE", index=True
+    )
+    # Every token rotated from the same login.
+    family_id: uuid.UUID = Field(index=True)
+    # The user's token version at login: revoking access tokens revokes these.
+    token_version: int
+    # Indexed for pruning expired tokens of all users.
+    expires_at: datetime = Field(
+        sa_type=DateTime(timezone=True),  # type: ignore[call-overload]
+        nullable=False,
+        index=True,
+    )
+    used_at: datetime | None = Field(
+        default=None,
+        sa_type=DateTime(timezone=True),  # type: ignore[call-overload]
+    )
+
+
+class Principal(Protocol):
+    """Who a request acts for: a loaded `User`, or a `TokenPrincipal`."""
+
+    id: uuid.UUID
+    is_active: bool
+    is_superuser: bool
+
+
+class TokenPrincipal(SQLModel):
+    """A principal built from the claims of an access token, without a query."""
+
+    id: uuid.UUID
+    is_active: bool
+    is_superuser: bool
+
+
 class UserPublic(UserBase):
     id: uuid.UUID
+    version: int
 
 
 class UsersPublic(SQLModel):
     data: list[UserPublic]
     count: int
+    next_cursor: str | None = None
 
 
 class TaskBase(SQLModel):
@@ -74,19 +166,172 @@ class TaskUpdate(TaskBase):
 
 
 class Task(TaskBase, table=True):
+    __table_args__ = (
+        # Owner listings (filtered by owner, ordered by id) and the lookups
+        # behind cascade deletes from User.tasks.
+        Index("ix_task_owner_id_id", "owner_id", "id"),
+        # Status filters and the whitelisted sort orders, per owner and for
+        # superusers listing every task; id is the keyset tiebreaker.
+        Index("ix_task_owner_id_status_id", "owner_id", "status", "id"),
+        Index("ix_task_owner_id_title_id", "owner_id", "title", "id"),
+        Index("ix_task_status_id", "status", "id"),
+        Index("ix_task_title_id", "title", "id"),
+        # Delta sync (/tasks/changes), per owner and for superusers.
+        Index("ix_task_owner_id_change_xid_id", "owner_id", "change_xid", "id"),
+        Index("ix_task_change_xid_id", "change_xid", "id"),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     owner_id: uuid.UUID = Field(foreign_key="user.id", nullable=False)
+    # Bumped on every update; backs ETags and If-Match on PUT /tasks/{id}.
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
+    # Id of the transaction that last wrote the row, stamped by the
+    # task_track_change trigger on every insert and update.
+    change_xid: int = Field(
+        default=0, sa_type=BigInteger, sa_column_kwargs={"server_default": "0"}
+    )
     owner: User | None = Relationship(back_populates="tasks")
 
 
+def task_search_vector() -> ColumnElement[Any]:
+    """Full-text document for a task; must match the ix_task_search index."""
+    return func.to_tsvector(
+        literal_column("'simple'::regconfig"),
+        col(Task.title)
+        .op("||")(literal_column("' '"))
+        .op("||")(func.coalesce(Task.description, literal_column("''"))),
+    )
+
+
+Index("ix_task_search", task_search_vector(), postgresql_using="gin")
+
+
 class TaskPublic(TaskBase):
     id: uuid.UUID
     owner_id: uuid.UUID
+    version: int
 
 
 class TasksPublic(SQLModel):
     data: list[TaskPublic]
-    count: int
+    count: int | None
+    next_cursor: str | None = None
+
+
+class BulkItemStatus(str, Enum):
+    created = "created"
+    updated = "updated"
+    deleted = "deleted"
+    not_found = "not_found"
+    forbidden = "forbidden"
+
+
+class TaskBulkUpdateItem(TaskUpdate):
+    id: uuid.UUID
+
+
+class TasksBulkCreate(SQLModel):
+    items: list[TaskCreate] = Field(min_length=1)
+
+
+class TasksBulkUpdate(SQLModel):
+    items: list[TaskBulkUpdateItem] = Field(min_length=1)
+
+
+class TasksBulkDelete(SQLModel):
+    ids: list[uuid.UUID] = Field(min_length=1)
+
+
+class TaskBulkItemResult(SQLModel):
+    index: int
+    id: uuid.UUID | None = None
+    status: BulkItemStatus
+    task: TaskPublic | None = None
+
+
+class TasksBulkResult(SQLModel):
+    results: list[TaskBulkItemResult]
+
+
+class ImportJobStatus(str, Enum):
+    pending = "pending"
+    running = "running"
+    interrupted = "interrupted"
+    failed = "failed"
+    completed = "completed"
+
+
+class ImportRejectedRecord(SQLModel):
+    record: int
+    error: str
+
+
+class TaskImportJobCreate(SQLModel):
+    format: TaskFileFormat = TaskFileFormat.ndjson
+
+
+class TaskImportJob(SQLModel, table=True):
+    __tablename__ = "task_import_job"
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    owner_id: uuid.UUID = Field(
+        foreign_key="user.id", nullable=False, ondelete="CASCADE", index=True
+    )
+    format: TaskFileFormat
+    status: ImportJobStatus = Field(default=ImportJobStatus.pending)
+    # Records (data lines, CSV header excluded) already committed; a resumed
+    # upload skips this many before loading again.
+    records_processed: int = Field(default=0)
+    imported: int = Field(default=0)
+    rejected: int = Field(default=0)
+    # The first TASK_IMPORT_MAX_ERRORS rejected records, as ImportRejectedRecord.
+    errors: list[dict[str, Any]] = Field(default_factory=list, sa_type=JSONB)
+    detail: str | None = Field(default=None)
+
+
+class TaskTombstone(SQLModel, table=True):
+    """A deleted task, written by the task_track_change trigger."""
+
+    __tablename__ = "task_tombstone"
+    __table_args__ = (
+        Index(
+            "ix_task_tombstone_owner_id_change_xid_task_id",
+            "owner_id",
+            "change_xid",
+            "task_id",
+        ),
+        Index("ix_task_tombstone_change_xid_task_id", "change_xid", "task_id"),
+    )
+
+    task_id: uuid.UUID = Field(primary_key=True)
+    # Not a foreign key: tombstones outlive their owner.
+    owner_id: uuid.UUID
+    change_xid: int = Field(sa_type=BigInteger)
+    deleted_at: datetime | None = Field(
+        default=None,
+        sa_type=DateTime(timezone=True),  # type: ignore[call-overload]
+        nullable=False,
+        index=True,
+        sa_column_kwargs={"server_default": func.now()},
+    )
+
+
+class TaskChanges(SQLModel):
+    changed: list[TaskPublic]
+    deleted: list[uuid.UUID]
+    next_token: str
+    has_more: bool
+
+
+class TaskImportJobPublic(SQLModel):
+    id: uuid.UUID
+    format: TaskFileFormat
+    status: ImportJobStatus
+    records_processed: int
+    imported: int
+    rejected: int
+    errors: list[ImportRejectedRecord]
+    detail: str | None = None
 
 
 class Message(SQLModel):
@@ -96,12 +341,33 @@ class Message(SQLModel):
 class Token(SQLModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: str | None = None
+
+
+class RefreshTokenRequest(SQLModel):
+    refresh_token: str
 
 
 class TokenPayload(SQLModel):
     sub: str | None = None
 
 
+class HistogramSnapshot(SQLModel):
+    buckets: dict[str, int]
+    count: int
+    sum: float
+
+
+class PoolStats(SQLModel):
+    name: str
+    size: int | None = None
+    checked_in: int | None = None
+    checked_out: int | None = None
+    overflow: int | None = None
+    timeouts: int
+    wait_seconds: HistogramSnapshot
+
+
 class NewPassword(SQLModel):
     token: str
     new_password: str = Field(min_length=8, max_length=40)
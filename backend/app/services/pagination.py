@@ -0,0 +1,41 @@
+import base64
+import json
+import uuid
+from enum import Enum
+from typing import Any
+
+from fastapi import HTTPException, status
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode the sort key of the last row of a page into an opaque cursor."""
+    raw = json.dumps(
+        [str(value.value if isinstance(value, Enum) else value) for value in values],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int = 1) -> list[str]:
+    """Decode a cursor produced by `encode_cursor` back into its key values."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        values = None
+
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor."
+        )
+    return values
+
+
+def decode_id_cursor(cursor: str) -> uuid.UUID:
+    (value,) = decode_cursor(cursor)
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor."
+        )
@@ -0,0 +1,338 @@
+import codecs
+import csv
+import uuid
+from collections.abc import AsyncIterable, AsyncIterator
+from contextlib import suppress
+from typing import Any
+
+from fastapi import HTTPException, status
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import text
+from sqlmodel import update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.models import (
+    ImportJobStatus,
+    Principal,
+    TaskCreate,
+    TaskFileFormat,
+    TaskImportJob,
+)
+from app.services.task_services import adjust_task_count
+
+# Task fields are at most a few hundred characters, so a longer record is
+# rejected without being buffered.
+MAX_RECORD_LENGTH = 64 * 1024
+
+_COPY_COLUMNS = ("id", "title", "description", "status", "owner_id")
+
+_TASK_CREATE = TypeAdapter(TaskCreate)
+
+
+class _ImportConflict(Exception):
+    """Another upload advanced the job since this one last committed."""
+
+
+class AsyncTaskImportService:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def create_job(
+        self, format: TaskFileFormat, current_user: Principal
+    ) -> TaskImportJob:
+        job = TaskImportJob(format=format, owner_id=current_user.id)
+        self.session.add(job)
+        await self.session.commit()
+        await self.session.refresh(job)
+        return job
+
+    async def get_job(
+        self, job_id: uuid.UUID, current_user: Principal
+    ) -> TaskImportJob:
+        job = await self.session.get(TaskImportJob, job_id)
+        if not job:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Import job not found"
+            )
+
+        if not current_user.is_superuser and job.owner_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions"
+            )
+
+        return job
+
+    async def run_job(
+        self, job_id: uuid.UUID, chunks: AsyncIterable[bytes], current_user: Principal
+    ) -> TaskImportJob:
+        """
+        Load an uploaded file into the job owner's tasks.
+
+        The upload is consumed incrementally: records are validated against
+        `TaskCreate`, COPYed into a temporary staging table and merged into
+        `task` one batch per transaction, together with the job's progress.
+        Re-running a job with the same file skips the records already
+        committed, so an interrupted import resumes where it stopped.
+        """
+        job = await self.get_job(job_id, current_user)
+        if job.status == ImportJobStatus.completed:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Import job already completed",
+            )
+
+        progress = _Progress(job)
+        await self._save(progress, status=ImportJobStatus.running, detail=None)
+        try:
+            batch: list[tuple[int, str | None]] = []
+            async for number, record in _iter_records(chunks, job.format):
+                if number == 0:
+                    progress.header = _parse_csv_header(record)
+                    continue
+                if number <= job.records_processed:
+                    continue
+                batch.append((number, record))
+                if len(batch) >= settings.TASK_IMPORT_BATCH_SIZE:
+                    await self._load_batch(progress, batch)
+                    batch = []
+            if batch:
+                await self._load_batch(progress, batch)
+        except _ImportConflict:
+            await self.session.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Import job is being uploaded by another request",
+            )
+        except Exception as exc:
+            # Whatever was committed stays; the job can be resumed from there.
+            await self.session.rollback()
+            progress.discard_uncommitted()
+            with suppress(_ImportConflict):
+                if isinstance(exc, HTTPException):
+                    await self._save(
+                        progress, status=ImportJobStatus.failed, detail=exc.detail
+                    )
+                else:
+                    await self._save(progress, status=ImportJobStatus.interrupted)
+            raise
+
+        await self._save(progress, status=ImportJobStatus.completed)
+        await self.session.refresh(job)
+        return job
+
+    # ---------- Private Methods ----------
+
+    async def _load_batch(
+        self, progress: "_Progress", batch: list[tuple[int, str | None]]
+    ) -> None:
+        rows = []
+        for number, record in batch:
+            try:
+                if record is None:
+                    raise ValueError(f"Record exceeds {MAX_RECORD_LENGTH} characters")
+                task = _validate_record(record, progress.format, progress.header)
+            except (ValueError, ValidationError) as exc:
+                progress.reject(number, exc)
+                continue
+            rows.append(
+                (
+                    uuid.uuid4(),
+                    task.title,
+                    task.description,
+                    task.status.value,
+                    progress.owner_id,
+                )
+            )
+
+        if rows:
+            connection = await self.session.connection()
+            raw = (await connection.get_raw_connection()).driver_connection
+            await self.session.exec(
+                text(
+                    "CREATE TEMP TABLE task_import_staging "
+                    "(LIKE task INCLUDING DEFAULTS) ON COMMIT DROP"
+                )
+            )
+            columns = ", ".join(_COPY_COLUMNS)
+            async with raw.cursor() as cursor:
+                async with cursor.copy(
+                    f"COPY task_import_staging ({columns}) FROM STDIN"
+                ) as copy:
+                    for row in rows:
+                        await copy.write_row(row)
+            merged = await self.session.exec(
+                text(
+                    f"INSERT INTO task ({columns}) "
+                    f"SELECT {columns} FROM task_import_staging "
+                    "ON CONFLICT (id) DO NOTHING"
+                )
+            )
+            progress.imported += merged.rowcount
+            await self.session.exec(
+                adjust_task_count(progress.owner_id, merged.rowcount)
+            )
+
+        progress.records_processed = batch[-1][0]
+        await self._save(progress)
+
+    async def _save(self, progress: "_Progress", **values: Any) -> None:
+        """Commit the job's progress if no other upload has moved it on."""
+        result = await self.session.exec(
+            update(TaskImportJob)
+            .where(
+                TaskImportJob.id == progress.job_id,
+                TaskImportJob.records_processed == progress.committed,
+            )
+            .values(
+                records_processed=progress.records_processed,
+                imported=progress.imported,
+                rejected=progress.rejected,
+                errors=progress.errors,
+                **values,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            raise _ImportConflict()
+        await self.session.commit()
+        progress.mark_committed()
+
+
+class _Progress:
+    """Counters of a running import, written back with every batch."""
+
+    def __init__(self, job: TaskImportJob):
+        self.job_id = job.id
+        self.owner_id = job.owner_id
+        self.format = job.format
+        self.records_processed = job.records_processed
+        self.imported = job.imported
+        self.rejected = job.rejected
+        self.errors = list(job.errors)
+        self.header: list[str] | None = None
+        self.mark_committed()
+
+    @property
+    def committed(self) -> int:
+        return self._committed[0]
+
+    def mark_committed(self) -> None:
+        self._committed = (
+            self.records_processed,
+            self.imported,
+            self.rejected,
+            list(self.errors),
+        )
+
+    def discard_uncommitted(self) -> None:
+        """Forget the counters of a batch whose transaction was rolled back."""
+        (
+            self.records_processed,
+            self.imported,
+            self.rejected,
+            errors,
+        ) = self._committed
+        self.errors = list(errors)
+
+    def reject(self, number: int, exc: Exception) -> None:
+        self.rejected += 1
+        if len(self.errors) < settings.TASK_IMPORT_MAX_ERRORS:
+            self.errors.append({"record": number, "error": _describe(exc)})
+
+
+# ---------- Shared Helpers ----------
+
+
+async def _iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str | None]:
+    """Split a byte stream into lines; None stands for an oversized line."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    oversized = False
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            if oversized or len(line) > MAX_RECORD_LENGTH:
+                oversized = False
+                yield None
+            else:
+                yield line + "\n"
+        if len(pending) > MAX_RECORD_LENGTH:
+            oversized, pending = True, ""
+
+    pending += decoder.decode(b"", final=True)
+    if oversized or len(pending) > MAX_RECORD_LENGTH:
+        yield None
+    elif pending:
+        yield pending
+
+
+async def _iter_records(
+    chunks: AsyncIterable[bytes], format: TaskFileFormat
+) -> AsyncIterator[tuple[int, str | None]]:
+    """
+    Number the records of an upload, skipping blank lines.
+
+    A CSV record may span lines inside a quoted field; it ends on the first
+    line break where the quotes seen so far are balanced. The CSV header is
+    yielded as record 0.
+    """
+    number = -1 if format == TaskFileFormat.csv else 0
+    record = ""
+    async for line in _iter_lines(chunks):
+        if line is None:
+            number += 1
+            record = ""
+            yield number, None
+            continue
+        if format == TaskFileFormat.csv:
+            record += line
+            if record.count('"') % 2:
+                if len(record) > MAX_RECORD_LENGTH:
+                    number += 1
+                    record = ""
+                    yield number, None
+                continue
+            line, record = record, ""
+        if line.strip():
+            number += 1
+            yield number, line
+
+
+def _parse_csv_header(record: str | None) -> list[str]:
+    header = [name.strip() for name in next(csv.reader([record or ""]), [])]
+    if "title" not in header:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The CSV header must name a title column",
+        )
+    return header
+
+
+def _validate_record(
+    record: str, format: TaskFileFormat, header: list[str] | None
+) -> TaskCreate:
+    # The TypeAdapter runs TaskCreate's pydantic-core validator directly,
+    # parsing NDJSON in the same pass, without SQLModel's per-call overhead.
+    if format == TaskFileFormat.ndjson:
+        return _TASK_CREATE.validate_json(record)
+
+    values = next(csv.reader([record]))
+    if header is None or len(values) != len(header):
+        raise ValueError(f"Expected {len(header or [])} fields, got {len(values)}")
+    # CSV has no null: empty cells fall back to the field defaults.
+    return _TASK_CREATE.validate_python(
+        {name: value for name, value in zip(header, values, strict=True) if value}
+    )
+
+
+def _describe(exc: Exception) -> str:
+    if isinstance(exc, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+            if error["loc"]
+            else error["msg"]
+            for error in exc.errors()
+        )
+    return str(exc)
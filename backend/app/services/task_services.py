@@ -1,98 +1,813 @@
+import csv
+import io
+import time
 import uuid
+import zlib
+from collections import Counter
+from collections.abc import AsyncIterator, Mapping, Sequence
+from datetime import timedelta
+from enum import Enum
+from typing import Any, NoReturn, Protocol, TypeVar
+
+import orjson
 from fastapi import HTTPException, status
-from sqlmodel import Session, select, func
+from sqlalchemy import (
+    ARRAY,
+    ColumnElement,
+    CompoundSelect,
+    Delete,
+    Insert,
+    Integer,
+    Select,
+    Update,
+    any_,
+    bindparam,
+    cast,
+    column,
+    delete,
+    false,
+    insert,
+    literal_column,
+    text,
+    true,
+    tuple_,
+    union_all,
+)
+from sqlalchemy import values as values_clause
+from sqlmodel import col, func, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
 
-from app.models import User, Task, TaskCreate, TaskUpdate, TasksPublic
+from app.core.config import settings
+from app.core.etag import collection_etag, resource_etag
+from app.models import (
+    BulkItemStatus,
+    CountMode,
+    Principal,
+    Task,
+    TaskBulkItemResult,
+    TaskBulkUpdateItem,
+    TaskChanges,
+    TaskCreate,
+    TaskFileFormat,
+    TaskPublic,
+    TasksBulkResult,
+    TaskSort,
+    TasksPublic,
+    TaskStatus,
+    TaskTombstone,
+    TaskUpdate,
+    User,
+    task_search_vector,
+)
+from app.services.pagination import decode_cursor, decode_id_cursor, encode_cursor
 
 MAX_LIMIT = 100
+MAX_CHANGES_LIMIT = 1000
+
+ESTIMATED_TASK_COUNT = text(
+    "SELECT reltuples::bigint FROM pg_class WHERE oid = 'task'::regclass"
+)
+# Every transaction with a lower id has finished; see AsyncTaskService.get_changes.
+SNAPSHOT_XMIN = text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+
+_NIL_UUID = uuid.UUID(int=0)
+
+
+class _Owned(Protocol):
+    owner_id: uuid.UUID
+
+
+# A Task, or a row selected with Task.owner_id.
+_OwnedT = TypeVar("_OwnedT", bound=_Owned)
+_SelectT = TypeVar("_SelectT", bound=Select[Any])
+# A Task, or a row of its public columns.
+_RowT = TypeVar("_RowT")
 
 
-class TaskService:
-    def __init__(self, session: Session):
+class AsyncTaskService:
+    def __init__(self, session: AsyncSession):
         self.session = session
 
-    def get_tasks(
-        self, current_user: User, skip: int = 0, limit: int = 100
+    async def get_tasks(
+        self,
+        current_user: Principal,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: str | None = None,
+        count: CountMode = CountMode.exact,
+        statuses: Sequence[TaskStatus] | None = None,
+        search: str | None = None,
+        sort: TaskSort = TaskSort.id,
     ) -> TasksPublic:
-        if skip < 0 or limit <= 0:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Skip and limit must be positive numbers.",
+        filters = _filter_clauses(current_user, statuses, search)
+        statement, limit = _list_statement(filters, skip, limit, cursor, sort)
+        total = await self._count_tasks(current_user, count, filters)
+        tasks = (await self.session.exec(statement)).all()
+        return _build_page(tasks, total, limit, sort)
+
+    async def get_task_by_id(self, task_id: uuid.UUID, current_user: Principal) -> Task:
+        return _check_access(await self.session.get(Task, task_id), current_user)
+
+    async def get_task_etag(self, task_id: uuid.UUID, current_user: Principal) -> str:
+        """ETag of a task, read without loading or serializing the row."""
+        row = (
+            await self.session.exec(
+                select(Task.owner_id, Task.version).where(Task.id == task_id)
             )
+        ).first()
+        _check_access(row, current_user)
+        return resource_etag(task_id, row.version)
 
-        limit = min(limit, MAX_LIMIT)
+    async def get_tasks_json(
+        self,
+        current_user: Principal,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: str | None = None,
+        count: CountMode = CountMode.exact,
+        statuses: Sequence[TaskStatus] | None = None,
+        search: str | None = None,
+        sort: TaskSort = TaskSort.id,
+    ) -> tuple[bytes, str]:
+        """
+        The page `get_tasks` would return, already encoded as `TasksPublic`
+        JSON, and its ETag.
 
-        if current_user.is_superuser:
-            count_statement = select(func.count()).select_from(Task)
-            total = self.session.exec(count_statement).one()
+        Only the public columns are selected and their row tuples are encoded
+        directly, skipping the ORM objects and both rounds of validation (into
+        `TaskPublic`, then against the route's `response_model`).
+        """
+        filters = _filter_clauses(current_user, statuses, search)
+        statement, limit = _paginate(
+            select(*_PUBLIC_COLUMNS).where(*filters), skip, limit, cursor, sort
+        )
+        total = await self._count_tasks(current_user, count, filters)
+        rows, next_cursor = _split_page(
+            (await self.session.exec(statement)).all(), limit, sort
+        )
+        body = orjson.dumps(
+            {
+                "data": [dict(zip(_PUBLIC_FIELDS, row, strict=True)) for row in rows],
+                "count": total,
+                "next_cursor": next_cursor,
+            }
+        )
+        etag = collection_etag(
+            total, next_cursor is not None, ((row.id, row.version) for row in rows)
+        )
+        return body, etag
 
-            statement = select(Task).offset(skip).limit(limit)
-            tasks = self.session.exec(statement).all()
-        else:
-            count_statement = (
-                select(func.count())
-                .select_from(Task)
-                .where(Task.owner_id == current_user.id)
+    async def create_task(self, task_data: TaskCreate, current_user: Principal) -> Task:
+        task = (await self.session.scalars(_insert_task(task_data, current_user))).one()
+        await self.session.commit()
+        return task
+
+    async def update_task(
+        self,
+        task_id: uuid.UUID,
+        task_data: TaskUpdate,
+        current_user: Principal,
+        expected_version: int | None = None,
+    ) -> Task:
+        # The version is checked by the UPDATE itself, so no other writer can
+        # slip in between the check and the write.
+        task = (
+            await self.session.scalars(
+                _update_task(task_id, task_data, current_user, expected_version)
             )
-            total = self.session.exec(count_statement).one()
+        ).first()
+        if task is None:
+            await self._raise_write_error(task_id, current_user, expected_version)
+        await self.session.commit()
+        return task
+
+    async def delete_task(self, task_id: uuid.UUID, current_user: Principal) -> None:
+        row = (await self.session.exec(_delete_task(task_id, current_user))).first()
+        if row is None:
+            await self._raise_write_error(task_id, current_user)
+        await self.session.commit()
 
-            statement = (
-                select(Task)
-                .where(Task.owner_id == current_user.id)
-                .offset(skip)
-                .limit(limit)
+    async def create_tasks(
+        self, items: Sequence[TaskCreate], current_user: Principal
+    ) -> TasksBulkResult:
+        _check_bulk_size(len(items))
+        rows = [
+            {"id": uuid.uuid4(), "owner_id": current_user.id, **item.model_dump()}
+            for item in items
+        ]
+        # One multi-row INSERT ... RETURNING, rows in parameter order.
+        tasks = (
+            await self.session.scalars(
+                insert(Task).returning(Task, sort_by_parameter_order=True), rows
             )
-            tasks = self.session.exec(statement).all()
+        ).all()
+        await self.session.exec(adjust_task_count(current_user.id, len(tasks)))
+        await self.session.commit()
+
+        return TasksBulkResult(
+            results=[
+                TaskBulkItemResult(
+                    index=index, id=task.id, status=BulkItemStatus.created, task=task
+                )
+                for index, task in enumerate(tasks)
+            ]
+        )
+
+    async def update_tasks(
+        self, items: Sequence[TaskBulkUpdateItem], current_user: Principal
+    ) -> TasksBulkResult:
+        ids = [item.id for item in items]
+        _check_bulk_size(len(ids))
+        statuses = await self._bulk_access(ids, current_user)
+
+        # Items setting the same columns share one UPDATE ... FROM (VALUES ...).
+        groups: dict[tuple[str, ...], list[dict]] = {}
+        for item in items:
+            if statuses[item.id] is None:
+                changes = item.model_dump(exclude_unset=True, exclude={"id"})
+                groups.setdefault(tuple(sorted(changes)), []).append(
+                    {"id": item.id, **changes}
+                )
+
+        updated: dict[uuid.UUID, Task] = {}
+        for fields, rows in groups.items():
+            if not fields:
+                tasks = await self.session.exec(
+                    select(Task).where(
+                        Task.id == any_(_id_array([r["id"] for r in rows]))
+                    )
+                )
+            else:
+                tasks = await self.session.scalars(_update_from_values(fields, rows))
+            updated.update((task.id, task) for task in tasks)
+        await self.session.commit()
+
+        return TasksBulkResult(
+            results=[
+                TaskBulkItemResult(
+                    index=index,
+                    id=item.id,
+                    status=statuses[item.id] or BulkItemStatus.updated,
+                    task=updated.get(item.id),
+                )
+                for index, item in enumerate(items)
+            ]
+        )
 
-        return TasksPublic(data=tasks, count=total)
+    async def delete_tasks(
+        self, ids: Sequence[uuid.UUID], current_user: Principal
+    ) -> TasksBulkResult:
+        _check_bulk_size(len(ids))
+        statuses = await self._bulk_access(ids, current_user)
+        allowed = [task_id for task_id in ids if statuses[task_id] is None]
 
-    def get_task_by_id(self, task_id: uuid.UUID, current_user: User) -> Task:
-        task = self.session.get(Task, task_id)
-        if not task:
+        deleted = (
+            await self.session.exec(
+                delete(Task)
+                .where(Task.id == any_(_id_array(allowed)))
+                .returning(Task.owner_id)
+                .execution_options(synchronize_session=False)
+            )
+        ).all()
+        per_owner = Counter(owner_id for (owner_id,) in deleted)
+        if per_owner:
+            await self.session.exec(
+                _adjust_task_counts(
+                    {owner: -total for owner, total in per_owner.items()}
+                )
+            )
+        await self.session.exec(_prune_tombstones())
+        await self.session.commit()
+
+        return TasksBulkResult(
+            results=[
+                TaskBulkItemResult(
+                    index=index,
+                    id=task_id,
+                    status=statuses[task_id] or BulkItemStatus.deleted,
+                )
+                for index, task_id in enumerate(ids)
+            ]
+        )
+
+    async def get_changes(
+        self, current_user: Principal, since: str | None = None, limit: int = 500
+    ) -> TaskChanges:
+        """
+        Tasks written or deleted since the token from a previous call; without
+        a token every task is returned.
+
+        Only transactions older than every one still running are reported
+        (ids below the snapshot's xmin), so a change committed late by a slow
+        transaction can never land behind a token already handed out. Pages
+        follow (change_xid, id) order; call again with `next_token` while
+        `has_more` is set.
+        """
+        if limit <= 0:
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Task not found"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Limit must be a positive number.",
             )
+        limit = min(limit, MAX_CHANGES_LIMIT)
 
-        if not current_user.is_superuser and task.owner_id != current_user.id:
+        after = _decode_sync_token(since) if since else (0, _NIL_UUID)
+        horizon = (await self.session.exec(SNAPSHOT_XMIN)).one()[0]
+
+        # A fresh client has nothing to delete: no tombstones without a token.
+        changes = _changes_statement(current_user, after, horizon, bool(since), limit)
+        rows = (await self.session.exec(changes)).all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        changed_ids = [row.id for row in rows if not row.deleted]
+        # A task written again or deleted since the first query has a newer
+        # change that a later call reports.
+        changed = (await self.session.exec(_changed_tasks(changed_ids))).all()
+
+        last = (rows[-1].change_xid, rows[-1].id) if has_more else (horizon, _NIL_UUID)
+        return TaskChanges(
+            changed=changed,
+            deleted=[row.id for row in rows if row.deleted],
+            next_token=encode_cursor(*max(last, after), int(time.time())),
+            has_more=has_more,
+        )
+
+    async def export_tasks(
+        self,
+        current_user: Principal,
+        format: TaskFileFormat = TaskFileFormat.ndjson,
+        statuses: Sequence[TaskStatus] | None = None,
+        search: str | None = None,
+        compress: bool = False,
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream every visible task, ordered by ID, as NDJSON or CSV chunks.
+
+        Rows come from a server-side cursor one batch at a time and are
+        encoded straight from the result tuples, so memory use does not grow
+        with the number of tasks.
+        """
+        statement = _export_statement(current_user, statuses, search)
+        encode = _encode_csv if format == TaskFileFormat.csv else _encode_ndjson
+        # wbits=31 selects the gzip container rather than a raw zlib stream.
+        compressor = zlib.compressobj(wbits=31) if compress else None
+
+        if format == TaskFileFormat.csv:
+            header = _encode_csv([_PUBLIC_FIELDS])
+            yield compressor.compress(header) if compressor else header
+
+        result = await self.session.stream(statement)
+        async for rows in result.partitions():
+            chunk = encode(rows)
+            if compressor:
+                # Sync-flush each batch so the client receives data as it is
+                # read instead of when the compressor's window fills up.
+                chunk = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            yield chunk
+
+        if compressor:
+            yield compressor.flush()
+
+    # ---------- Private Methods ----------
+
+    async def _count_tasks(
+        self,
+        current_user: Principal,
+        mode: CountMode,
+        filters: Sequence[ColumnElement[bool]],
+    ) -> int | None:
+        if mode == CountMode.none:
+            return None
+
+        if _is_filtered(current_user, filters):
+            # Neither the counter nor the planner statistics know about the
+            # filters; count the matching rows, which the indexes keep cheap.
+            return (await self.session.exec(_count_statement(filters))).one()
+
+        if not current_user.is_superuser:
+            # The per-owner counter is exact. Read from the row rather than
+            # from the (possibly cached) user, so that the total is as fresh
+            # as the page it goes with.
+            return (await self.session.exec(_task_count_statement(current_user))).one()
+
+        if mode == CountMode.estimated:
+            estimate = (await self.session.exec(ESTIMATED_TASK_COUNT)).scalar_one()
+            # reltuples is -1 until the table has been vacuumed or analyzed.
+            if estimate >= 0:
+                return estimate
+
+        return (await self.session.exec(select(func.count()).select_from(Task))).one()
+
+    async def _raise_write_error(
+        self,
+        task_id: uuid.UUID,
+        current_user: Principal,
+        expected_version: int | None = None,
+    ) -> NoReturn:
+        """Tell why a guarded write matched no row: 404, 403 or 412."""
+        task = await self.session.get(Task, task_id, populate_existing=True)
+        _check_version(_check_access(task, current_user), expected_version)
+        raise _task_not_found()
+
+    async def _bulk_access(
+        self, ids: Sequence[uuid.UUID], current_user: Principal
+    ) -> dict[uuid.UUID, BulkItemStatus | None]:
+        """Check every id in one query; `None` marks a task the user may change."""
+        if len(set(ids)) != len(ids):
             raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Each task may appear only once per bulk request.",
             )
+        owners = dict(
+            (
+                await self.session.exec(
+                    select(Task.id, Task.owner_id).where(
+                        Task.id == any_(_id_array(ids))
+                    )
+                )
+            ).all()
+        )
+        statuses: dict[uuid.UUID, BulkItemStatus | None] = {}
+        for task_id in ids:
+            if task_id not in owners:
+                statuses[task_id] = BulkItemStatus.not_found
+            elif not current_user.is_superuser and owners[task_id] != current_user.id:
+                statuses[task_id] = BulkItemStatus.forbidden
+            else:
+                statuses[task_id] = None
+        return statuses
 
-        return task
 
-    def create_task(self, task_data: TaskCreate, current_user: User) -> Task:
-        new_task = Task.model_validate(task_data, update={"owner_id": current_user.id})
-        self.session.add(new_task)
-        self.session.commit()
-        self.session.refresh(new_task)
-        return new_task
+# ---------- Shared Helpers ----------
 
-    def update_task(
-        self, task_id: uuid.UUID, task_data: TaskUpdate, current_user: User
-    ) -> Task:
-        task = self.session.get(Task, task_id)
 
-        if not task:
-            raise HTTPException(status_code=404, detail="Task not found")
+def _filter_clauses(
+    current_user: Principal,
+    statuses: Sequence[TaskStatus] | None,
+    search: str | None,
+) -> list[ColumnElement[bool]]:
+    filters: list[ColumnElement[bool]] = []
+    if not current_user.is_superuser:
+        filters.append(col(Task.owner_id) == current_user.id)
+    if statuses:
+        filters.append(col(Task.status).in_(statuses))
+    if search:
+        query = func.websearch_to_tsquery(literal_column("'simple'::regconfig"), search)
+        filters.append(task_search_vector().op("@@")(query))
+    return filters
 
-        if not current_user.is_superuser and task.owner_id != current_user.id:
-            raise HTTPException(status_code=403, detail="Not enough permissions")
 
-        update_data = task_data.model_dump(exclude_unset=True)
-        task.sqlmodel_update(update_data)
+def _is_filtered(
+    current_user: Principal, filters: Sequence[ColumnElement[bool]]
+) -> bool:
+    # Non-superusers always carry the owner clause.
+    return len(filters) > (0 if current_user.is_superuser else 1)
 
-        self.session.add(task)
-        self.session.commit()
-        self.session.refresh(task)
-        return task
 
-    def delete_task(self, task_id: uuid.UUID, current_user: User) -> None:
-        task = self.session.get(Task, task_id)
+def _count_statement(filters: Sequence[ColumnElement[bool]]) -> SelectOfScalar[int]:
+    return select(func.count()).select_from(Task).where(*filters)
+
+
+def _task_count_statement(current_user: Principal) -> SelectOfScalar[int]:
+    return select(User.task_count).where(User.id == current_user.id)
+
+
+def _sort_columns(sort: TaskSort) -> tuple[list[Any], bool]:
+    """Columns to order by, with id as the unique tiebreaker, and direction."""
+    key = sort.value.lstrip("-")
+    columns = [col(Task.id)] if key == "id" else [getattr(Task, key), col(Task.id)]
+    return columns, sort.value.startswith("-")
+
+
+def _decode_sort_cursor(cursor: str, sort: TaskSort) -> list[Any]:
+    key = sort.value.lstrip("-")
+    if key == "id":
+        return [decode_id_cursor(cursor)]
+
+    value, task_id = decode_cursor(cursor, size=2)
+    try:
+        return [TaskStatus(value) if key == "status" else value, uuid.UUID(task_id)]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor."
+        )
+
+
+def _list_statement(
+    filters: Sequence[ColumnElement[bool]],
+    skip: int,
+    limit: int,
+    cursor: str | None,
+    sort: TaskSort = TaskSort.id,
+) -> tuple[SelectOfScalar[Task], int]:
+    return _paginate(select(Task).where(*filters), skip, limit, cursor, sort)
+
+
+def _paginate(
+    statement: _SelectT,
+    skip: int,
+    limit: int,
+    cursor: str | None,
+    sort: TaskSort = TaskSort.id,
+) -> tuple[_SelectT, int]:
+    if skip < 0 or limit <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Skip and limit must be positive numbers.",
+        )
+
+    limit = min(limit, MAX_LIMIT)
+
+    # Every sort order ends with the primary key so that offset pages and
+    # cursor pages walk the same, stable sequence.
+    columns, descending = _sort_columns(sort)
+    statement = statement.order_by(
+        *(column.desc() if descending else column for column in columns)
+    )
+
+    if cursor is not None:
+        after = tuple_(*columns)
+        last = tuple_(*_decode_sort_cursor(cursor, sort))
+        statement = statement.where(after < last if descending else after > last)
+    else:
+        statement = statement.offset(skip)
+
+    # Fetch one extra row to learn whether another page follows.
+    return statement.limit(limit + 1), limit
+
+
+def _build_page(
+    tasks: Sequence[Task], total: int | None, limit: int, sort: TaskSort = TaskSort.id
+) -> TasksPublic:
+    tasks, next_cursor = _split_page(tasks, limit, sort)
+    return TasksPublic(data=tasks, count=total, next_cursor=next_cursor)
+
+
+def _split_page(
+    rows: Sequence[_RowT], limit: int, sort: TaskSort = TaskSort.id
+) -> tuple[Sequence[_RowT], str | None]:
+    """Drop the lookahead row, if fetched, and encode the next page's cursor."""
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    key = sort.value.lstrip("-")
+    last = rows[-1]
+    next_cursor = (
+        encode_cursor(last.id)
+        if key == "id"
+        else encode_cursor(getattr(last, key), last.id)
+    )
+    return rows, next_cursor
+
+
+# TaskPublic's columns, in field order: listings and exports encode these
+# straight from result rows.
+_PUBLIC_FIELDS = list(TaskPublic.model_fields)
+_PUBLIC_COLUMNS = [getattr(Task, field) for field in _PUBLIC_FIELDS]
+
+
+def _encode_ndjson(rows: Sequence[Sequence[Any]]) -> bytes:
+    # orjson encodes UUIDs and enums exactly as TaskPublic would.
+    return b"".join(
+        orjson.dumps(
+            dict(zip(_PUBLIC_FIELDS, row, strict=True)),
+            option=orjson.OPT_APPEND_NEWLINE,
+        )
+        for row in rows
+    )
+
+
+def _encode_csv(rows: Sequence[Sequence[Any]]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerows(
+        [value.value if isinstance(value, Enum) else value for value in row]
+        for row in rows
+    )
+    return buffer.getvalue().encode("utf-8")
+
+
+def _check_access(task: _OwnedT | None, current_user: Principal) -> _OwnedT:
+    if not task:
+        raise _task_not_found()
+
+    if not current_user.is_superuser and task.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions"
+        )
+
+    return task
+
+
+def _task_not_found() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+
+
+def _writable_by(current_user: Principal) -> list[ColumnElement[bool]]:
+    """`_check_access` as a WHERE clause, for writes that check as they go."""
+    if current_user.is_superuser:
+        return []
+    return [Task.owner_id == current_user.id]
+
+
+def _returned_tasks(statement: Insert | Update | Select[Any]):
+    """Load the rows a write returns as `Task`s, overwriting identity-map
+    copies: ORM-enabled RETURNING would keep their stale attributes."""
+    return (
+        select(Task).from_statement(statement).execution_options(populate_existing=True)
+    )
+
+
+def _insert_task(task_data: TaskCreate, current_user: Principal):
+    """INSERT ... RETURNING the task, counted into its owner's task_count by
+    the same statement."""
+    new_task = (
+        insert(Task)
+        .values(id=uuid.uuid4(), owner_id=current_user.id, **task_data.model_dump())
+        .returning(*Task.__table__.c)
+        .cte("new_task")
+    )
+    counted = adjust_task_count(current_user.id, 1).cte("counted")
+    return _returned_tasks(select(*new_task.c).add_cte(counted))
+
+
+def _update_task(
+    task_id: uuid.UUID,
+    task_data: TaskUpdate,
+    current_user: Principal,
+    expected_version: int | None,
+):
+    """UPDATE ... RETURNING the task; no row unless the user may change it
+    and, with a precondition, it is still at `expected_version`."""
+    statement = update(Task).where(Task.id == task_id, *_writable_by(current_user))
+    if expected_version is not None:
+        statement = statement.where(Task.version == expected_version)
+    return _returned_tasks(
+        statement.values(
+            **task_data.model_dump(exclude_unset=True), version=Task.version + 1
+        ).returning(*Task.__table__.c)
+    )
+
+
+def _delete_task(task_id: uuid.UUID, current_user: Principal) -> Update:
+    """Delete the task if the user may, decrement its owner's task_count and
+    prune expired tombstones in one statement, returning the owner's id."""
+    deleted = (
+        delete(Task)
+        .where(Task.id == task_id, *_writable_by(current_user))
+        .returning(Task.owner_id)
+        .cte("deleted_task")
+    )
+    return (
+        update(User)
+        .where(User.id == deleted.c.owner_id)
+        .values(task_count=User.task_count - 1)
+        .returning(User.id)
+        .add_cte(_prune_tombstones().cte("pruned"))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _changes_statement(
+    current_user: Principal,
+    after: tuple[int, uuid.UUID],
+    horizon: int,
+    with_deletes: bool,
+    limit: int,
+) -> Select[Any] | CompoundSelect:
+    """The (change_xid, id, deleted) rows of tasks written, and with
+    `with_deletes` of tasks deleted, after `after` and below `horizon`."""
+    task, tombstone = Task.__table__.c, TaskTombstone.__table__.c
+    changes: Select[Any] | CompoundSelect = select(
+        task.change_xid, task.id, false().label("deleted")
+    ).where(
+        tuple_(task.change_xid, task.id) > tuple_(*after),
+        task.change_xid < horizon,
+    )
+    if not current_user.is_superuser:
+        changes = changes.where(task.owner_id == current_user.id)
+    if with_deletes:
+        deletes = select(
+            tombstone.change_xid, tombstone.task_id, true().label("deleted")
+        ).where(
+            tuple_(tombstone.change_xid, tombstone.task_id) > tuple_(*after),
+            tombstone.change_xid < horizon,
+        )
+        if not current_user.is_superuser:
+            deletes = deletes.where(tombstone.owner_id == current_user.id)
+        changes = union_all(changes, deletes)
+    return changes.order_by(text("change_xid"), text("id")).limit(limit + 1)
+
+
+def _changed_tasks(ids: Sequence[uuid.UUID]) -> SelectOfScalar[Task]:
+    return (
+        select(Task)
+        .where(Task.id == any_(_id_array(ids)))
+        .order_by(col(Task.change_xid), col(Task.id))
+    )
+
+
+def _export_statement(
+    current_user: Principal,
+    statuses: Sequence[TaskStatus] | None,
+    search: str | None,
+) -> Select[Any]:
+    return (
+        select(*_PUBLIC_COLUMNS)
+        .where(*_filter_clauses(current_user, statuses, search))
+        .order_by(col(Task.id))
+        .execution_options(yield_per=settings.TASK_EXPORT_BATCH_SIZE)
+    )
+
+
+def _decode_sync_token(token: str) -> tuple[int, uuid.UUID]:
+    change_xid, task_id, issued_at = decode_cursor(token, size=3)
+    try:
+        after = (int(change_xid), uuid.UUID(task_id))
+        expires_at = int(issued_at) + settings.TASK_SYNC_TOKEN_TTL_DAYS * 86400
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid sync token."
+        )
+    if expires_at < time.time():
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Sync token expired; fetch all tasks again without one.",
+        )
+    return after
+
+
+def _prune_tombstones() -> Delete:
+    # Kept a day past the token lifetime, for transactions that were still
+    # in flight when the oldest valid token was issued.
+    retention = timedelta(days=settings.TASK_SYNC_TOKEN_TTL_DAYS + 1)
+    return delete(TaskTombstone).where(
+        col(TaskTombstone.deleted_at) < func.now() - retention
+    )
+
+
+def _check_version(task: Task, expected_version: int | None) -> None:
+    if expected_version is not None and task.version != expected_version:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Task has been modified",
+        )
+
+
+def adjust_task_count(owner_id: uuid.UUID, delta: int) -> Update:
+    """Add `delta` to the owner's task_count; shared with task imports."""
+    return (
+        update(User)
+        .where(User.id == owner_id)
+        .values(task_count=User.task_count + delta)
+    )
+
+
+def _adjust_task_counts(deltas: Mapping[uuid.UUID, int]) -> Update:
+    """One statement for every owner, however many a bulk request touches."""
+    data = values_clause(
+        column("id", User.__table__.c.id.type),
+        column("delta", Integer),
+        name="deltas",
+    ).data(list(deltas.items()))
+    return (
+        update(User)
+        .where(User.id == data.c.id)
+        .values(task_count=User.task_count + data.c.delta)
+    )
+
+
+def _check_bulk_size(size: int) -> None:
+    if size > settings.TASK_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.TASK_BULK_MAX_ITEMS} items per bulk request.",
+        )
+
 
-        if not task:
-            raise HTTPException(status_code=404, detail="Task not found")
+def _id_array(ids: Sequence[uuid.UUID]):
+    return bindparam("ids", list(ids), type_=ARRAY(Task.__table__.c.id.type))
 
-        if not current_user.is_superuser and task.owner_id != current_user.id:
-            raise HTTPException(status_code=403, detail="Not enough permissions")
 
-        self.session.delete(task)
+def _update_from_values(fields: tuple[str, ...], rows: list[dict]):
+    table = Task.__table__
+    data = values_clause(
+        column("id", table.c.id.type),
+        *(column(name, table.c[name].type) for name in fields),
+        name="changes",
+    ).data([tuple(row[name] for name in ("id", *fields)) for row in rows])
+    return (
+        update(Task)
+        .where(Task.id == data.c.id)
+        # VALUES columns arrive untyped; cast so enums and NULLs line up.
+        .values(
+            {
+                **{name: cast(data.c[name], table.c[name].type) for name in fields},
+                "version": Task.version + 1,
+            }
+        )
+        .returning(Task)
+        .execution_options(synchronize_session=False)
+    )
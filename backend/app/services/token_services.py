@@ -0,0 +1,201 @@
+import hashlib
+import secrets
+import uuid
+from datetime import timedelta
+from typing import Any, NoReturn
+
+from fastapi import HTTPException, status
+from sqlalchemy import (
+    Delete,
+    Insert,
+    Select,
+    Uuid,
+    delete,
+    func,
+    insert,
+    literal,
+    update,
+)
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
+
+from app.core.config import settings
+from app.models import RefreshToken, TokenPrincipal, User, UserTokenVersion
+
+# Expired tokens, of any user, deleted by each login and each refresh.
+PRUNE_BATCH_SIZE = 100
+
+
+class AsyncRefreshTokenService:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def issue(self, user_id: uuid.UUID) -> tuple[str, int]:
+        """A new refresh token for a login, and the user's token version."""
+        token = secrets.token_urlsafe(32)
+        token_version = (
+            await self.session.exec(_insert_token(user_id, _digest(token)))
+        ).scalar_one()
+        await self.session.commit()
+        return token, token_version
+
+    async def rotate(self, token: str) -> tuple[TokenPrincipal, int, str]:
+        """Exchange a refresh token for its successor, in one statement.
+
+        Returns the user, their token version and the new token. Fails with
+        401 if the token is unknown, used, expired or revoked along with the
+        user's access tokens, or if the user is inactive.
+        """
+        new_token = secrets.token_urlsafe(32)
+        row = (
+            await self.session.exec(_rotate_token(_digest(token), _digest(new_token)))
+        ).first()
+        if row is None:
+            await self._reject(token)
+        await self.session.commit()
+        principal = TokenPrincipal(
+            id=row.id, is_active=row.is_active, is_superuser=row.is_superuser
+        )
+        return principal, row.token_version, new_token
+
+    # ---------- Private Methods ----------
+
+    async def _reject(self, token: str) -> NoReturn:
+        stored = (await self.session.exec(_find_token(_digest(token)))).first()
+        if stored is not None and stored.used_at is not None:
+            # A replayed token: whoever holds its successor may have stolen
+            # it, so end the whole login.
+            await self.session.exec(_revoke_family(stored.family_id))
+            await self.session.commit()
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+# ---------- Shared Helpers ----------
+
+
+def _digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _expires_at() -> Any:
+    return func.now() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+
+
+def _token_version(user_id: Any) -> Any:
+    """The user's current token version (0 until first revoked), in SQL."""
+    return func.coalesce(
+        select(UserTokenVersion.version)
+        .where(UserTokenVersion.user_id == user_id)
+        .scalar_subquery(),
+        0,
+    )
+
+
+def _find_token(token_hash: str) -> SelectOfScalar[RefreshToken]:
+    return select(RefreshToken).where(RefreshToken.token_hash == token_hash)
+
+
+def _revoke_family(family_id: uuid.UUID) -> Delete:
+    return delete(RefreshToken).where(col(RefreshToken.family_id) == family_id)
+
+
+def _prune_expired() -> Delete:
+    """Delete up to PRUNE_BATCH_SIZE expired tokens, whoever they belong to.
+
+    Logins and refreshes each add one token that will expire, so pruning a
+    batch with each keeps up, including with users who never come back.
+    SKIP LOCKED keeps concurrent prunes off each other's batches.
+    """
+    expired = (
+        select(RefreshToken.id)
+        .where(col(RefreshToken.expires_at) <= func.now())
+        .limit(PRUNE_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+    )
+    return delete(RefreshToken).where(col(RefreshToken.id).in_(expired))
+
+
+def _insert_token(user_id: uuid.UUID, token_hash: str) -> Insert:
+    """Start a family, returning the token version it was bound to.
+
+    Expired tokens are pruned by the same statement.
+    """
+    return (
+        insert(RefreshToken)
+        .values(
+            id=uuid.uuid4(),
+            token_hash=token_hash,
+            user_id=user_id,
+            family_id=uuid.uuid4(),
+            token_version=_token_version(user_id),
+            expires_at=_expires_at(),
+        )
+        .returning(RefreshToken.token_version)
+        .add_cte(_prune_expired().cte("pruned"))
+    )
+
+
+def _rotate_token(token_hash: str, new_hash: str) -> Select[Any]:
+    """Mark the token used and issue its successor, returning the user's
+    claims; no row if the token is not usable.
+
+    Used tokens are kept until they expire, so that replaying any of them
+    revokes the family; expired tokens are pruned by the same statement.
+    """
+    used = (
+        update(RefreshToken)
+        .where(
+            col(RefreshToken.token_hash) == token_hash,
+            col(RefreshToken.used_at).is_(None),
+            col(RefreshToken.expires_at) > func.now(),
+            col(RefreshToken.user_id) == User.id,
+            col(User.is_active),
+            col(RefreshToken.token_version) == _token_version(RefreshToken.user_id),
+        )
+        .values(used_at=func.now())
+        .returning(
+            RefreshToken.user_id,
+            RefreshToken.family_id,
+            RefreshToken.token_version,
+            User.is_active,
+            User.is_superuser,
+        )
+        .cte("used")
+    )
+    issued = (
+        insert(RefreshToken)
+        .from_select(
+            [
+                "id",
+                "token_hash",
+                "user_id",
+                "family_id",
+                "token_version",
+                "expires_at",
+            ],
+            select(
+                literal(uuid.uuid4(), Uuid),
+                literal(new_hash),
+                used.c.user_id,
+                used.c.family_id,
+                used.c.token_version,
+                _expires_at(),
+            ),
+        )
+        .cte("issued")
+    )
+    return (
+        select(
+            used.c.user_id.label("id"),
+            used.c.is_active,
+            used.c.is_superuser,
+            used.c.token_version,
+        )
+        .add_cte(issued)
+        .add_cte(_prune_expired().cte("pruned"))
+    )
@@ -1,110 +1,174 @@
 import uuid
-from typing import Optional
-from fastapi import HTTPException, status
+from collections.abc import Sequence
+from typing import Any
 
-from sqlmodel import Session, select, func
+from fastapi import HTTPException, status
+from psycopg.errors import UniqueViolation
 from pydantic import EmailStr
+from sqlalchemy import Delete, Insert, Update, delete, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, func, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
 
+from app.auth.cache import principal_cache, token_version_cache
+from app.auth.security import (
+    get_password_hash,
+    password_hasher,
+    password_needs_rehash,
+)
 from app.models import (
+    Message,
+    Task,
     UpdatePassword,
     User,
+    UserCreate,
     UserPublic,
     UserRegister,
+    UsersPublic,
+    UserTokenVersion,
     UserUpdate,
     UserUpdateMe,
-    UsersPublic,
-    UserCreate,
-    Message,
 )
-from app.auth.security import verify_password, get_password_hash
+from app.services.pagination import decode_id_cursor, encode_cursor
 
 MAX_LIMIT = 100
 
 
 class UserService:
+    """User creation on a sync `Session`, for `init_db`; the API uses
+    `AsyncUserService`."""
+
     def __init__(self, session: Session):
         self.session = session
 
-    def get_users(self, skip: int = 0, limit: int = 100) -> UsersPublic:
-        if skip < 0 or limit <= 0:
+    def create_user(self, user_data: UserCreate) -> UserPublic:
+        if not user_data.password:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Skip and limit must be positive numbers.",
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Password is required."
             )
-        limit = min(limit, MAX_LIMIT)
-        total = self.session.exec(select(func.count()).select_from(User)).one()
-        users = self.session.exec(select(User).offset(skip).limit(limit)).all()
-        return UsersPublic(data=users, count=total)
 
-    def get_user_by_id(self, user_id: uuid.UUID) -> UserPublic:
-        user = self._get_user_or_404(user_id)
+        hashed_password = get_password_hash(user_data.password)
+
+        new_user = User.model_validate(
+            user_data,
+            update={
+                "hashed_password": hashed_password,
+                "email": user_data.email.lower(),
+            },
+        )
+
+        try:
+            user = self.session.scalars(_insert_user(new_user)).one()
+        except IntegrityError as error:
+            self.session.rollback()
+            _raise_email_conflict(error, "Email already registered.")
+            raise
+        self.session.commit()
         return user
 
-    def create_user(self, user_data: UserCreate) -> UserPublic:
-        email = user_data.email.lower()
-        self._ensure_email_unique(email)
 
+class AsyncUserService:
+    """Password hashing is CPU bound, so it runs on the bounded
+    `password_hasher` pool instead of on the event loop.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_users(
+        self, skip: int = 0, limit: int = 100, cursor: str | None = None
+    ) -> UsersPublic:
+        statement, limit = _list_statement(skip, limit, cursor)
+        total = (await self.session.exec(select(func.count()).select_from(User))).one()
+        users = (await self.session.exec(statement)).all()
+        return _build_page(users, total, limit)
+
+    async def get_user_by_id(self, user_id: uuid.UUID) -> UserPublic:
+        return await self._get_user_or_404(user_id)
+
+    async def create_user(self, user_data: UserCreate) -> UserPublic:
         if not user_data.password:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Password is required."
             )
 
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await password_hasher.hash(user_data.password)
 
         new_user = User.model_validate(
-            user_data, update={"hashed_password": hashed_password, "email": email}
+            user_data,
+            update={
+                "hashed_password": hashed_password,
+                "email": user_data.email.lower(),
+            },
         )
 
-        self.session.add(new_user)
-        self.session.commit()
-        self.session.refresh(new_user)
-
-        return new_user
+        # The unique email index is the check: no SELECT beforehand.
+        try:
+            user = (await self.session.scalars(_insert_user(new_user))).one()
+        except IntegrityError as error:
+            await self.session.rollback()
+            _raise_email_conflict(error, "Email already registered.")
+            raise
+        await self.session.commit()
+        return user
 
-    def update_user_by_id(self, user_id: uuid.UUID, user_data: UserUpdate) -> User:
-        db_user = self.session.get(User, user_id)
+    async def update_user_by_id(
+        self, user_id: uuid.UUID, user_data: UserUpdate
+    ) -> User:
+        try:
+            db_user = (
+                await self.session.scalars(
+                    _update_user(user_id, _user_update_values(user_data))
+                )
+            ).first()
+        except IntegrityError as error:
+            await self.session.rollback()
+            _raise_email_conflict(error, "User with this email already exists")
+            raise
         if not db_user:
             raise HTTPException(
                 status_code=404,
                 detail="The user with this id does not exist in the system",
             )
-        if user_data.email:
-            existing_user = self.get_user_by_email_service(email=user_data.email)
-            if existing_user and existing_user.id != user_id:
-                raise HTTPException(
-                    status_code=409, detail="User with this email already exists"
-                )
-
-        update_data = user_data.model_dump(exclude_unset=True)
-        db_user.sqlmodel_update(update_data)
-
-        self.session.add(db_user)
-        self.session.commit()
-        self.session.refresh(db_user)
+        await self.session.commit()
+        await principal_cache.invalidate(str(user_id))
+        await token_version_cache.invalidate(str(user_id))
         return db_user
 
-    def delete_user(self, user_id: uuid.UUID) -> dict:
-        user = self._get_user_or_404(user_id)
-        self.session.delete(user)
-        self.session.commit()
+    async def delete_user(self, user_id: uuid.UUID) -> dict:
+        if (await self.session.exec(_delete_user(user_id))).first() is None:
+            raise _user_not_found()
+        await self.session.commit()
+        await principal_cache.invalidate(str(user_id))
+        await token_version_cache.invalidate(str(user_id))
         return {"detail": f"User with ID {user_id} deleted successfully."}
 
-    def update_current_user(self, user: User, user_data: UserUpdateMe) -> User:
-        if user_data.email:
-            existing_user = self.get_user_by_email_service(email=user_data.email)
-            if existing_user and existing_user.id != user.id:
-                raise HTTPException(
-                    status_code=409, detail="User with this email already exists"
+    async def update_current_user(self, user: User, user_data: UserUpdateMe) -> User:
+        user_id = user.id
+        try:
+            user = (
+                await self.session.scalars(
+                    _update_user(user_id, user_data.model_dump(exclude_unset=True))
                 )
-        update_data = user_data.model_dump(exclude_unset=True)
-        user.sqlmodel_update(update_data)
-        self.session.add(user)
-        self.session.commit()
-        self.session.refresh(user)
+            ).one()
+        except IntegrityError as error:
+            await self.session.rollback()
+            _raise_email_conflict(error, "User with this email already exists")
+            raise
+        await self.session.commit()
+        await principal_cache.invalidate(str(user_id))
         return user
 
-    def update_current_user_password(self, user: User, body: UpdatePassword) -> Message:
-        if not verify_password(body.current_password, user.hashed_password):
+    async def update_current_user_password(
+        self, user: User, body: UpdatePassword
+    ) -> Message:
+        # The principal cache never holds the hash, so load it explicitly.
+        await self.session.refresh(user, attribute_names=["hashed_password"])
+        if not await password_hasher.verify(
+            body.current_password, user.hashed_password
+        ):
             raise HTTPException(status_code=400, detail="Incorrect password")
 
         if body.current_password == body.new_password:
@@ -113,56 +177,161 @@ class UserService:
                 detail="New password cannot be the same as the current one",
             )
 
-        user.hashed_password = get_password_hash(body.new_password)
+        user.hashed_password = await password_hasher.hash(body.new_password)
         self.session.add(user)
-        self.session.commit()
+        await self.session.exec(_revoke_tokens(user.id))
+        await self.session.commit()
+        await principal_cache.invalidate(str(user.id))
+        await token_version_cache.invalidate(str(user.id))
         return Message(message="Password updated successfully")
 
-    def delete_current_user(self, user: User) -> Message:
+    async def delete_current_user(self, user: User) -> Message:
         if user.is_superuser:
             raise HTTPException(
                 status_code=403,
                 detail="Super users are not allowed to delete themselves",
             )
-        self.session.delete(user)
-        self.session.commit()
+        await self.session.exec(_delete_user(user.id))
+        await self.session.commit()
+        await principal_cache.invalidate(str(user.id))
+        await token_version_cache.invalidate(str(user.id))
         return Message(message="User deleted successfully")
 
-    def register_user(self, user_data: UserRegister) -> User:
-        existing_user = self.get_user_by_email_service(user_data.email)
-        if existing_user:
-            raise HTTPException(
-                status_code=400,
-                detail="The user with this email already exists in the system",
-            )
+    async def register_user(self, user_data: UserRegister) -> User:
         user_create = UserCreate.model_validate(user_data)
-        return self.create_user(user_data=user_create)
+        return await self.create_user(user_data=user_create)
 
-    def get_user_by_email_service(self, email: EmailStr) -> Optional[User]:
-        return self.session.exec(
-            select(User).where(User.email == email.lower())
+    async def get_user_by_email_service(self, email: EmailStr) -> User | None:
+        return (
+            await self.session.exec(select(User).where(User.email == email.lower()))
         ).first()
 
-    def authenticate_user_service(
+    async def authenticate_user_service(
         self, email: EmailStr, password: str
-    ) -> Optional[User]:
-        user = self.get_user_by_email_service(email=email)
-        if not user or not verify_password(password, user.hashed_password):
+    ) -> User | None:
+        user = await self.get_user_by_email_service(email=email)
+        if not user or not await password_hasher.verify(password, user.hashed_password):
             return None
+        if password_needs_rehash(user.hashed_password):
+            user.hashed_password = await password_hasher.hash(password)
+            self.session.add(user)
+            await self.session.commit()
         return user
 
     # ---------- Private Methods ----------
 
-    def _get_user_or_404(self, user_id: uuid.UUID) -> User:
-        user = self.session.exec(select(User).where(User.id == user_id)).one_or_none()
+    async def _get_user_or_404(self, user_id: uuid.UUID) -> User:
+        user = (
+            await self.session.exec(select(User).where(User.id == user_id))
+        ).one_or_none()
         if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="User not found."
-            )
+            raise _user_not_found()
         return user
 
-    def _ensure_email_unique(self, email: EmailStr):
-        if self.get_user_by_email_service(email):
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT, detail="Email already registered."
-            )
+
+# ---------- Shared Helpers ----------
+
+
+def _user_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND, detail="User not found."
+    )
+
+
+def _raise_email_conflict(error: IntegrityError, detail: str) -> None:
+    """409 for a violation of the unique email index; other errors propagate."""
+    if isinstance(error.orig, UniqueViolation):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail)
+
+
+def _returned_users(statement: Insert | Update):
+    """Load the rows a write returns as `User`s, overwriting identity-map
+    copies (such as the current user): ORM-enabled RETURNING would keep their
+    stale attributes."""
+    return (
+        select(User).from_statement(statement).execution_options(populate_existing=True)
+    )
+
+
+def _insert_user(user: User):
+    return _returned_users(
+        insert(User).values(**user.model_dump()).returning(*User.__table__.c)
+    )
+
+
+def _update_user(user_id: uuid.UUID, values: dict[str, Any]):
+    """UPDATE ... RETURNING the user, bumping `version` in the statement so
+    concurrent writers each get a distinct one.
+
+    Changing the role or status also revokes the user's tokens, whose
+    claims would otherwise keep the old values.
+    """
+    statement = (
+        update(User)
+        .where(User.id == user_id)
+        .values(**values, version=User.version + 1)
+        .returning(*User.__table__.c)
+    )
+    if values.keys() & {"is_active", "is_superuser"}:
+        statement = statement.add_cte(_revoke_tokens(user_id).cte("revoked"))
+    return _returned_users(statement)
+
+
+def _user_update_values(user_data: UserUpdate) -> dict[str, Any]:
+    # Not a column: admin updates have never changed passwords.
+    return user_data.model_dump(exclude_unset=True, exclude={"password"})
+
+
+def _delete_user(user_id: uuid.UUID) -> Delete:
+    """Delete the user and their tasks, and revoke the user's tokens, in one
+    statement returning the id.
+
+    User.tasks cascades in the ORM only; the foreign key has no ON DELETE,
+    so the tasks go first, in a CTE, rather than being loaded and deleted
+    one by one.
+    """
+    deleted_tasks = delete(Task).where(Task.owner_id == user_id).cte("deleted_tasks")
+    return (
+        delete(User)
+        .where(User.id == user_id)
+        .returning(User.id)
+        .add_cte(deleted_tasks)
+        .add_cte(_revoke_tokens(user_id).cte("revoked"))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _revoke_tokens(user_id: uuid.UUID) -> Insert:
+    """Bump the user's token version, rejecting the tokens issued so far."""
+    statement = pg_insert(UserTokenVersion).values(user_id=user_id, version=1)
+    return statement.on_conflict_do_update(
+        index_elements=[UserTokenVersion.user_id],
+        set_={"version": UserTokenVersion.version + 1},
+    )
+
+
+def _list_statement(
+    skip: int, limit: int, cursor: str | None
+) -> tuple[SelectOfScalar[User], int]:
+    if skip < 0 or limit <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Skip and limit must be positive numbers.",
+        )
+    limit = min(limit, MAX_LIMIT)
+
+    statement = select(User).order_by(User.id)
+    if cursor is not None:
+        statement = statement.where(User.id > decode_id_cursor(cursor))
+    else:
+        statement = statement.offset(skip)
+    return statement.limit(limit + 1), limit
+
+
+def _build_page(users: Sequence[User], total: int, limit: int) -> UsersPublic:
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_cursor(users[-1].id)
+
+    return UsersPublic(data=users, count=total, next_cursor=next_cursor)
@@ -0,0 +1,150 @@
+"""Measure the per-request cost of authenticating a bearer token.
+
+For each JWT algorithm (HS256, plus ES256 and EdDSA when the 'cryptography'
+package is installed), times AccessTokenCodec.decode with the cache of
+verified tokens off and on. Then times the auth dependencies themselves,
+with the codec from Settings and warm principal and token-version caches so
+that no query runs: get_current_principal with a claims token, and
+get_current_user with a subject-only one.
+
+No database rows are needed; the dependencies get a fresh, unconnected
+session per call, like a request.
+
+Usage (from ./backend):
+
+    python scripts/bench_auth.py --iterations 20000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
+from typing import Any
+
+# The dependency timings rely on the caches and on claims tokens; keep them
+# on whatever the environment says.
+os.environ["PRINCIPAL_CACHE_TTL_SECONDS"] = "3600"
+os.environ["PRINCIPAL_CACHE_REDIS_URL"] = ""
+os.environ["ACCESS_TOKEN_CLAIMS"] = "true"
+
+from sqlmodel.ext.asyncio.session import AsyncSession  # noqa: E402
+
+from app.auth.cache import principal_cache, token_version_cache  # noqa: E402
+from app.auth.dependencies import get_current_principal, get_current_user  # noqa: E402
+from app.auth.security import (  # noqa: E402
+    AccessTokenCodec,
+    access_token_claims,
+    access_tokens,
+    create_access_token,
+)
+from app.core.db import async_engine  # noqa: E402
+from app.models import TokenPrincipal, User  # noqa: E402
+
+
+def signing_keys() -> dict[str, tuple[Any, Any]]:
+    """Signing and verification keys per algorithm."""
+    secret = os.urandom(32)
+    found: dict[str, tuple[Any, Any]] = {"HS256": (secret, secret)}
+    try:
+        from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+    except ImportError:
+        print("cryptography is not installed; skipping ES256 and EdDSA")
+        return found
+    for name, key in (
+        ("ES256", ec.generate_private_key(ec.SECP256R1())),
+        ("EdDSA", ed25519.Ed25519PrivateKey.generate()),
+    ):
+        found[name] = (key, key.public_key())
+    return found
+
+
+def report(name: str, samples: list[float]) -> None:
+    q = statistics.quantiles(samples, n=100)
+    print(f"{name:<40} {q[49] * 1e6:>8.1f} {q[98] * 1e6:>8.1f}")
+
+
+def time_decode(codec: AccessTokenCodec, token: str, iterations: int) -> list[float]:
+    codec.decode(token)
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        codec.decode(token)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def time_dependency(
+    dependency: Callable[[str, AsyncSession], Awaitable[Any]],
+    token: str,
+    iterations: int,
+) -> list[float]:
+    samples = []
+    for _ in range(iterations + 1):
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            start = time.perf_counter()
+            await dependency(token, session)
+            samples.append(time.perf_counter() - start)
+    # The first call warmed the caches.
+    return samples[1:]
+
+
+async def run(args: argparse.Namespace) -> None:
+    claims = {
+        "sub": str(uuid.uuid4()),
+        "is_active": True,
+        "is_superuser": False,
+        "token_version": 0,
+        "exp": int(time.time()) + 3600,
+    }
+    print(f"{'':<40} {'p50 us':>8} {'p99 us':>8}")
+    for name, keys in signing_keys().items():
+        codec = AccessTokenCodec(name, *keys)
+        token = codec.encode(claims)
+        report(f"decode {name}", time_decode(codec, token, args.iterations))
+        cached = AccessTokenCodec(name, *keys, cache_size=args.cache_size)
+        report(f"decode {name} (cached)", time_decode(cached, token, args.iterations))
+
+    user = User(
+        id=uuid.uuid4(),
+        email="bench-auth@example.com",
+        hashed_password="",
+    )
+    principal = TokenPrincipal(id=user.id, is_active=True, is_superuser=False)
+    await principal_cache.set(
+        str(user.id), user.model_dump(mode="json", exclude={"hashed_password"})
+    )
+    await token_version_cache.set(str(user.id), {"token_version": 0})
+    claims_token = create_access_token(
+        access_token_claims(principal, 0), timedelta(hours=1)
+    )
+    subject_token = create_access_token({"sub": str(user.id)}, timedelta(hours=1))
+
+    print(f"dependencies ({access_tokens.algorithm}, warm principal caches):")
+    cache_size = access_tokens.cache_size
+    for label, size in (("", 0), (" (cached)", cache_size or args.cache_size)):
+        access_tokens.cache_size = size
+        report(
+            f"get_current_principal{label}",
+            await time_dependency(get_current_principal, claims_token, args.iterations),
+        )
+        report(
+            f"get_current_user{label}",
+            await time_dependency(get_current_user, subject_token, args.iterations),
+        )
+    access_tokens.cache_size = cache_size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--cache-size", type=int, default=10_000)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
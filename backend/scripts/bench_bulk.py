@@ -0,0 +1,56 @@
+"""Compare per-item and bulk task creation throughput.
+
+Creates `--count` tasks for a throwaway user through POST /tasks one request
+at a time, then through POST /tasks/bulk in batches, and reports tasks/s.
+
+Usage (from ./backend, against a disposable database):
+
+    python scripts/bench_bulk.py --count 2000 --batch 1000
+"""
+
+import argparse
+import time
+from datetime import timedelta
+
+import seeding
+from fastapi.testclient import TestClient
+
+from app.auth.security import create_access_token
+from app.core.config import settings
+from app.core.db import engine
+from app.main import app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=settings.TASK_BULK_MAX_ITEMS)
+    args = parser.parse_args()
+
+    with seeding.throwaway() as prefix:
+        with engine.begin() as conn:
+            (owner_id,) = seeding.seed_users(conn, prefix)
+        token = create_access_token({"sub": str(owner_id)}, timedelta(hours=1))
+        client = TestClient(app, headers={"Authorization": f"Bearer {token}"})
+        url = f"{settings.API_V1_STR}/tasks"
+
+        start = time.perf_counter()
+        for n in range(args.count):
+            client.post(f"{url}/", json={"title": f"task {n}"}).raise_for_status()
+        single = args.count / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for offset in range(0, args.count, args.batch):
+            items = [
+                {"title": f"task {n}"}
+                for n in range(offset, min(offset + args.batch, args.count))
+            ]
+            client.post(f"{url}/bulk", json={"items": items}).raise_for_status()
+        bulk = args.count / (time.perf_counter() - start)
+
+        print(f"per-item: {single:10.1f} tasks/s")
+        print(f"bulk:     {bulk:10.1f} tasks/s ({bulk / single:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
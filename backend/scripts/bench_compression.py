@@ -0,0 +1,163 @@
+"""Measure bytes on the wire and latency of list payloads per compression setting.
+
+Seeds a throwaway superuser owning `--tasks` tasks plus 100 users, then calls
+typical list endpoints through the ASGI app, once per configuration of
+CompressionMiddleware (none, gzip and, when the 'brotli' package is
+installed, brotli), and reports the body size and p50/p99 latency of each.
+Latency covers the server side only: routing, the query, encoding and
+compression.
+
+Run it once per JSON_RESPONSE_CLASS to compare the default response classes
+(GET /tasks is encoded by its service either way).
+
+Usage (from ./backend, against a disposable database):
+
+    python scripts/bench_compression.py --requests 200
+    JSON_RESPONSE_CLASS=json python scripts/bench_compression.py --requests 200
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+from datetime import timedelta
+from typing import Any
+
+# Every configuration is applied below by wrapping the app; keep the one from
+# Settings out of the way.
+os.environ["COMPRESSION_GZIP"] = "false"
+os.environ["COMPRESSION_BROTLI"] = "false"
+
+import seeding  # noqa: E402
+from starlette.types import ASGIApp  # noqa: E402
+
+from app.auth.security import create_access_token  # noqa: E402
+from app.core.compression import CompressionMiddleware  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.db import engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+PAYLOADS = {
+    "tasks (100)": ("/tasks/", "limit=100"),
+    "tasks filtered": ("/tasks/", "limit=100&status=pending&sort=title"),
+    "task changes (500)": ("/tasks/changes", "limit=500"),
+    "users (100)": ("/users/", "limit=100"),
+}
+
+
+def configurations(minimum_size: int) -> dict[str, tuple[ASGIApp, str]]:
+    configs: dict[str, tuple[ASGIApp, str]] = {"identity": (app, "identity")}
+    for level in (1, 6):
+        configs[f"gzip-{level}"] = (
+            CompressionMiddleware(app, minimum_size, gzip_level=level),
+            "gzip",
+        )
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        print("brotli is not installed; skipping it")
+        return configs
+    for quality in (4, 11):
+        configs[f"br-{quality}"] = (
+            CompressionMiddleware(app, minimum_size, brotli_quality=quality),
+            "br",
+        )
+    return configs
+
+
+def seed(prefix: str, tasks: int) -> uuid.UUID:
+    """A superuser owning `tasks` tasks, and 100 other users."""
+    with engine.begin() as conn:
+        owner_id, *_ = seeding.seed_users(conn, prefix, 101, superusers=1)
+        seeding.seed_tasks(
+            conn,
+            [owner_id],
+            tasks,
+            title="'Follow up on ticket #' || n || ' with the ' || "
+            "(ARRAY['billing', 'support', 'platform', 'design'])[n % 4 + 1] || ' team'",
+            description="'Check the report from ' || md5(n::text) || ' and update the plan'",
+            status=seeding.MIXED_STATUSES,
+        )
+    return owner_id
+
+
+async def call(
+    target: ASGIApp, path: str, query: str, token: str, encoding: str
+) -> tuple[int, float]:
+    full_path = settings.API_V1_STR + path
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": full_path,
+        "raw_path": full_path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [
+            (b"host", b"bench"),
+            (b"authorization", f"Bearer {token}".encode()),
+            (b"accept-encoding", encoding.encode()),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    size = 0
+
+    async def receive() -> dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict[str, Any]) -> None:
+        nonlocal size
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise RuntimeError(f"{path} answered {message['status']}")
+        if message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    start = time.perf_counter()
+    await target(scope, receive, send)
+    return size, time.perf_counter() - start
+
+
+async def run(args: argparse.Namespace, owner_id: uuid.UUID) -> None:
+    token = create_access_token({"sub": str(owner_id)}, timedelta(hours=1))
+    configs = configurations(args.minimum_size)
+    print(f"default response class: {settings.JSON_RESPONSE_CLASS}")
+    print(
+        f"{'payload':<20} {'config':<9} {'bytes':>8} {'ratio':>6} "
+        f"{'p50 ms':>7} {'p99 ms':>7}"
+    )
+    for name, (path, query) in PAYLOADS.items():
+        identity_size = 0
+        for config, (target, encoding) in configs.items():
+            # Warm up caches (principal, plans) before timing.
+            await call(target, path, query, token, encoding)
+            samples = []
+            for _ in range(args.requests):
+                size, elapsed = await call(target, path, query, token, encoding)
+                samples.append(elapsed)
+            identity_size = identity_size or size
+            q = statistics.quantiles(samples, n=100)
+            print(
+                f"{name:<20} {config:<9} {size:>8} {size / identity_size:>6.2f} "
+                f"{q[49] * 1000:>7.2f} {q[98] * 1000:>7.2f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--minimum-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    with seeding.throwaway() as prefix:
+        owner_id = seed(prefix, args.tasks)
+        asyncio.run(run(args, owner_id))
+
+
+if __name__ == "__main__":
+    main()
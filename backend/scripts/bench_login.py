@@ -0,0 +1,113 @@
+"""Measure login throughput alongside concurrent task reads.
+
+Drives the ASGI app in-process (one event loop, like one worker) with a
+number of clients hammering POST /login/access-token while others read
+GET /tasks, and reports logins/s, reads/s and read latency percentiles.
+`--inline` runs bcrypt on the event loop to show the cost of not offloading.
+
+Usage (from ./backend, against a disposable database):
+
+    python scripts/bench_login.py --logins 16 --readers 16 --duration 10
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from datetime import timedelta
+from typing import Any
+
+import httpx
+import seeding
+
+from app.auth import security
+from app.auth.security import create_access_token, get_password_hash
+from app.core.config import settings
+from app.core.db import engine
+from app.main import app
+
+PASSWORD = "benchmark-password"
+
+
+def seed(prefix: str) -> uuid.UUID:
+    with engine.begin() as conn:
+        (owner_id,) = seeding.seed_users(
+            conn, prefix, password_hash=get_password_hash(PASSWORD)
+        )
+        seeding.seed_tasks(conn, [owner_id], 100)
+    return owner_id
+
+
+async def login_loop(
+    client: httpx.AsyncClient, email: str, deadline: float, results: dict[str, Any]
+) -> None:
+    while time.perf_counter() < deadline:
+        response = await client.post(
+            f"{settings.API_V1_STR}/login/access-token",
+            data={"username": email, "password": PASSWORD},
+        )
+        results["logins" if response.status_code == 200 else "shed"] += 1
+
+
+async def read_loop(
+    client: httpx.AsyncClient, token: str, deadline: float, results: dict[str, Any]
+) -> None:
+    headers = {"Authorization": f"Bearer {token}"}
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get(f"{settings.API_V1_STR}/tasks/", headers=headers)
+        response.raise_for_status()
+        results["read_latency"].append(time.perf_counter() - start)
+
+
+async def run(args: argparse.Namespace, owner_id: uuid.UUID, email: str) -> None:
+    token = create_access_token({"sub": str(owner_id)}, timedelta(hours=1))
+    results: dict[str, Any] = {"logins": 0, "shed": 0, "read_latency": []}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(
+            *(login_loop(client, email, deadline, results) for _ in range(args.logins)),
+            *(read_loop(client, token, deadline, results) for _ in range(args.readers)),
+        )
+
+    latencies = sorted(results["read_latency"])
+    quantiles = (
+        statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    )
+    print(f"mode: {'inline' if args.inline else 'executor'}")
+    print(
+        f"logins/s: {results['logins'] / args.duration:.1f} (shed: {results['shed']})"
+    )
+    print(f"reads/s:  {len(latencies) / args.duration:.1f}")
+    print(
+        f"read latency ms: p50={quantiles[49] * 1000:.1f} "
+        f"p95={quantiles[94] * 1000:.1f} p99={quantiles[98] * 1000:.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=16)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--inline", action="store_true")
+    args = parser.parse_args()
+
+    if args.inline:
+
+        async def run_inline(fn: Any, *fn_args: str) -> Any:
+            return fn(*fn_args)
+
+        security.password_hasher._run = run_inline  # type: ignore[method-assign]
+
+    with seeding.throwaway() as prefix:
+        owner_id = seed(prefix)
+        asyncio.run(run(args, owner_id, f"{prefix}-1@example.com"))
+
+
+if __name__ == "__main__":
+    main()
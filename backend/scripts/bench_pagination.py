@@ -0,0 +1,94 @@
+"""Compare offset and cursor pagination latency on GET /tasks.
+
+Seeds a throwaway user with enough tasks to reach the deepest sampled page and
+times the same page fetched with `skip` and with `cursor`.
+
+Usage (from ./backend, against a disposable database):
+
+    python scripts/bench_pagination.py --pages 1 10 100 1000 10000
+"""
+
+import argparse
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+import seeding
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.auth.security import create_access_token
+from app.core.config import settings
+from app.core.db import engine
+from app.main import app
+from app.services.pagination import encode_cursor
+
+PAGE_SIZE = 100
+
+
+def seed(prefix: str, total: int) -> uuid.UUID:
+    with engine.begin() as conn:
+        (owner_id,) = seeding.seed_users(conn, prefix)
+        seeding.seed_tasks(conn, [owner_id], total)
+    with engine.begin() as conn:
+        seeding.analyze(conn)
+    return owner_id
+
+
+def cursor_for_page(owner_id: uuid.UUID, page: int) -> str | None:
+    if page == 1:
+        return None
+    with engine.connect() as conn:
+        last_id = conn.execute(
+            text(
+                "SELECT id FROM task WHERE owner_id = :owner_id "
+                "ORDER BY id OFFSET :offset LIMIT 1"
+            ),
+            {"owner_id": owner_id, "offset": (page - 1) * PAGE_SIZE - 1},
+        ).scalar_one()
+    return encode_cursor(last_id)
+
+
+def timed(client: TestClient, params: dict[str, object], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(f"{settings.API_V1_STR}/tasks/", params=params)
+        samples.append(time.perf_counter() - start)
+        response.raise_for_status()
+    return statistics.median(samples) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--pages", type=int, nargs="+", default=[1, 10, 100, 1000, 10000]
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with seeding.throwaway() as prefix:
+        owner_id = seed(prefix, max(args.pages) * PAGE_SIZE)
+        token = create_access_token(
+            {"sub": str(owner_id)}, expires_delta=timedelta(hours=1)
+        )
+        client = TestClient(app, headers={"Authorization": f"Bearer {token}"})
+
+        print(f"{'page':>8} {'skip (ms)':>12} {'cursor (ms)':>12}")
+        for page in args.pages:
+            offset_ms = timed(
+                client,
+                {"skip": (page - 1) * PAGE_SIZE, "limit": PAGE_SIZE},
+                args.repeat,
+            )
+            cursor = cursor_for_page(owner_id, page)
+            cursor_params: dict[str, object] = {"limit": PAGE_SIZE}
+            if cursor is not None:
+                cursor_params["cursor"] = cursor
+            cursor_ms = timed(client, cursor_params, args.repeat)
+            print(f"{page:>8} {offset_ms:>12.2f} {cursor_ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
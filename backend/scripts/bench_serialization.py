@@ -0,0 +1,160 @@
+"""Compare the ORM and the row-tuple serialization paths of task listings.
+
+For each row count, times the work behind a listing response both ways:
+
+- orm: load `Task` objects, build `TasksPublic`, validate it again against
+  the route's `response_model` and render it with FastAPI's `JSONResponse`
+  (how GET /tasks worked before `get_tasks_json`);
+- rows: select TaskPublic's columns and encode the tuples with orjson.
+
+`encode` excludes the query, `total` includes it. Pages are capped at
+MAX_LIMIT rows, so larger sizes are read without pagination; they stand for
+bigger pages and for the per-row cost of exports.
+
+Usage (from ./backend, against a disposable database):
+
+    python scripts/bench_serialization.py --rows 100 10000
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import orjson
+import seeding
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.db import async_engine, engine
+from app.main import app
+from app.models import Task, TasksPublic
+from app.services.task_services import _PUBLIC_COLUMNS, _PUBLIC_FIELDS
+
+
+def seed(prefix: str, total: int) -> uuid.UUID:
+    with engine.begin() as conn:
+        (owner_id,) = seeding.seed_users(conn, prefix)
+        seeding.seed_tasks(
+            conn, [owner_id], total, description="'description of task ' || n"
+        )
+    return owner_id
+
+
+def list_route() -> APIRoute:
+    path = f"{settings.API_V1_STR}/tasks/"
+    return next(
+        route
+        for route in app.routes
+        if isinstance(route, APIRoute) and route.path == path and "GET" in route.methods
+    )
+
+
+async def encode_orm(tasks: list[Task], route: APIRoute) -> bytes:
+    page = TasksPublic(data=tasks, count=len(tasks), next_cursor=None)
+    content = await serialize_response(
+        field=route.response_field, response_content=page
+    )
+    return JSONResponse(content).body
+
+
+async def encode_rows(rows: list[Any]) -> bytes:
+    return orjson.dumps(
+        {
+            "data": [dict(zip(_PUBLIC_FIELDS, row, strict=True)) for row in rows],
+            "count": len(rows),
+            "next_cursor": None,
+        }
+    )
+
+
+async def timed(fn: Callable[[], Awaitable[Any]], repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+async def bench_size(
+    session: AsyncSession,
+    route: APIRoute,
+    owner_id: uuid.UUID,
+    size: int,
+    repeat: int,
+) -> None:
+    tasks_query = (
+        select(Task).where(Task.owner_id == owner_id).order_by(col(Task.id)).limit(size)
+    )
+    rows_query = (
+        select(*_PUBLIC_COLUMNS)
+        .where(Task.owner_id == owner_id)
+        .order_by(col(Task.id))
+        .limit(size)
+    )
+
+    async def load_tasks() -> list[Task]:
+        tasks = list((await session.exec(tasks_query)).all())
+        # Identity-map hits would hide the cost of building objects.
+        session.expunge_all()
+        return tasks
+
+    async def load_rows() -> list[Any]:
+        return list((await session.exec(rows_query)).all())
+
+    async def orm_total() -> bytes:
+        return await encode_orm(await load_tasks(), route)
+
+    async def rows_total() -> bytes:
+        return await encode_rows(await load_rows())
+
+    tasks = await load_tasks()
+    rows = await load_rows()
+    if json.loads(await encode_orm(tasks, route)) != json.loads(
+        await encode_rows(rows)
+    ):
+        raise RuntimeError("The two paths produced different documents")
+
+    orm_encode = await timed(lambda: encode_orm(tasks, route), repeat)
+    rows_encode = await timed(lambda: encode_rows(rows), repeat)
+    orm_ms = await timed(orm_total, repeat)
+    rows_ms = await timed(rows_total, repeat)
+    print(f"{size:>7} {'orm':>5} {orm_encode:>10.2f} {orm_ms:>9.2f}")
+    print(
+        f"{size:>7} {'rows':>5} {rows_encode:>10.2f} {rows_ms:>9.2f} "
+        f"{orm_ms / rows_ms:>7.1f}x"
+    )
+
+
+async def run(args: argparse.Namespace, owner_id: uuid.UUID) -> None:
+    route = list_route()
+    print(f"{'rows':>7} {'path':>5} {'encode ms':>10} {'total ms':>9} {'speedup':>8}")
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        for size in args.rows:
+            repeat = max(3, args.repeat * 100 // size)
+            await bench_size(session, route, owner_id, size, repeat)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 10_000])
+    parser.add_argument(
+        "--repeat", type=int, default=50, help="repetitions at 100 rows; scaled down"
+    )
+    args = parser.parse_args()
+
+    with seeding.throwaway() as prefix:
+        owner_id = seed(prefix, max(args.rows))
+        asyncio.run(run(args, owner_id))
+
+
+if __name__ == "__main__":
+    main()
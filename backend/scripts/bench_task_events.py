@@ -0,0 +1,226 @@
+"""Measure how many /tasks/events streams one worker holds, and how fast.
+
+Drives the ASGI app in-process (one event loop, like one worker): opens
+`--connections` event streams spread over `--owners` users, then commits
+`--writes` task inserts round-robin across the owners and reports the memory
+held per stream and the commit-to-delivery latency of every event. A
+`--slow` fraction of the streams reads one frame every 250 ms; they should be
+sent resyncs while the fast streams' latency stays flat.
+
+Usage (from ./backend, against a disposable database):
+
+    python scripts/bench_task_events.py --connections 5000 --owners 50 --writes 500
+    TASK_EVENTS_QUEUE_SIZE=32 python scripts/bench_task_events.py --owners 1 \
+        --writes 500 --slow 0.1
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from typing import Any
+
+import seeding
+from sqlalchemy import text
+
+from app.auth.security import create_access_token
+from app.core.config import settings
+from app.core.db import async_engine, engine
+from app.core.events import task_events
+from app.main import app
+
+SLOW_READ_DELAY = 0.25
+
+
+def rss_bytes() -> int:
+    # Linux only; the current resident set, unlike ru_maxrss.
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) * 1024
+    return 0
+
+
+class Stream:
+    """One client of GET /tasks/events, driven through the raw ASGI interface."""
+
+    def __init__(self, token: str, slow: bool, results: dict[str, Any]):
+        self.token = token
+        self.slow = slow
+        self.results = results
+        self.ready = asyncio.Event()
+        self.disconnected = asyncio.Event()
+
+    async def run(self) -> None:
+        path = f"{settings.API_V1_STR}/tasks/events"
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [
+                (b"host", b"bench"),
+                (b"authorization", f"Bearer {self.token}".encode()),
+            ],
+            "client": ("127.0.0.1", 0),
+            "server": ("bench", 80),
+        }
+        await app(scope, self.receive, self.send)
+
+    async def receive(self) -> dict[str, Any]:
+        await self.disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message: dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            if message["status"] != 200:
+                raise RuntimeError(f"stream refused with {message['status']}")
+            return
+        received = time.perf_counter()
+        for frame in message.get("body", b"").decode().split("\n\n"):
+            if frame.startswith("event: ready"):
+                self.ready.set()
+            elif frame.startswith("event: resync"):
+                self.results["resyncs"] += 1
+            elif frame.startswith("event: created"):
+                task_id = json.loads(frame.split("data: ", 1)[1])["id"]
+                latency = received - self.results["committed"][task_id]
+                if self.slow:
+                    self.results["slow_latency"].append(latency)
+                else:
+                    self.results["latency"].append(latency)
+                    self.results["last_delivery"] = received
+        if self.slow:
+            await asyncio.sleep(SLOW_READ_DELAY)
+
+
+async def write_tasks(
+    owner_ids: list[uuid.UUID], writes: int, results: dict[str, Any]
+) -> None:
+    for n in range(writes):
+        task_id = str(uuid.uuid4())
+        async with async_engine.connect() as conn:
+            await conn.execute(
+                text(
+                    "INSERT INTO task (id, title, status, owner_id) "
+                    "VALUES (:id, :title, 'pending', :owner_id)"
+                ),
+                {
+                    "id": task_id,
+                    "title": f"event {n}",
+                    "owner_id": owner_ids[n % len(owner_ids)],
+                },
+            )
+            results["committed"][task_id] = time.perf_counter()
+            await conn.commit()
+        # Leave the loop to the streams between commits, as separate
+        # requests would.
+        await asyncio.sleep(0)
+
+
+def describe(latencies: list[float]) -> str:
+    if len(latencies) < 2:
+        return f"{len(latencies)} deliveries"
+    q = statistics.quantiles(latencies, n=100)
+    return (
+        f"{len(latencies)} deliveries, p50={q[49] * 1000:.1f} "
+        f"p99={q[98] * 1000:.1f} max={max(latencies) * 1000:.1f} ms"
+    )
+
+
+async def run(args: argparse.Namespace, owner_ids: list[uuid.UUID]) -> None:
+    results: dict[str, Any] = {
+        "committed": {},
+        "latency": [],
+        "slow_latency": [],
+        "resyncs": 0,
+        "last_delivery": 0.0,
+    }
+    tokens = [
+        create_access_token({"sub": str(id)}, timedelta(hours=1)) for id in owner_ids
+    ]
+    slow_every = round(1 / args.slow) if args.slow else 0
+    streams = [
+        Stream(
+            tokens[n % len(tokens)],
+            slow=bool(slow_every) and n % slow_every == 0,
+            results=results,
+        )
+        for n in range(args.connections)
+    ]
+
+    await task_events.wait_listening()
+    baseline = rss_bytes()
+    start = time.perf_counter()
+    runners = []
+    for stream in streams:
+        runners.append(asyncio.create_task(stream.run()))
+        await stream.ready.wait()
+    opened = time.perf_counter() - start
+    per_stream = (rss_bytes() - baseline) / args.connections
+
+    # Stream n belongs to owner n % owners, as does write n; every write
+    # reaches each fast stream of its owner.
+    writes_per_owner = [
+        args.writes // args.owners + (owner < args.writes % args.owners)
+        for owner in range(args.owners)
+    ]
+    expected = sum(
+        writes_per_owner[n % args.owners]
+        for n, stream in enumerate(streams)
+        if not stream.slow
+    )
+    start = time.perf_counter()
+    await write_tasks(owner_ids, args.writes, results)
+    deadline = time.perf_counter() + 30
+    while len(results["latency"]) < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    elapsed = results["last_delivery"] - start
+    if slow_every:
+        # Give slow streams time to drain a full queue.
+        await asyncio.sleep(SLOW_READ_DELAY * settings.TASK_EVENTS_QUEUE_SIZE)
+
+    for stream in streams:
+        stream.disconnected.set()
+    await asyncio.gather(*runners)
+    if task_events.subscription_count:
+        raise RuntimeError(f"{task_events.subscription_count} streams leaked")
+
+    print(f"streams: {args.connections} over {args.owners} owners")
+    print(f"opened in {opened:.2f}s; ~{per_stream / 1024:.1f} KiB RSS per stream")
+    print(
+        f"writes: {args.writes}; fast deliveries: {len(results['latency'])}"
+        f"/{expected}, {len(results['latency']) / elapsed:.0f}/s"
+    )
+    print(f"fast streams: {describe(results['latency'])}")
+    if slow_every:
+        print(f"slow streams: {describe(results['slow_latency'])}")
+        print(f"resyncs sent: {results['resyncs']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--owners", type=int, default=10)
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument(
+        "--slow", type=float, default=0.0, help="fraction of slow-reading streams"
+    )
+    args = parser.parse_args()
+
+    with seeding.throwaway() as prefix:
+        with engine.begin() as conn:
+            owner_ids = seeding.seed_users(conn, prefix, args.owners)
+        asyncio.run(run(args, owner_ids))
+
+
+if __name__ == "__main__":
+    main()
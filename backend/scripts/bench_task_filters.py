@@ -0,0 +1,149 @@
+"""Time filtered, sorted and searched task listings on a large table.
+
+Seeds `--tasks` tasks (random status, titles and descriptions drawn from a
+small vocabulary) across `--owners` owners, runs ANALYZE, then times each
+listing combination through the service layer and prints the median latency
+alongside the plan's top node.
+
+Usage (from ./backend, against a disposable database):
+
+    python scripts/bench_task_filters.py --tasks 1000000 --owners 1000
+"""
+
+import argparse
+import asyncio
+import math
+import statistics
+import time
+import uuid
+
+import seeding
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.db import async_engine, engine
+from app.models import CountMode, TaskSort, TaskStatus, User
+from app.services import task_services
+from app.services.task_services import AsyncTaskService
+
+PREFIX = "filter"
+WORDS = "alpha bravo charlie delta echo foxtrot golf hotel india juliet".split()
+
+
+def seed(tasks: int, owners: int) -> None:
+    with engine.begin() as conn:
+        existing = conn.execute(text("SELECT count(*) FROM task")).scalar_one()
+        if existing >= tasks:
+            return
+        words = "ARRAY[" + ", ".join(f"'{word}'" for word in WORDS) + "]"
+        word = f"({words})[1 + (random() * 9)::int]"
+        owner_ids = seeding.seed_users(
+            conn, f"{PREFIX}-{uuid.uuid4().hex[:12]}", owners
+        )
+        seeding.seed_tasks(
+            conn,
+            owner_ids,
+            math.ceil((tasks - existing) / owners),
+            title=f"{word} || ' ' || n",
+            description=f"{word} || ' ' || {word}",
+            status="(ARRAY['pending', 'in_progress', 'completed'])"
+            "[1 + (random() * 2)::int]",
+        )
+    with engine.begin() as conn:
+        seeding.analyze(conn)
+
+
+async def time_listings(
+    cases: dict[str, tuple[User, dict]], repeat: int
+) -> dict[str, dict[CountMode, float]]:
+    """Median milliseconds per case, without and with the exact count."""
+    timings: dict[str, dict[CountMode, float]] = {}
+    async with AsyncSession(async_engine) as session:
+        service = AsyncTaskService(session)
+        for name, (user, options) in cases.items():
+            timings[name] = {}
+            for count in (CountMode.none, CountMode.exact):
+                samples = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    await service.get_tasks(
+                        current_user=user, limit=50, count=count, **options
+                    )
+                    samples.append(time.perf_counter() - start)
+                timings[name][count] = statistics.median(samples) * 1000
+    await async_engine.dispose()
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--owners", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    seed(args.tasks, args.owners)
+    with Session(engine) as session:
+        owner_row = session.exec(
+            text(
+                'SELECT id, email, task_count FROM "user" '
+                "WHERE email LIKE 'filter-%' LIMIT 1"
+            )
+        ).one()
+        owner = User(
+            id=owner_row.id,
+            email=owner_row.email,
+            task_count=owner_row.task_count,
+            hashed_password="",
+        )
+        superuser = User(
+            id=uuid.uuid4(),
+            email="su@example.com",
+            is_superuser=True,
+            hashed_password="",
+        )
+
+        cases: dict[str, tuple[User, dict]] = {
+            "owner": (owner, {}),
+            "owner status": (owner, {"statuses": [TaskStatus.pending]}),
+            "owner -title": (owner, {"sort": TaskSort.title_desc}),
+            "owner search": (owner, {"search": "delta"}),
+            "all status": (superuser, {"statuses": [TaskStatus.completed]}),
+            "all -status": (superuser, {"sort": TaskSort.status_desc}),
+            "all title": (superuser, {"sort": TaskSort.title}),
+            "all search": (superuser, {"search": '"echo golf"'}),
+            "all search+status": (
+                superuser,
+                {"search": "india -juliet", "statuses": [TaskStatus.in_progress]},
+            ),
+        }
+
+        timings = asyncio.run(time_listings(cases, args.repeat))
+        print(f"{'case':<20} {'page':>9} {'+count':>9}  plan")
+        for name, (user, options) in cases.items():
+            filters = task_services._filter_clauses(
+                user, options.get("statuses"), options.get("search")
+            )
+            statement, _ = task_services._list_statement(
+                filters, 0, 50, None, options.get("sort", TaskSort.id)
+            )
+            sql = statement.compile(
+                dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+            )
+            plan = session.exec(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar_one()
+            node = plan[0]["Plan"]
+            while node.get("Plans") and node["Node Type"] in ("Limit", "Sort"):
+                node = node["Plans"][0]
+            scan = node["Node Type"] + (
+                f" using {node['Index Name']}" if "Index Name" in node else ""
+            )
+            print(
+                f"{name:<20} {timings[name][CountMode.none]:7.2f}ms "
+                f"{timings[name][CountMode.exact]:7.2f}ms  {scan}"
+            )
+
+
+if __name__ == "__main__":
+    main()
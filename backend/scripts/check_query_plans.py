@@ -0,0 +1,199 @@
+"""Fail if a service query plans a sequential scan over a large table.
+
+Seeds the database (when it holds fewer tasks than requested) with many
+owners and as many tombstones and refresh tokens as tasks, runs ANALYZE,
+then EXPLAINs every statement the services issue and exits non-zero if any
+plan contains a Seq Scan on a table whose estimated row count exceeds the
+threshold.
+
+Usage (from ./backend, against a disposable database):
+
+    python scripts/check_query_plans.py --owners 200 --tasks-per-owner 500
+"""
+
+import argparse
+import sys
+import uuid
+from collections.abc import Iterator
+from typing import Any
+
+import seeding
+from sqlalchemy import Connection, Executable, text
+from sqlmodel import select
+
+from app.core.db import engine
+from app.models import Task, TaskSort, TaskStatus, User
+from app.services import task_services, token_services, user_services
+from app.services.pagination import encode_cursor
+
+
+def explain(conn: Connection, statement: Executable) -> list[dict[str, Any]]:
+    """The JSON plan of `statement`, its parameters bound by the driver as
+    when the services run it (rendered literals lose the uuid[] type)."""
+    compiled = statement.compile(
+        dialect=conn.dialect, compile_kwargs={"render_postcompile": True}
+    )
+    return conn.exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+    ).scalar_one()
+
+
+def seed(conn: Connection, owners: int, tasks_per_owner: int) -> None:
+    existing = conn.execute(text("SELECT count(*) FROM task")).scalar_one()
+    if existing >= owners * tasks_per_owner:
+        return
+    owner_ids = seeding.seed_users(conn, f"plan-{uuid.uuid4().hex[:12]}", owners)
+    seeding.seed_tasks(conn, owner_ids, tasks_per_owner)
+    # As many tombstones and refresh tokens, so their plans are checked at
+    # size too.
+    conn.execute(
+        text(
+            "INSERT INTO task_tombstone (task_id, owner_id, change_xid) "
+            "SELECT gen_random_uuid(), owner_id, change_xid FROM task "
+            "WHERE owner_id = ANY(:ids)"
+        ),
+        {"ids": owner_ids},
+    )
+    conn.execute(
+        text(
+            "INSERT INTO refresh_token (id, token_hash, user_id, family_id, "
+            "token_version, expires_at) "
+            "SELECT gen_random_uuid(), md5(random()::text) || md5(random()::text), "
+            "owner_id, gen_random_uuid(), 0, now() + interval '1 day' FROM task "
+            "WHERE owner_id = ANY(:ids)"
+        ),
+        {"ids": owner_ids},
+    )
+
+
+def service_queries(conn: Connection) -> dict[str, Executable]:
+    owner_row = conn.execute(
+        text(
+            'SELECT id, email FROM "user" WHERE id = (SELECT owner_id FROM task LIMIT 1)'
+        )
+    ).one()
+    owner = User(id=owner_row.id, email=owner_row.email, hashed_password="")
+    superuser = User(
+        id=uuid.uuid4(), email="su@example.com", is_superuser=True, hashed_password=""
+    )
+    task_id = conn.execute(text("SELECT id FROM task LIMIT 1")).scalar_one()
+    cursor = encode_cursor(task_id)
+    # A client that synced a moment ago, the common case.
+    since = (
+        conn.execute(text("SELECT max(change_xid) FROM task")).scalar_one(),
+        uuid.UUID(int=0),
+    )
+    horizon = conn.execute(task_services.SNAPSHOT_XMIN).scalar_one()
+    token_hash = token_services._digest(uuid.uuid4().hex)
+
+    def list_tasks(
+        user: User,
+        cursor: str | None,
+        statuses: list[TaskStatus] | None = None,
+        search: str | None = None,
+        sort: TaskSort = TaskSort.id,
+    ) -> Executable:
+        filters = task_services._filter_clauses(user, statuses, search)
+        return task_services._list_statement(filters, 0, 100, cursor, sort)[0]
+
+    return {
+        "tasks.list owner offset": list_tasks(owner, None),
+        "tasks.list owner cursor": list_tasks(owner, cursor),
+        "tasks.list superuser cursor": list_tasks(superuser, cursor),
+        "tasks.list owner by status": list_tasks(
+            owner, None, statuses=[TaskStatus.pending]
+        ),
+        "tasks.list owner sorted by title": list_tasks(
+            owner, None, sort=TaskSort.title
+        ),
+        "tasks.list superuser sorted by -status": list_tasks(
+            superuser, None, sort=TaskSort.status_desc
+        ),
+        "tasks.list superuser search": list_tasks(superuser, None, search="task"),
+        "tasks.get": select(Task).where(Task.id == task_id),
+        "tasks.by_owner (User.tasks cascade)": select(Task).where(
+            Task.owner_id == owner.id
+        ),
+        "tasks.count owner by status": task_services._count_statement(
+            task_services._filter_clauses(owner, [TaskStatus.pending], None)
+        ),
+        # Every seeded title has "task", so count a selective search.
+        "tasks.count superuser search": task_services._count_statement(
+            task_services._filter_clauses(superuser, None, "42")
+        ),
+        "tasks.count owner (task_count)": task_services._task_count_statement(owner),
+        "tasks.changes owner": task_services._changes_statement(
+            owner, since, horizon, True, task_services.MAX_CHANGES_LIMIT
+        ),
+        "tasks.changes superuser": task_services._changes_statement(
+            superuser, since, horizon, True, task_services.MAX_CHANGES_LIMIT
+        ),
+        "tasks.changes changed tasks": task_services._changed_tasks([task_id]),
+        "tasks.prune tombstones": task_services._prune_tombstones(),
+        "tasks.export owner": task_services._export_statement(owner, None, None),
+        "tasks.export superuser by status": task_services._export_statement(
+            superuser, [TaskStatus.pending], None
+        ),
+        "tokens.issue": token_services._insert_token(owner.id, token_hash),
+        "tokens.rotate": token_services._rotate_token(token_hash, token_hash),
+        "tokens.find": token_services._find_token(token_hash),
+        "tokens.revoke family": token_services._revoke_family(uuid.uuid4()),
+        "tokens.prune expired": token_services._prune_expired(),
+        "users.list cursor": user_services._list_statement(
+            0, 100, encode_cursor(owner.id)
+        )[0],
+        "users.get": select(User).where(User.id == owner.id),
+        "users.by_email": select(User).where(User.email == owner.email),
+    }
+
+
+def seq_scans(plan: dict[str, Any]) -> Iterator[str]:
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from seq_scans(child)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--owners", type=int, default=200)
+    parser.add_argument("--tasks-per-owner", type=int, default=500)
+    parser.add_argument(
+        "--threshold",
+        type=int,
+        default=1000,
+        help="tables with fewer estimated rows may be seq-scanned",
+    )
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        seed(conn, args.owners, args.tasks_per_owner)
+        seeding.analyze(conn)
+        conn.execute(text("ANALYZE task_tombstone"))
+        conn.execute(text("ANALYZE refresh_token"))
+
+    failures = 0
+    with engine.connect() as conn:
+        table_rows = dict(
+            conn.execute(
+                text("SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'")
+            ).all()
+        )
+        for name, statement in service_queries(conn).items():
+            plan = explain(conn, statement)
+            large = [
+                table
+                for table in seq_scans(plan[0]["Plan"])
+                if table_rows.get(table, 0) > args.threshold
+            ]
+            if large:
+                failures += 1
+                print(f"FAIL {name}: seq scan on {', '.join(large)}")
+            else:
+                print(f"ok   {name}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+"""Load-test the task API at fixed concurrency levels and compare runs.
+
+Subcommands:
+
+- seed: replace the load-test data with `--users` users owning
+  `--tasks-per-user` tasks each, inserted set-wise by scripts/seeding.py
+  (one password hash shared by every user), then ANALYZE.
+- run: for each scenario (login, list, get, create, update, delete) and each
+  `--concurrency` level, keep that many clients busy for `--duration`
+  seconds after `--warmup`, and report requests/s and p50/p95/p99 latency.
+  Results are saved as JSON to `--output`.
+- compare: match two result files by scenario and concurrency and flag
+  throughput drops or p95 increases beyond `--threshold`; exits with 1 when
+  it finds any, so it can gate a pipeline.
+- cleanup: delete the load-test users and their tasks.
+
+`run` drives the ASGI app in-process (one event loop, like one worker)
+unless `--base-url` points it at a running server. Either way it reads the
+seeded users from, and signs their tokens with, the local settings, so a
+server must share the database and SECRET_KEY. In process the clients share
+the event loop with the app: compare runs made the same way only. Creates
+and deletes change the data set, so seed again before each run you compare.
+
+Usage (from ./backend, against a disposable database):
+
+    python scripts/loadtest.py seed --users 100 --tasks-per-user 1000
+    python scripts/loadtest.py run --concurrency 1 8 32 --output before.json
+    python scripts/loadtest.py seed --users 100 --tasks-per-user 1000
+    python scripts/loadtest.py run --concurrency 1 8 32 --output after.json
+    python scripts/loadtest.py compare before.json after.json --threshold 0.1
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import httpx
+import seeding
+from sqlalchemy import text
+
+from app.auth.security import (
+    access_token_claims,
+    create_access_token,
+    get_password_hash,
+)
+from app.core.config import settings
+from app.core.db import engine
+from app.main import app
+from app.models import TokenPrincipal
+
+PASSWORD = "loadtest-password"
+PREFIX = "loadtest"
+TASKS = f"{settings.API_V1_STR}/tasks"
+
+
+@dataclass
+class LoadUser:
+    id: uuid.UUID
+    email: str
+    headers: dict[str, str]
+    tasks: list[str]
+    created: list[str] = field(default_factory=list)
+
+
+Scenario = Callable[
+    [httpx.AsyncClient, LoadUser, random.Random], Awaitable[httpx.Response]
+]
+
+
+async def login(
+    client: httpx.AsyncClient, user: LoadUser, _rng: random.Random
+) -> httpx.Response:
+    return await client.post(
+        f"{settings.API_V1_STR}/login/access-token",
+        data={"username": user.email, "password": PASSWORD},
+    )
+
+
+async def list_tasks(
+    client: httpx.AsyncClient, user: LoadUser, _rng: random.Random
+) -> httpx.Response:
+    return await client.get(f"{TASKS}/", headers=user.headers)
+
+
+async def get_task(
+    client: httpx.AsyncClient, user: LoadUser, rng: random.Random
+) -> httpx.Response:
+    return await client.get(f"{TASKS}/{rng.choice(user.tasks)}", headers=user.headers)
+
+
+async def create_task(
+    client: httpx.AsyncClient, user: LoadUser, rng: random.Random
+) -> httpx.Response:
+    response = await client.post(
+        f"{TASKS}/",
+        json={"title": f"load test {rng.getrandbits(32)}", "description": "created"},
+        headers=user.headers,
+    )
+    if response.status_code == 201:
+        user.created.append(response.json()["id"])
+    return response
+
+
+async def update_task(
+    client: httpx.AsyncClient, user: LoadUser, rng: random.Random
+) -> httpx.Response:
+    return await client.put(
+        f"{TASKS}/{rng.choice(user.tasks)}",
+        json={"title": f"load test {rng.getrandbits(32)}"},
+        headers=user.headers,
+    )
+
+
+async def delete_task(
+    client: httpx.AsyncClient, user: LoadUser, _rng: random.Random
+) -> httpx.Response:
+    # Tasks made by the create scenario first, then seeded ones.
+    if user.created:
+        task_id = user.created.pop()
+    elif user.tasks:
+        task_id = user.tasks.pop()
+    else:
+        raise RuntimeError(f"{user.email} has no tasks left; seed more")
+    return await client.delete(f"{TASKS}/{task_id}", headers=user.headers)
+
+
+# Run in this order: deletes consume what the creates made.
+SCENARIOS: dict[str, Scenario] = {
+    "login": login,
+    "list": list_tasks,
+    "get": get_task,
+    "create": create_task,
+    "update": update_task,
+    "delete": delete_task,
+}
+
+
+def seed(users: int, tasks_per_user: int) -> None:
+    with engine.begin() as conn:
+        seeding.cleanup(conn, PREFIX)
+        owner_ids = seeding.seed_users(
+            conn, PREFIX, users, password_hash=get_password_hash(PASSWORD)
+        )
+        seeding.seed_tasks(
+            conn,
+            owner_ids,
+            tasks_per_user,
+            title="'Task ' || n || ' of ' || u.email",
+            description="'Seeded for load testing'",
+            status=seeding.MIXED_STATUSES,
+        )
+    with engine.begin() as conn:
+        seeding.analyze(conn)
+    print(f"seeded {users} users with {tasks_per_user} tasks each")
+
+
+def cleanup() -> None:
+    with engine.begin() as conn:
+        seeding.cleanup(conn, PREFIX)
+
+
+def token_data(row: Any) -> dict[str, Any]:
+    """What login would put in the user's token."""
+    if not settings.ACCESS_TOKEN_CLAIMS:
+        return {"sub": str(row.id)}
+    principal = TokenPrincipal(
+        id=row.id, is_active=row.is_active, is_superuser=row.is_superuser
+    )
+    return access_token_claims(principal, row.token_version)
+
+
+def load_users() -> list[LoadUser]:
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(
+                "SELECT u.id, u.email, u.is_active, u.is_superuser, "
+                "COALESCE(v.version, 0) AS token_version, t.id AS task_id "
+                'FROM "user" AS u JOIN task AS t ON t.owner_id = u.id '
+                "LEFT JOIN user_token_version AS v ON v.user_id = u.id "
+                "WHERE u.email LIKE :pattern ORDER BY u.email, t.id"
+            ),
+            {"pattern": seeding.email_pattern(PREFIX)},
+        ).all()
+    users: dict[uuid.UUID, LoadUser] = {}
+    for row in rows:
+        if row.id not in users:
+            token = create_access_token(token_data(row), timedelta(hours=2))
+            users[row.id] = LoadUser(
+                id=row.id,
+                email=row.email,
+                headers={"Authorization": f"Bearer {token}"},
+                tasks=[],
+            )
+        users[row.id].tasks.append(str(row.task_id))
+    if not users:
+        sys.exit("No load-test data; run `python scripts/loadtest.py seed` first.")
+    return list(users.values())
+
+
+async def run_phase(
+    client: httpx.AsyncClient,
+    users: list[LoadUser],
+    scenario: Scenario,
+    concurrency: int,
+    args: argparse.Namespace,
+) -> dict[str, Any]:
+    latencies: list[float] = []
+    statuses: Counter[int] = Counter()
+    measure_from = time.perf_counter() + args.warmup
+    deadline = measure_from + args.duration
+
+    async def client_loop(index: int) -> None:
+        user = users[index % len(users)]
+        rng = random.Random(args.random_seed + index)
+        while (start := time.perf_counter()) < deadline:
+            response = await scenario(client, user, rng)
+            end = time.perf_counter()
+            # Requests finishing in the window count, like a server-side meter.
+            if measure_from <= end <= deadline:
+                latencies.append(end - start)
+                statuses[response.status_code] += 1
+
+    await asyncio.gather(*(client_loop(index) for index in range(concurrency)))
+
+    quantiles = (
+        statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    )
+    errors = {str(code): n for code, n in statuses.items() if code >= 400}
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors.values()),
+        "error_statuses": errors,
+        "rps": round(len(latencies) / args.duration, 2),
+        "p50_ms": round(quantiles[49] * 1000, 3),
+        "p95_ms": round(quantiles[94] * 1000, 3),
+        "p99_ms": round(quantiles[98] * 1000, 3),
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> None:
+    users = load_users()
+    scenarios = args.scenarios or list(SCENARIOS)
+    results: list[dict[str, Any]] = []
+    if args.base_url:
+        client = httpx.AsyncClient(
+            base_url=args.base_url,
+            timeout=args.timeout,
+            limits=httpx.Limits(max_connections=max(args.concurrency)),
+        )
+    else:
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://loadtest",
+            timeout=args.timeout,
+        )
+
+    print(
+        f"{'scenario':<8} {'conc':>5} {'requests':>9} {'errors':>7} {'rps':>9} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    async with client:
+        for name in scenarios:
+            for concurrency in args.concurrency:
+                result = await run_phase(
+                    client, users, SCENARIOS[name], concurrency, args
+                )
+                results.append({"scenario": name, "concurrency": concurrency, **result})
+                print(
+                    f"{name:<8} {concurrency:>5} {result['requests']:>9} "
+                    f"{result['errors']:>7} {result['rps']:>9.1f} "
+                    f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+                    f"{result['p99_ms']:>8.2f}"
+                )
+
+    report = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "revision": git_revision(),
+            "target": args.base_url or "in-process",
+            "python": platform.python_version(),
+            "users": len(users),
+            "tasks": sum(len(user.tasks) for user in users),
+            "duration": args.duration,
+            "warmup": args.warmup,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"saved {args.output}")
+
+
+def compare(args: argparse.Namespace) -> None:
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.candidate) as file:
+        candidate = json.load(file)
+    before = {(r["scenario"], r["concurrency"]): r for r in baseline["results"]}
+    after = {(r["scenario"], r["concurrency"]): r for r in candidate["results"]}
+
+    print(
+        f"{'scenario':<8} {'conc':>5} {'rps':>9} {'change':>8} "
+        f"{'p95 ms':>8} {'change':>8}"
+    )
+    regressions = 0
+    for key, old in before.items():
+        if (new := after.get(key)) is None:
+            continue
+        rps_change = _change(old["rps"], new["rps"])
+        p95_change = _change(old["p95_ms"], new["p95_ms"])
+        flags = []
+        if rps_change < -args.threshold:
+            flags.append("throughput")
+        if p95_change > args.threshold:
+            flags.append("p95")
+        if new["errors"] > old["errors"]:
+            flags.append("errors")
+        regressions += bool(flags)
+        print(
+            f"{key[0]:<8} {key[1]:>5} {new['rps']:>9.1f} {rps_change:>+8.1%} "
+            f"{new['p95_ms']:>8.2f} {p95_change:>+8.1%}"
+            + (f"  REGRESSION ({', '.join(flags)})" if flags else "")
+        )
+    unmatched = [key for key in before if key not in after]
+    unmatched += [key for key in after if key not in before]
+    for key in unmatched:
+        where = "baseline" if key in before else "candidate"
+        print(f"{key[0]:<8} {key[1]:>5} only in {where}")
+
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    if regressions:
+        sys.exit(1)
+
+
+def _change(old: float, new: float) -> float:
+    return (new - old) / old if old else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed")
+    seed_parser.add_argument("--users", type=int, default=100)
+    seed_parser.add_argument("--tasks-per-user", type=int, default=1000)
+
+    run_parser = commands.add_parser("run")
+    run_parser.add_argument("--base-url")
+    run_parser.add_argument(
+        "--scenarios", nargs="+", choices=list(SCENARIOS), default=None
+    )
+    run_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    run_parser.add_argument("--duration", type=float, default=10.0)
+    run_parser.add_argument("--warmup", type=float, default=2.0)
+    run_parser.add_argument("--timeout", type=float, default=30.0)
+    run_parser.add_argument("--random-seed", type=int, default=0)
+    run_parser.add_argument("--output", default="loadtest.json")
+
+    compare_parser = commands.add_parser("compare")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+
+    commands.add_parser("cleanup")
+
+    args = parser.parse_args()
+    if args.command == "seed":
+        seed(args.users, args.tasks_per_user)
+    elif args.command == "run":
+        asyncio.run(run(args))
+    elif args.command == "compare":
+        compare(args)
+    else:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
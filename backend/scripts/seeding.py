@@ -0,0 +1,113 @@
+"""Fast seeding of throwaway users and tasks, shared by the benchmark scripts.
+
+Rows are inserted set-wise, one INSERT ... SELECT per table, and the owners'
+task_count is then set from the tasks they actually have, so that listings
+reading the counter report the right totals. Seeded users are emailed
+"<prefix>-<n>@example.com", which is how `cleanup` finds them again.
+
+Task columns are SQL expressions over `n`, the task's 1-based position among
+its owner's tasks, and `u`, its owner's row.
+"""
+
+import uuid
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+
+from sqlalchemy import Connection, text
+
+from app.core.db import engine
+
+TITLE = "'task ' || n"
+PENDING = "'pending'"
+# Cycles through every status.
+MIXED_STATUSES = "(ARRAY['pending', 'in_progress', 'completed'])[n % 3 + 1]"
+
+
+def email_pattern(prefix: str) -> str:
+    """The LIKE pattern of the users seeded with `prefix`."""
+    return f"{prefix}-%@example.com"
+
+
+def seed_users(
+    conn: Connection,
+    prefix: str,
+    count: int = 1,
+    *,
+    ids: Sequence[uuid.UUID] | None = None,
+    password_hash: str = "",
+    superusers: int = 0,
+) -> list[uuid.UUID]:
+    """Insert `count` active users, or one per id of `ids`, the first
+    `superusers` of them superusers; returns their ids in order."""
+    user_ids = list(ids) if ids is not None else [uuid.uuid4() for _ in range(count)]
+    conn.execute(
+        text(
+            'INSERT INTO "user" (id, email, full_name, is_active, is_superuser, '
+            "hashed_password) "
+            "SELECT u.id, :prefix || '-' || u.n || '@example.com', "
+            "'Seeded user ' || u.n, true, u.n <= :superusers, :password_hash "
+            "FROM unnest(CAST(:ids AS uuid[])) WITH ORDINALITY AS u(id, n)"
+        ),
+        {
+            "ids": user_ids,
+            "prefix": prefix,
+            "superusers": superusers,
+            "password_hash": password_hash,
+        },
+    )
+    return user_ids
+
+
+def seed_tasks(
+    conn: Connection,
+    owner_ids: Sequence[uuid.UUID],
+    per_owner: int,
+    *,
+    title: str = TITLE,
+    description: str = "NULL",
+    status: str = PENDING,
+) -> None:
+    """Insert `per_owner` tasks for each owner and update their task_count."""
+    conn.execute(
+        text(
+            "INSERT INTO task (id, title, description, status, owner_id) "
+            f"SELECT gen_random_uuid(), {title}, {description}, "
+            f"CAST({status} AS taskstatus), u.id "
+            'FROM "user" AS u CROSS JOIN generate_series(1, :per_owner) AS n '
+            "WHERE u.id = ANY(:ids)"
+        ),
+        {"ids": list(owner_ids), "per_owner": per_owner},
+    )
+    conn.execute(
+        text(
+            'UPDATE "user" AS u SET task_count = '
+            "(SELECT count(*) FROM task WHERE owner_id = u.id) "
+            "WHERE u.id = ANY(:ids)"
+        ),
+        {"ids": list(owner_ids)},
+    )
+
+
+def analyze(conn: Connection) -> None:
+    """Refresh the planner statistics after a large seed."""
+    conn.execute(text("ANALYZE task"))
+    conn.execute(text('ANALYZE "user"'))
+
+
+@contextmanager
+def throwaway(name: str = "bench") -> Iterator[str]:
+    """A fresh prefix for one run, whose users and tasks are deleted on exit."""
+    prefix = f"{name}-{uuid.uuid4().hex[:12]}"
+    try:
+        yield prefix
+    finally:
+        with engine.begin() as conn:
+            cleanup(conn, prefix)
+
+
+def cleanup(conn: Connection, prefix: str) -> None:
+    """Delete the users seeded with `prefix`, and their tasks."""
+    owners = 'SELECT id FROM "user" WHERE email LIKE :pattern'
+    params = {"pattern": email_pattern(prefix)}
+    conn.execute(text(f"DELETE FROM task WHERE owner_id IN ({owners})"), params)
+    conn.execute(text('DELETE FROM "user" WHERE email LIKE :pattern'), params)
@@ -0,0 +1,75 @@
+import uuid
+from collections.abc import AsyncGenerator, Callable, Generator
+from contextlib import AbstractContextManager
+
+import pytest
+from sqlalchemy import delete
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.db import async_engine, engine, init_db
+from app.core.metrics import RequestMetrics
+from app.core.query_budget import assert_max_queries
+from app.models import Task, User
+
+MaxQueries = Callable[[int], AbstractContextManager[RequestMetrics]]
+
+
+@pytest.fixture(scope="session", autouse=True)
+def db() -> Generator[Session, None, None]:
+    with Session(engine) as session:
+        init_db(session)
+        yield session
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture
+async def async_session() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+@pytest.fixture
+def max_queries(request: pytest.FixtureRequest) -> MaxQueries:
+    """
+    `with max_queries(2) as metrics: ...` fails the test if the block runs
+    more than two SQL statements; `metrics.db_queries` has the exact count.
+    """
+
+    def check(limit: int) -> AbstractContextManager[RequestMetrics]:
+        return assert_max_queries(limit, request.node.name)
+
+    return check
+
+
+@pytest.fixture
+def user(db: Session) -> Generator[User, None, None]:
+    yield from _temporary_user(db)
+
+
+@pytest.fixture
+def other_user(db: Session) -> Generator[User, None, None]:
+    yield from _temporary_user(db)
+
+
+def random_email() -> str:
+    return f"test-{uuid.uuid4().hex}@example.com"
+
+
+def _temporary_user(db: Session) -> Generator[User, None, None]:
+    """A user, deleted with their tasks after the test; the password is not set."""
+    user = User(email=random_email(), hashed_password="")
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    # Detached, so later commits do not expire it and reading its attributes
+    # inside a max_queries block runs no query.
+    db.expunge(user)
+    yield user
+    db.execute(delete(Task).where(Task.owner_id == user.id))
+    db.execute(delete(User).where(User.id == user.id))
+    db.commit()
@@ -0,0 +1,77 @@
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import Session, select
+
+from app.core.db import engine
+from app.core.query_budget import (
+    QueryBudgetExceeded,
+    QueryBudgetMiddleware,
+    query_budget,
+)
+from app.models import User
+from tests.conftest import MaxQueries
+
+
+def test_max_queries_counts_statements(db: Session, max_queries: MaxQueries) -> None:
+    with max_queries(2) as metrics:
+        db.exec(select(User).limit(1)).all()
+        db.exec(select(User.id).limit(1)).all()
+    assert metrics.db_queries == 2
+
+
+def test_max_queries_fails_over_budget(db: Session, max_queries: MaxQueries) -> None:
+    with pytest.raises(QueryBudgetExceeded, match="over its budget of 1"):
+        with max_queries(1):
+            db.exec(select(User).limit(1)).all()
+            db.exec(select(User.id).limit(1)).all()
+
+
+def test_max_queries_counts_failed_statements(
+    db: Session, max_queries: MaxQueries
+) -> None:
+    with max_queries(1) as metrics, pytest.raises(DBAPIError):
+        db.exec(text("SELECT 1 / 0"))
+    db.rollback()
+    assert metrics.db_queries == 1
+
+
+def _budget_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(QueryBudgetMiddleware, mode="raise")
+
+    @app.get("/undeclared")
+    def undeclared() -> dict:
+        with Session(engine) as session:
+            session.exec(select(User.id).limit(1)).all()
+        return {}
+
+    @app.get("/budgeted")
+    @query_budget(0)
+    def budgeted() -> dict:
+        with Session(engine) as session:
+            session.exec(select(User.id).limit(1)).all()
+        return {}
+
+    return app
+
+
+def test_raise_mode_only_logs_routes_without_a_budget(
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    client = TestClient(_budget_app())
+    with caplog.at_level(logging.WARNING, logger="app.core.query_budget"):
+        response = client.get("/undeclared")
+    assert response.status_code == 200
+    assert "GET /undeclared has no declared query budget" in caplog.text
+
+
+def test_raise_mode_fails_requests_over_budget() -> None:
+    client = TestClient(_budget_app())
+    response = client.get("/budgeted")
+    assert response.status_code == 500
+    assert "over its budget of 0" in response.json()["detail"]
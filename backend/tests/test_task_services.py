@@ -0,0 +1,105 @@
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import TaskCreate, TaskSort, TaskStatus, TaskUpdate, User
+from app.services.task_services import AsyncTaskService
+from tests.conftest import MaxQueries
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_create_task_is_one_statement(
+    async_session: AsyncSession, user: User, max_queries: MaxQueries
+) -> None:
+    service = AsyncTaskService(async_session)
+    with max_queries(1) as metrics:
+        task = await service.create_task(TaskCreate(title="Write tests"), user)
+    assert metrics.db_queries == 1
+    assert task.owner_id == user.id
+    assert task.version == 1
+
+
+async def test_update_task_is_one_statement(
+    async_session: AsyncSession, user: User, max_queries: MaxQueries
+) -> None:
+    service = AsyncTaskService(async_session)
+    task = await service.create_task(TaskCreate(title="Draft"), user)
+    version = task.version
+    with max_queries(1) as metrics:
+        updated = await service.update_task(
+            task.id,
+            TaskUpdate(title="Final", status=TaskStatus.completed),
+            user,
+            expected_version=version,
+        )
+    assert metrics.db_queries == 1
+    assert updated.title == "Final"
+    assert updated.version == version + 1
+
+
+async def test_update_task_of_another_user_is_forbidden(
+    async_session: AsyncSession,
+    user: User,
+    other_user: User,
+    max_queries: MaxQueries,
+) -> None:
+    service = AsyncTaskService(async_session)
+    task = await service.create_task(TaskCreate(title="Mine"), user)
+    # The failed UPDATE, then one lookup to tell 403 from 404.
+    with max_queries(2) as metrics, pytest.raises(HTTPException) as raised:
+        await service.update_task(task.id, TaskUpdate(title="Theirs"), other_user)
+    assert metrics.db_queries == 2
+    assert raised.value.status_code == 403
+
+
+async def test_update_task_with_stale_version_fails(
+    async_session: AsyncSession, user: User, max_queries: MaxQueries
+) -> None:
+    service = AsyncTaskService(async_session)
+    task = await service.create_task(TaskCreate(title="Draft"), user)
+    with max_queries(2) as metrics, pytest.raises(HTTPException) as raised:
+        await service.update_task(
+            task.id, TaskUpdate(title="Late"), user, expected_version=task.version - 1
+        )
+    assert metrics.db_queries == 2
+    assert raised.value.status_code == 412
+
+
+async def test_delete_task_is_one_statement(
+    async_session: AsyncSession, user: User, max_queries: MaxQueries
+) -> None:
+    service = AsyncTaskService(async_session)
+    task = await service.create_task(TaskCreate(title="Disposable"), user)
+    with max_queries(1) as metrics:
+        await service.delete_task(task.id, user)
+    assert metrics.db_queries == 1
+    with pytest.raises(HTTPException) as raised:
+        await service.get_task_etag(task.id, user)
+    assert raised.value.status_code == 404
+
+
+async def test_delete_missing_task_is_not_found(
+    async_session: AsyncSession, user: User, max_queries: MaxQueries
+) -> None:
+    service = AsyncTaskService(async_session)
+    with max_queries(2) as metrics, pytest.raises(HTTPException) as raised:
+        await service.delete_task(uuid.uuid4(), user)
+    assert metrics.db_queries == 2
+    assert raised.value.status_code == 404
+
+
+async def test_list_tasks(
+    async_session: AsyncSession, user: User, max_queries: MaxQueries
+) -> None:
+    service = AsyncTaskService(async_session)
+    for title in ("a", "b", "c"):
+        await service.create_task(TaskCreate(title=title), user)
+    # The owner's task counter, then the page.
+    with max_queries(2) as metrics:
+        page = await service.get_tasks(user, limit=2, sort=TaskSort.title)
+    assert metrics.db_queries == 2
+    assert page.count == 3
+    assert [task.title for task in page.data] == ["a", "b"]
@@ -0,0 +1,53 @@
+import pytest
+from fastapi import HTTPException
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import User
+from app.services.token_services import AsyncRefreshTokenService
+from tests.conftest import MaxQueries
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_rotate_is_one_statement(
+    async_session: AsyncSession, user: User, max_queries: MaxQueries
+) -> None:
+    service = AsyncRefreshTokenService(async_session)
+    token, _ = await service.issue(user.id)
+    with max_queries(1) as metrics:
+        principal, _, new_token = await service.rotate(token)
+    assert metrics.db_queries == 1
+    assert principal.id == user.id
+    assert new_token != token
+
+
+async def test_replaying_an_older_token_revokes_the_family(
+    async_session: AsyncSession, user: User
+) -> None:
+    service = AsyncRefreshTokenService(async_session)
+    first, _ = await service.issue(user.id)
+    _, _, second = await service.rotate(first)
+    _, _, third = await service.rotate(second)
+
+    # Two rotations old: a thief who refreshed twice must not escape.
+    with pytest.raises(HTTPException) as replayed:
+        await service.rotate(first)
+    assert replayed.value.status_code == 401
+
+    with pytest.raises(HTTPException) as revoked:
+        await service.rotate(third)
+    assert revoked.value.status_code == 401
+
+
+async def test_unknown_token_is_rejected(
+    async_session: AsyncSession, user: User
+) -> None:
+    service = AsyncRefreshTokenService(async_session)
+    token, _ = await service.issue(user.id)
+    with pytest.raises(HTTPException) as unknown:
+        await service.rotate("not-a-token")
+    assert unknown.value.status_code == 401
+
+    # Unknown tokens revoke nothing.
+    _, _, new_token = await service.rotate(token)
+    assert new_token
@@ -0,0 +1,116 @@
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import User, UserCreate, UserRegister, UserUpdate, UserUpdateMe
+from app.services.user_services import AsyncUserService
+from tests.conftest import MaxQueries, random_email
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_create_user_is_one_statement(
+    db: Session, async_session: AsyncSession, max_queries: MaxQueries
+) -> None:
+    service = AsyncUserService(async_session)
+    email = random_email()
+    try:
+        with max_queries(1) as metrics:
+            created = await service.create_user(
+                UserCreate(email=email, password="password1")
+            )
+        assert metrics.db_queries == 1
+        assert created.email == email
+    finally:
+        db.execute(delete(User).where(User.email == email))
+        db.commit()
+
+
+async def test_register_user_with_taken_email_conflicts(
+    async_session: AsyncSession, user: User, max_queries: MaxQueries
+) -> None:
+    service = AsyncUserService(async_session)
+    user_in = UserRegister(email=user.email.upper(), password="password1")
+    # The unique index rejects the INSERT; nothing is looked up first.
+    with max_queries(1) as metrics, pytest.raises(HTTPException) as raised:
+        await service.register_user(user_in)
+    assert metrics.db_queries == 1
+    assert raised.value.status_code == 409
+
+
+async def test_update_user_is_one_statement(
+    async_session: AsyncSession, user: User, max_queries: MaxQueries
+) -> None:
+    service = AsyncUserService(async_session)
+    # Deactivating also revokes the user's tokens, in the same statement.
+    with max_queries(1) as metrics:
+        updated = await service.update_user_by_id(
+            user.id, UserUpdate(full_name="Renamed", is_active=False)
+        )
+    assert metrics.db_queries == 1
+    assert updated.full_name == "Renamed"
+    assert not updated.is_active
+
+
+async def test_update_user_to_taken_email_conflicts(
+    async_session: AsyncSession,
+    user: User,
+    other_user: User,
+    max_queries: MaxQueries,
+) -> None:
+    service = AsyncUserService(async_session)
+    user_in = UserUpdate(email=other_user.email)
+    with max_queries(1) as metrics, pytest.raises(HTTPException) as raised:
+        await service.update_user_by_id(user.id, user_in)
+    assert metrics.db_queries == 1
+    assert raised.value.status_code == 409
+
+
+async def test_update_current_user_is_one_statement(
+    async_session: AsyncSession, user: User, max_queries: MaxQueries
+) -> None:
+    service = AsyncUserService(async_session)
+    current = await async_session.get_one(User, user.id)
+    with max_queries(1) as metrics:
+        updated = await service.update_current_user(
+            current, UserUpdateMe(full_name="Me")
+        )
+    assert metrics.db_queries == 1
+    assert updated.full_name == "Me"
+
+
+async def test_delete_user_is_one_statement(
+    async_session: AsyncSession, user: User, max_queries: MaxQueries
+) -> None:
+    service = AsyncUserService(async_session)
+    with max_queries(1) as metrics:
+        await service.delete_user(user.id)
+    assert metrics.db_queries == 1
+    with pytest.raises(HTTPException) as raised:
+        await service.get_user_by_id(user.id)
+    assert raised.value.status_code == 404
+
+
+async def test_delete_missing_user_is_not_found(
+    async_session: AsyncSession, max_queries: MaxQueries
+) -> None:
+    service = AsyncUserService(async_session)
+    with max_queries(1) as metrics, pytest.raises(HTTPException) as raised:
+        await service.delete_user(uuid.uuid4())
+    assert metrics.db_queries == 1
+    assert raised.value.status_code == 404
+
+
+@pytest.mark.usefixtures("user")
+async def test_list_users(async_session: AsyncSession, max_queries: MaxQueries) -> None:
+    service = AsyncUserService(async_session)
+    # The total, then the page.
+    with max_queries(2) as metrics:
+        page = await service.get_users(limit=1)
+    assert metrics.db_queries == 2
+    assert page.count >= 1
+    assert len(page.data) == 1